@@ -0,0 +1,79 @@
+import os
+import resource
+import sys
+import tempfile
+
+import psutil
+
+# ----- Headless bot harness -----
+# Imports main.py without connecting to Discord: dummy credentials, a scratch
+# working directory (sessions.csv, users.txt) and a scratch db/ directory.
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_DUMMY_ENV = {
+    "DISCORD_TOKEN": "offline",
+    "LOG_GUILD_ID": "1",
+    "LOG_CHANNEL_ID": "1",
+    "BOT_OWNER_ID": "1",
+    "DISCORD_CLIENT_ID": "1",
+}
+
+
+async def _skip_commands(message):
+    return None
+
+
+def load_bot(db_dir: str | None = None, workdir: str | None = None):
+    """Import main.py headless and return the module. Must run before anything imports main."""
+    workdir = workdir or tempfile.mkdtemp(prefix="chatcounter-bench-")
+    db_dir = db_dir or os.path.join(workdir, "db")
+    os.makedirs(db_dir, exist_ok=True)
+    for key, value in _DUMMY_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ["CHATCOUNTER_DB_DIR"] = db_dir
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+
+    import main
+
+    # Prefix commands need a logged-in bot user; ingestion is all we measure
+    main.bot.process_commands = _skip_commands
+    return main
+
+
+def dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def rss_bytes() -> int:
+    return psutil.Process(os.getpid()).memory_info().rss
+
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def fmt_bytes(num: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(num) < 1024:
+            return f"{num:.1f} {unit}"
+        num /= 1024
+    return f"{num:.2f} GiB"
@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import json
+import time
+
+from bench.harness import load_bot, dir_size, rss_bytes, peak_rss_bytes, percentile, fmt_bytes
+from bench.workload import Workload, MessageGenerator
+
+# ----- Ingestion benchmark -----
+# Drives the real on_message handler from main.py with synthetic messages.
+# on_message only marks guilds dirty; the bot writes them from the residency
+# loop, so the bench writes them (and a totals checkpoint) at the end of the
+# measured window, the same work the loop would have done for that batch.
+# Usage: python -m bench.ingest --messages 5000 --guilds 50 --users 5000
+
+
+async def run(main, generator: MessageGenerator, messages: int, warmup: int) -> dict:
+    from core.metrics import FLUSH_BYTES
+
+    for message in generator.messages(warmup):
+        await main.on_message(message)
+    main.RESIDENCY.flush()  # So the window only writes what the measured batch changed
+
+    batch = list(generator.messages(messages))
+    rss_before = rss_bytes()
+    flushed_before = FLUSH_BYTES.total()
+    latencies = []
+    started = time.perf_counter()
+    for message in batch:
+        t0 = time.perf_counter()
+        await main.on_message(message)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    flush_started = time.perf_counter()
+    main._record_flush("guilds", flush_started, main.RESIDENCY.flush())
+    checkpoint_started = time.perf_counter()
+    main._record_flush("totals", checkpoint_started, main.RESIDENCY.checkpoint_now(main.TOTALS))
+    flush_seconds = time.perf_counter() - flush_started
+    latencies.sort()
+    return {
+        "messages": messages,
+        "messages_per_sec": messages / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+        "seconds": elapsed,
+        "rss_growth_bytes": rss_bytes() - rss_before,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "bytes_written": int(FLUSH_BYTES.total() - flushed_before),
+        "flush_seconds": flush_seconds,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark on_message ingestion offline")
+    parser.add_argument("--messages", type=int, default=2000, help="Measured messages")
+    parser.add_argument("--warmup", type=int, default=200, help="Unmeasured messages ingested first")
+    parser.add_argument("--db-dir", default=None, help="Scratch db directory (default: a new temp dir)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    Workload.add_arguments(parser)
+    args = parser.parse_args()
+
+    workload = Workload.from_args(args)
+    main = load_bot(db_dir=args.db_dir)
+    generator = MessageGenerator(workload, dictionary=main.LEXICON.lists.get("en", ()))
+
+    results = asyncio.run(run(main, generator, args.messages, args.warmup))
+    results.update({
+        "workload": vars(workload),
+        "db_size_bytes": dir_size(main.DB_DIR),
+        "stats_rows": sum(len(users) for users in main.stats.values()),
+        "word_rows": sum(len(counts) for counts in main.words_stats.values()),
+        "vocabulary": len(main.VOCAB),
+    })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"Ingested {args.messages} messages ({args.warmup} warm-up) into {main.DB_DIR} in {results['seconds']:.2f}s")
+    print(f"  throughput     {results['messages_per_sec']:.1f} msg/s")
+    print(f"  latency        p50 {results['p50_ms']:.3f} ms | p99 {results['p99_ms']:.3f} ms | max {results['max_ms']:.3f} ms")
+    print(f"  peak RSS       {fmt_bytes(results['peak_rss_bytes'])} (+{fmt_bytes(results['rss_growth_bytes'])} during run)")
+    print(f"  bytes written  {fmt_bytes(results['bytes_written'])} in {results['flush_seconds']:.3f}s of flushing "
+          f"({fmt_bytes(results['db_size_bytes'])} on disk)")
+    print(f"  table rows     stats={results['stats_rows']} words_stats={results['word_rows']} vocab={results['vocabulary']}")
+
+
+if __name__ == "__main__":
+    main_cli()
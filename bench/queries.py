@@ -0,0 +1,237 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from bench.harness import load_bot, percentile, fmt_bytes, rss_bytes
+
+# ----- Stats command latency benchmark -----
+# Fills stats/words_stats with a large synthetic dataset and invokes every
+# command in bot/commands/stats.py through a fake Interaction, headless.
+# Usage: python -m bench.queries --guilds 1000 --users 100000 --word-rows 1000000 --budget-ms 500
+
+SCALES = {
+    "small": (100, 10_000, 100_000),
+    "medium": (1_000, 100_000, 1_000_000),
+    "full": (10_000, 1_000_000, 20_000_000),
+}
+
+
+class Recorder:
+    """Collects everything a command sends instead of talking to Discord."""
+
+    def __init__(self):
+        self.calls: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name):
+        async def record(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return record
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int, name: str = "bench"):
+        self.id = channel_id
+        self.name = name
+        self.sent = Recorder()
+
+    async def send(self, *args, **kwargs):
+        await self.sent.send(*args, **kwargs)
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, name: str):
+        self.id = guild_id
+        self.name = name
+        self.channel = FakeChannel(guild_id + 1)
+        self.filesize_limit = 10 * 1024 * 1024
+
+    def get_channel(self, channel_id):
+        return self.channel
+
+
+class FakeBot:
+    """Just enough of commands.Bot for the Stats cog and log_action."""
+
+    def __init__(self, log_guild_id: int):
+        self.log_guild = FakeGuild(log_guild_id, "log guild")
+
+    def get_user(self, user_id):
+        return None
+
+    def get_guild(self, guild_id):
+        return self.log_guild if guild_id == self.log_guild.id else None
+
+
+def fake_interaction(command, guild_id: int, user_id: int):
+    user = SimpleNamespace(id=user_id, name=f"user{user_id}")
+    guild = FakeGuild(guild_id, f"guild{guild_id}")
+    return SimpleNamespace(
+        id=random.getrandbits(62),
+        command=command,
+        guild=guild,
+        guild_id=guild_id,
+        channel=guild.channel,
+        user=user,
+        response=Recorder(),
+        followup=Recorder(),
+        extras={},
+    )
+
+
+def populate(stats: dict, words_stats: dict, vocab, vocabulary: list[str], dictionary: set,
+             guilds: int, users: int, word_rows: int, seed: int):
+    rng = random.Random(seed)
+    guild_ids = [str((1 << 50) + (g << 22)) for g in range(guilds)]
+    next_id = 0
+    for u in range(users):
+        uid = str((1 << 51) + (u << 22))
+        # Most users are in one guild, some in a few
+        for gid in rng.sample(guild_ids, k=min(guilds, 1 + int(rng.expovariate(2)))):
+            next_id += 1
+            messages = int(rng.paretovariate(1.2))
+            words = messages * rng.randint(3, 12)
+            stats.setdefault(gid, {})[uid] = {
+                "id": next_id, "entry_id": f"{next_id:08x}"[-8:], "user_id": uid, "guild_id": gid,
+                "messages": messages, "words": words, "characters": words * 5,
+            }
+
+    # Spread word rows over guilds with a Zipf skew so a few guilds dominate
+    weights = [1 / (rank ** 1.1) for rank in range(1, guilds + 1)]
+    scale = word_rows / sum(weights)
+    word_ids = [vocab.add(word, word in dictionary) for word in vocabulary]
+    for gid, weight in zip(guild_ids, weights):
+        n = max(1, min(len(vocabulary), int(weight * scale)))
+        words_stats[gid] = {widx: int(rng.paretovariate(1.1)) for widx in word_ids[:n]}
+    return guild_ids
+
+
+def command_arguments(qualified_name: str, guild_id: int, user) -> list[dict]:
+    """Argument sets to benchmark each command with."""
+    return {
+        "wordstats dictionary": [{"is_dict": True}],
+        "wordstats search": [{"word": "the"}],
+        "wordstats dump": [{"scope": "global"}, {"scope": "guild"}],
+        "topwords user": [{"user": user}],
+        "lb global": [{}, {"card": True}],
+        "topwords overall": [{}, {"card": True}],
+        "lb guild": [{"guild_id": guild_id}, {"guild_id": guild_id, "card": True}],
+        "topwords guild": [{"guild_id": guild_id}, {"guild_id": guild_id, "card": True}],
+        "topdict guild": [{"guild_id": guild_id}],
+        "nondict guild": [{"guild_id": guild_id}],
+        "export": [{"fmt": "csv"}, {"fmt": "ndjson"}],
+    }.get(qualified_name, [{}])
+
+
+async def run(cog, commands, guild_id: int, repeat: int) -> list[dict]:
+    results = []
+    user = SimpleNamespace(id=(1 << 51), name="bench-user")
+    for command in commands:
+        for kwargs in command_arguments(command.qualified_name, guild_id, user):
+            label = command.qualified_name + "".join(f" {k}={v}" for k, v in kwargs.items() if k != "user")
+            timings = []
+            interaction = None
+            for _ in range(repeat):
+                interaction = fake_interaction(command, guild_id, user.id)
+                started = time.perf_counter()
+                await command.callback(cog, interaction, **kwargs)
+                timings.append(time.perf_counter() - started)
+
+            # One extra traced run for peak allocation; tracemalloc slows execution, so it is not timed
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+            await command.callback(cog, fake_interaction(command, guild_id, user.id), **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            timings.sort()
+            sent = interaction.followup.calls + interaction.response.calls
+            results.append({
+                "command": label,
+                "name": command.qualified_name,
+                "p50_ms": percentile(timings, 0.5) * 1000,
+                "max_ms": timings[-1] * 1000,
+                "peak_alloc_bytes": peak,
+                "responses": [name for name, _, _ in sent],
+            })
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark stats slash commands against synthetic data")
+    parser.add_argument("--scale", choices=sorted(SCALES), default=None, help="Preset for guilds/users/word rows")
+    parser.add_argument("--guilds", type=int, default=SCALES["small"][0])
+    parser.add_argument("--users", type=int, default=SCALES["small"][1])
+    parser.add_argument("--word-rows", type=int, default=SCALES["small"][2])
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per command")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if any command's p50 exceeds this")
+    parser.add_argument("--budget", action="append", default=[], metavar="COMMAND=MS",
+                        help="Per-command budget, e.g. --budget 'lb global=250'")
+    parser.add_argument("--only", action="append", default=[], help="Only run commands whose name contains this")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    if args.scale:
+        args.guilds, args.users, args.word_rows = SCALES[args.scale]
+
+    main = load_bot()
+    from bench.workload import Workload, build_vocabulary
+    from bot.commands.stats import Stats
+    from config import LOG_GUILD_ID
+    from core.aggregator import guild_entry
+    from shared import stats, words_stats, VOCAB, TOTALS
+
+    vocabulary = build_vocabulary(Workload(vocabulary=args.vocabulary, seed=args.seed), main.LEXICON.lists.get("en", ()))
+    started = time.perf_counter()
+    guild_ids = populate(stats, words_stats, VOCAB, vocabulary, main.LEXICON.lists.get("en", ()),
+                         args.guilds, args.users, args.word_rows, args.seed)
+    for gid in guild_ids:
+        TOTALS.apply("local", [guild_entry(gid, stats.get(gid, {}), words_stats.get(gid, {}), VOCAB)])
+    load_seconds = time.perf_counter() - started
+    word_rows = sum(len(counts) for counts in words_stats.values())
+    stats_rows = sum(len(users) for users in stats.values())
+    print(f"Populated {stats_rows:,} stats rows and {word_rows:,} word rows "
+          f"in {load_seconds:.1f}s (RSS {fmt_bytes(rss_bytes())})", file=sys.stderr)
+
+    cog = Stats(FakeBot(LOG_GUILD_ID))
+    commands = [
+        cmd for cmd in cog.walk_app_commands()
+        if hasattr(cmd, "callback") and (not args.only or any(o in cmd.qualified_name for o in args.only))
+    ]
+    # Benchmark against the busiest guild
+    results = asyncio.run(run(cog, commands, int(guild_ids[0]), args.repeat))
+
+    budgets = {}
+    for spec in args.budget:
+        name, _, ms = spec.rpartition("=")
+        budgets[name.strip()] = float(ms)
+    failures = []
+    for result in results:
+        budget = budgets.get(result["command"], budgets.get(result["name"], args.budget_ms))
+        result["budget_ms"] = budget
+        result["ok"] = budget is None or result["p50_ms"] <= budget
+        if not result["ok"]:
+            failures.append(result)
+
+    if args.json:
+        print(json.dumps({"guilds": args.guilds, "users": args.users, "word_rows": args.word_rows,
+                          "results": results}, indent=2))
+    else:
+        width = max(len(r["command"]) for r in results)
+        print(f"{'command':<{width}}  {'p50 ms':>10}  {'max ms':>10}  {'peak alloc':>12}  budget")
+        for r in results:
+            budget = "-" if r["budget_ms"] is None else f"{r['budget_ms']:g} ms {'ok' if r['ok'] else 'FAIL'}"
+            print(f"{r['command']:<{width}}  {r['p50_ms']:10.2f}  {r['max_ms']:10.2f}  "
+                  f"{fmt_bytes(r['peak_alloc_bytes']):>12}  {budget}")
+    if failures:
+        print(f"{len(failures)} command(s) exceeded their latency budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,121 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+from types import SimpleNamespace
+
+from bench.harness import REPO_DIR, load_bot
+
+# ----- Headless startup benchmark -----
+# Measures cold start offline: each run is a fresh interpreter that imports
+# main.py against a scratch db/, loads every extension and runs on_ready with
+# the Discord REST calls (tree sync, command fetch, presence) stubbed out.
+# Usage: python -m bench.startup --runs 5 --stats-rows 100000 --word-rows 1000000
+
+
+def write_dataset(db_dir: str, stats_rows: int, word_rows: int, seed: int):
+    """Pre-fill counter.csv/words.csv; the first run migrates them to per-guild files, later runs load those."""
+    rng = random.Random(seed)
+    os.makedirs(db_dir, exist_ok=True)
+    guilds = [str((1 << 50) + (g << 22)) for g in range(max(1, stats_rows // 1000))]
+    with open(os.path.join(db_dir, "counter.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "entry_id", "user_id", "guild_id", "messages", "words", "characters"])
+        for i in range(1, stats_rows + 1):
+            messages = rng.randint(1, 5000)
+            writer.writerow([i, f"{i:08x}", (1 << 51) + (i << 22), rng.choice(guilds),
+                             messages, messages * 8, messages * 40])
+    per_guild = max(1, word_rows // len(guilds))
+    with open(os.path.join(db_dir, "vocab.tsv"), "w", encoding="utf-8") as f:
+        f.writelines(f"w{w}\t{int(w % 3 == 0)}\n" for w in range(per_guild))
+    with open(os.path.join(db_dir, "words.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["guild_id", "word_id", "count"])
+        i = 0
+        for gid in guilds:
+            for w in range(per_guild):
+                i += 1
+                if i > word_rows:
+                    break
+                writer.writerow([gid, w, rng.randint(1, 500)])
+
+
+async def _noop(*args, **kwargs):
+    return []
+
+
+async def _boot(main):
+    bot = main.bot
+    bot.tree.sync = _noop
+    bot.tree.fetch_commands = _noop
+    bot.change_presence = _noop
+    bot._connection.user = SimpleNamespace(id=1, name="bench-bot")
+    await main.on_ready()
+    from core.loopmon import LOOP_MONITOR
+    LOOP_MONITOR.stop()
+
+
+def run_child(db_dir: str):
+    main = load_bot(db_dir=db_dir)
+    asyncio.run(_boot(main))
+    from core.startup import STARTUP
+    print("STARTUP_JSON " + json.dumps(STARTUP.as_dict()))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Measure cold-start cost offline")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes to start")
+    parser.add_argument("--stats-rows", type=int, default=0, help="Rows to pre-fill counter.csv with")
+    parser.add_argument("--word-rows", type=int, default=0, help="Rows to pre-fill words.csv with")
+    parser.add_argument("--db-dir", default=None, help="Existing db directory to load instead of synthetic data")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.db_dir)
+        return
+
+    db_dir = args.db_dir
+    if db_dir is None:
+        db_dir = os.path.join(tempfile.mkdtemp(prefix="chatcounter-startup-"), "db")
+        write_dataset(db_dir, args.stats_rows, args.word_rows, args.seed)
+
+    runs = []
+    for _ in range(args.runs):
+        proc = subprocess.run(
+            [sys.executable, "-m", "bench.startup", "--child", "--db-dir", db_dir],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True,
+        )
+        line = next(l for l in proc.stdout.splitlines() if l.startswith("STARTUP_JSON "))
+        runs.append(json.loads(line.split(" ", 1)[1]))
+
+    phases: dict[str, list[float]] = {}
+    for run in runs:
+        for phase in run["phases"]:
+            phases.setdefault(phase["phase"], []).append(phase["duration"])
+    serving = [run["serving_after"] for run in runs]
+    summary = {
+        "runs": args.runs,
+        "db_dir": db_dir,
+        "serving_after_median": statistics.median(serving),
+        "phases_median": {name: statistics.median(values) for name, values in phases.items()},
+    }
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(f"Cold start over {args.runs} run(s) against {db_dir} (Discord calls stubbed)")
+    for name, value in summary["phases_median"].items():
+        print(f"  {value * 1000:9.1f} ms  {name}")
+    print(f"  serving commands after {summary['serving_after_median']:.2f}s (median)")
+
+
+if __name__ == "__main__":
+    main_cli()
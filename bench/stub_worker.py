@@ -0,0 +1,65 @@
+import asyncio
+import os
+import random
+import sys
+import time
+
+from bench.harness import load_bot
+from bench.workload import Workload, MessageGenerator
+
+# ----- Stub cluster worker -----
+# Stand-in for `python -m main` under `python cluster.py --stub`: imports main.py
+# headless and feeds on_message from a fake gateway that, like the real one,
+# only delivers messages for guilds on this worker's shards.
+#
+# Environment (besides CLUSTER_ID/SHARD_IDS/SHARD_COUNT set by cluster.py):
+#   STUB_RATE         messages per second to ingest (default 20)
+#   STUB_MESSAGES     stop cleanly after this many messages (default: run forever)
+#   STUB_CRASH_RATE   probability per message of crashing, to exercise restarts (default 0)
+
+
+async def gateway(main, generator: MessageGenerator, shard_ids: set[int], rate: float,
+                  limit: int | None, crash_rate: float):
+    main.AGGREGATOR.start()  # No-op unless cluster.py --aggregator set AGGREGATOR_SOCKET
+    ingested = 0
+    started = time.monotonic()
+    while limit is None or ingested < limit:
+        message = generator.message()
+        if message.guild.shard_id not in shard_ids:
+            continue
+        await main.on_message(message)
+        ingested += 1
+        if crash_rate and random.random() < crash_rate:
+            print(f"[stub {os.environ.get('CLUSTER_ID')}] simulated crash after {ingested} messages", flush=True)
+            os._exit(1)
+        if ingested % 100 == 0:
+            print(f"[stub {os.environ.get('CLUSTER_ID')}] {ingested} messages, "
+                  f"{sum(len(users) for users in main.stats.values())} stats rows", flush=True)
+        await asyncio.sleep(max(0.0, started + ingested / rate - time.monotonic()))
+
+    foreign = {gid for gid in main.stats if (int(gid) >> 22) % main.bot.shard_count not in shard_ids}
+    if foreign:
+        print(f"[stub {os.environ.get('CLUSTER_ID')}] owns stats for foreign guilds: {sorted(foreign)}", flush=True)
+        sys.exit(2)
+    await main.shutdown()
+
+
+def main_cli():
+    main = load_bot(db_dir=os.environ.get("CHATCOUNTER_DB_DIR"), workdir=os.getcwd())
+    from config import SHARD_IDS, SHARD_COUNT
+
+    shard_ids = set(SHARD_IDS or [0])
+    workload = Workload(guilds=50, users=2000, vocabulary=5000, shards=SHARD_COUNT or 1,
+                        seed=1000 + (int(os.environ.get("CLUSTER_ID", "0")) * 7919) + os.getpid())
+    generator = MessageGenerator(workload, dictionary=main.LEXICON.lists.get("en", ()))
+    limit = int(os.environ["STUB_MESSAGES"]) if os.environ.get("STUB_MESSAGES") else None
+    asyncio.run(gateway(
+        main, generator, shard_ids,
+        rate=float(os.environ.get("STUB_RATE", "20")),
+        limit=limit,
+        crash_rate=float(os.environ.get("STUB_CRASH_RATE", "0")),
+    ))
+
+
+if __name__ == "__main__":
+    main_cli()
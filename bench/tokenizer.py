@@ -0,0 +1,115 @@
+import argparse
+import json
+import random
+import string
+import time
+
+from bench.workload import Workload, MessageGenerator
+from core.text import KINDS, scan
+
+# ----- Tokenizer benchmark -----
+# Throughput of core.text.scan against the whitespace split + punctuation strip
+# it replaced, over synthetic messages of which a share carry Discord markup
+# (mentions, custom and unicode emoji, URLs, code) and punctuation.
+# Usage: python -m bench.tokenizer --messages 200000 --markup-ratio 0.2
+
+PUNCTUATION = string.punctuation + "“”‘’"
+DECORATIONS = (
+    lambda rng: f"<@{rng.getrandbits(60)}>",
+    lambda rng: f"<@&{rng.getrandbits(60)}>",
+    lambda rng: f"<#{rng.getrandbits(60)}>",
+    lambda rng: f"<:pog{rng.randint(0, 99)}:{rng.getrandbits(60)}>",
+    lambda rng: rng.choice(("\U0001f602", "❤️", "\U0001f44d\U0001f3fd", "\U0001f1f8\U0001f1ec")),
+    lambda rng: f"https://example.com/{rng.getrandbits(32):x}?page={rng.randint(1, 9)}",
+    lambda rng: "`print(value)`",
+    lambda rng: "```py\nfor i in range(10):\n    total += i\n```",
+)
+
+
+def clean_token(token: str) -> str:
+    return token.strip(PUNCTUATION).lower()
+
+
+def split_strip(content: str) -> list[str]:
+    """The previous tokenizer: whitespace tokens with punctuation stripped from both ends."""
+    words = []
+    for token in content.split():
+        w = clean_token(token)
+        if w:
+            words.append(w)
+    return words
+
+
+def build_corpus(generator: MessageGenerator, messages: int, markup_ratio: float, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(messages):
+        words = generator.content().split()
+        if rng.random() < 0.5:
+            words[-1] += rng.choice((".", "!", "?", ","))
+            words[0] = words[0].capitalize()
+        if rng.random() < markup_ratio:
+            for _ in range(rng.randint(1, 3)):
+                words.insert(rng.randint(0, len(words)), rng.choice(DECORATIONS)(rng))
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def measure(tokenizers: dict, corpus: list[str], repeat: int) -> dict:
+    """Best time per tokenizer over `repeat` passes, alternating between them so drift hits both alike."""
+    best = dict.fromkeys(tokenizers, float("inf"))
+    for _ in range(repeat):
+        for name, tokenize in tokenizers.items():
+            started = time.perf_counter()
+            for content in corpus:
+                tokenize(content)
+            best[name] = min(best[name], time.perf_counter() - started)
+    return {
+        name: {"seconds": seconds, "messages_per_sec": len(corpus) / seconds if seconds else 0.0,
+               "us_per_message": seconds / len(corpus) * 1e6 if corpus else 0.0}
+        for name, seconds in best.items()
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark the message tokenizer offline")
+    parser.add_argument("--messages", type=int, default=100_000, help="Messages in the corpus")
+    parser.add_argument("--markup-ratio", type=float, default=0.2, help="Share of messages with mentions, emoji, URLs or code")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over the corpus; the fastest is reported")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    Workload.add_arguments(parser)
+    args = parser.parse_args()
+
+    workload = Workload.from_args(args)
+    corpus = build_corpus(MessageGenerator(workload), args.messages, args.markup_ratio, workload.seed)
+
+    kinds = [0] * len(KINDS)
+    scan_words = split_words = 0
+    for content in corpus:
+        words, counts = scan(content)
+        scan_words += len(words)
+        split_words += len(split_strip(content))
+        if counts:
+            kinds = [a + b for a, b in zip(kinds, counts)]
+    results = {
+        "messages": len(corpus),
+        **measure({"split_strip": split_strip, "scan": scan}, corpus, args.repeat),
+        "words": {"split_strip": split_words, "scan": scan_words},
+        "kinds": dict(zip(KINDS, kinds)),
+    }
+    results["speedup"] = results["split_strip"]["seconds"] / results["scan"]["seconds"] if results["scan"]["seconds"] else 0.0
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"Tokenized {len(corpus)} messages ({args.markup_ratio:.0%} with markup), best of {args.repeat}")
+    for name in ("split_strip", "scan"):
+        r = results[name]
+        print(f"  {name:12} {r['messages_per_sec']:>12,.0f} msg/s | {r['us_per_message']:.2f} us/msg | "
+              f"{results['words'][name]:,} words")
+    print(f"  speedup      {results['speedup']:.2f}x")
+    print("  kinds        " + " ".join(f"{kind}={count}" for kind, count in results["kinds"].items()))
+
+
+if __name__ == "__main__":
+    main_cli()
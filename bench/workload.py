@@ -0,0 +1,119 @@
+import itertools
+import random
+import string
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+# ----- Synthetic workload -----
+# Deterministic fake guilds, users and messages shaped like real chat traffic:
+# Zipf-distributed vocabulary, log-normal message lengths and a configurable
+# share of dictionary vs non-dictionary words.
+
+
+@dataclass
+class Workload:
+    guilds: int = 20
+    users: int = 2000
+    vocabulary: int = 20000
+    zipf_s: float = 1.1
+    mean_words: float = 8.0
+    sigma_words: float = 0.8
+    max_words: int = 200
+    dict_ratio: float = 0.7
+    shards: int = 1
+    seed: int = 1234
+
+    @staticmethod
+    def add_arguments(parser):
+        parser.add_argument("--guilds", type=int, default=Workload.guilds)
+        parser.add_argument("--users", type=int, default=Workload.users, help="Distinct authors across all guilds")
+        parser.add_argument("--vocabulary", type=int, default=Workload.vocabulary, help="Distinct words to draw from")
+        parser.add_argument("--zipf-s", type=float, default=Workload.zipf_s, help="Zipf exponent of word frequencies")
+        parser.add_argument("--mean-words", type=float, default=Workload.mean_words, help="Median words per message")
+        parser.add_argument("--sigma-words", type=float, default=Workload.sigma_words, help="Log-normal sigma of message length")
+        parser.add_argument("--max-words", type=int, default=Workload.max_words)
+        parser.add_argument("--dict-ratio", type=float, default=Workload.dict_ratio, help="Share of vocabulary taken from the dictionary")
+        parser.add_argument("--shards", type=int, default=Workload.shards)
+        parser.add_argument("--seed", type=int, default=Workload.seed)
+
+    @classmethod
+    def from_args(cls, args) -> "Workload":
+        return cls(
+            guilds=args.guilds, users=args.users, vocabulary=args.vocabulary, zipf_s=args.zipf_s,
+            mean_words=args.mean_words, sigma_words=args.sigma_words, max_words=args.max_words,
+            dict_ratio=args.dict_ratio, shards=args.shards, seed=args.seed,
+        )
+
+
+def _random_token(rng: random.Random) -> str:
+    length = rng.randint(3, 12)
+    return "".join(rng.choices(string.ascii_lowercase + string.digits, k=length))
+
+
+def build_vocabulary(workload: Workload, dictionary=()) -> list[str]:
+    """Vocabulary ordered by rank: rank 0 is the most frequent word."""
+    rng = random.Random(workload.seed)
+    dictionary = sorted(dictionary)
+    n_dict = min(len(dictionary), int(workload.vocabulary * workload.dict_ratio))
+    words = rng.sample(dictionary, n_dict) if n_dict else []
+    seen = set(words)
+    while len(words) < workload.vocabulary:
+        token = _random_token(rng)
+        if token not in seen:
+            seen.add(token)
+            words.append(token)
+    rng.shuffle(words)
+    return words
+
+
+class MessageGenerator:
+    def __init__(self, workload: Workload, dictionary=()):
+        self.workload = workload
+        self.rng = random.Random(workload.seed + 1)
+        self.vocabulary = build_vocabulary(workload, dictionary)
+        weights = [1 / (rank ** workload.zipf_s) for rank in range(1, len(self.vocabulary) + 1)]
+        self.cum_weights = list(itertools.accumulate(weights))
+        # Snowflake-shaped IDs so (guild_id >> 22) % shards spreads guilds over shards
+        self.guild_ids = [(1 << 50) + (g << 22) for g in range(workload.guilds)]
+        self.user_ids = [(1 << 51) + (u << 22) for u in range(workload.users)]
+        # Users post in one home guild; guild sizes follow the same Zipf skew
+        guild_weights = list(itertools.accumulate(1 / (rank ** workload.zipf_s) for rank in range(1, workload.guilds + 1)))
+        self.home_guild = {
+            uid: self.rng.choices(self.guild_ids, cum_weights=guild_weights)[0] for uid in self.user_ids
+        }
+        self._message_ids = itertools.count(1 << 52)
+
+    def message_length(self) -> int:
+        length = int(self.rng.lognormvariate(0, self.workload.sigma_words) * self.workload.mean_words)
+        return max(1, min(self.workload.max_words, length))
+
+    def content(self) -> str:
+        words = self.rng.choices(self.vocabulary, cum_weights=self.cum_weights, k=self.message_length())
+        return " ".join(words)
+
+    def message(self) -> SimpleNamespace:
+        """A stand-in for discord.Message with just the attributes ingestion reads."""
+        uid = self.rng.choice(self.user_ids)
+        gid = self.home_guild[uid]
+        return fake_message(
+            content=self.content(),
+            author_id=uid,
+            guild_id=gid,
+            shard_id=(gid >> 22) % self.workload.shards,
+            message_id=next(self._message_ids),
+        )
+
+    def messages(self, count: int):
+        for _ in range(count):
+            yield self.message()
+
+
+def fake_message(content: str, author_id: int, guild_id: int, shard_id: int = 0, message_id: int = 0,
+                 channel_id: int = 0, bot: bool = False) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=message_id,
+        content=content,
+        author=SimpleNamespace(id=author_id, bot=bot, name=f"user{author_id}", display_name=f"user{author_id}"),
+        guild=SimpleNamespace(id=guild_id, shard_id=shard_id, name=f"guild{guild_id}"),
+        channel=SimpleNamespace(id=channel_id or guild_id, name="general"),
+    )
@@ -7,6 +7,8 @@ import random
 import re
 import sys
 import csv
+import io
+import itertools
 from datetime import datetime
 
 from bs4 import BeautifulSoup
@@ -18,6 +20,48 @@ import psutil
 from discord.ext import commands
 from discord import app_commands
 from core.logger import log_action
+from core.loopmon import LOOP_MONITOR
+from core.profiler import run_profile
+from core.startup import STARTUP
+from core.command_registry import COMMAND_REGISTRY
+from core.memory import measure, snapshot_table
+from core.channels import ChannelStats
+from core.cards import CARDS
+from core.reclassify import RECLASSIFIER
+from shared import stats as counter_stats, words_stats, channel_stats, VOCAB, LEXICON, TOTALS, NAMES
+from core.metrics import (
+    REGISTRY, MESSAGES_INGESTED, ON_MESSAGE_SECONDS, FLUSH_SECONDS, FLUSH_LAST_BYTES,
+    COMMAND_SECONDS, TABLE_ROWS, GUILDS_RESIDENT, GUILD_CHURN_EVENTS, CHURN_UPDATES, CHURN_UPDATES_SAVED,
+)
+
+# Split text into pages on line boundaries so each fits in a code block
+def _paginate_lines(text: str, limit: int = 1900) -> list[str]:
+    pages, current = [], ""
+    for line in text.splitlines():
+        if current and len(current) + len(line) + 1 > limit:
+            pages.append(current)
+            current = ""
+        current += line[:limit] + "\n"
+    if current:
+        pages.append(current)
+    return pages or ["(empty)"]
+
+# Human-readable byte sizes, with an optional signed variant for growth
+def _size(num: float, signed: bool = False) -> str:
+    sign = ("+" if num >= 0 else "-") if signed else ""
+    num = abs(num)
+    for unit in ("B", "KiB", "MiB"):
+        if num < 1024:
+            return f"{sign}{num:.1f} {unit}"
+        num /= 1024
+    return f"{sign}{num:.2f} GiB"
+
+# Previous /dev memory report, kept at module level so growth survives cog reloads of Admin
+_last_memory_report: dict | None = None
+
+# Format a histogram quantile (seconds) as milliseconds
+def _ms(seconds) -> str:
+    return "n/a" if seconds is None else f"{seconds * 1000:.2f} ms"
 
 class EvalPager(discord.ui.View):
     def __init__(self, pages):
@@ -107,6 +151,21 @@ class SessionsPager(discord.ui.View):
 class Admin(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # Previous per-shard ingest counters, used to turn totals into rates
+        self._last_ingest = (REGISTRY.started_at, {})
+
+    def _ingest_rates(self) -> dict[str, float]:
+        """Messages/sec per shard since the previous /dev stats call."""
+        now = time.time()
+        last_time, last_counts = self._last_ingest
+        counts = {key[0]: value for key, value in MESSAGES_INGESTED.values().items()}
+        elapsed = max(now - last_time, 1e-9)
+        rates = {
+            shard: (count - last_counts.get(shard, 0)) / elapsed
+            for shard, count in counts.items()
+        }
+        self._last_ingest = (now, counts)
+        return rates
 
     dev = app_commands.Group(
         name="dev",
@@ -120,10 +179,10 @@ class Admin(commands.Cog):
     @app_commands.check(lambda inter: inter.user.id == BOT_OWNER_ID)
     async def restart(self, interaction: discord.Interaction):
         """Usage: /dev restart"""
-        await interaction.response.send_message("🔄 Restarting…", ephemeral=True)
-        await self.bot.close()
-        os.execv(sys.executable, [sys.executable, "-m", "main"])
+        await interaction.response.send_message("🔄 Saving stats and restarting…", ephemeral=True)
         await log_action(self.bot, interaction)
+        self.bot.restart_requested = True  # main.py execs the new process once the bot has closed
+        await self.bot.close()  # Flushes everything and writes the warm-restart checkpoint
 
     @restart.error
     async def restart_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
@@ -150,6 +209,98 @@ class Admin(commands.Cog):
         embed.add_field(name="CPU Usage", value=f"{cpu:.2f}%", inline=True)
         embed.add_field(name="Memory Usage", value=f"{mem:.2f} MB", inline=True)
         embed.add_field(name="Event Loop Lag", value=f"{lag_ms:.2f} ms", inline=True)
+
+        if LOOP_MONITOR.running:
+            lag_lines = []
+            for window in LOOP_MONITOR.windows:
+                pct = LOOP_MONITOR.percentiles(window)
+                if pct is None:
+                    continue
+                lag_lines.append(
+                    f"{window // 60}m: p50 {_ms(pct['p50'])} | p95 {_ms(pct['p95'])} | "
+                    f"p99 {_ms(pct['p99'])} | max {_ms(pct['max'])}"
+                )
+            embed.add_field(name="Loop Lag (rolling)", value="\n".join(lag_lines) or "No samples yet", inline=False)
+            stalls = LOOP_MONITOR.recent_stalls()
+            embed.add_field(
+                name=f"Recent Stalls (>{_ms(LOOP_MONITOR.threshold)})",
+                value="\n".join(
+                    f"<t:{int(at)}:R> {_ms(duration)} in {handler} ({callback})"
+                    for at, duration, handler, callback in stalls
+                ) or "None recorded",
+                inline=False
+            )
+
+        rates = self._ingest_rates()
+        ingest_lines = [
+            f"Shard {shard}: {rate:.2f} msg/s"
+            for shard, rate in sorted(rates.items(), key=lambda kv: int(kv[0]))
+        ]
+        ingest_lines.append(f"Total: {int(MESSAGES_INGESTED.total())} messages")
+        embed.add_field(name="Ingest Rate", value="\n".join(ingest_lines), inline=False)
+        embed.add_field(
+            name="on_message",
+            value=(
+                f"p50 {_ms(ON_MESSAGE_SECONDS.quantile(0.5))} | "
+                f"p99 {_ms(ON_MESSAGE_SECONDS.quantile(0.99))} | "
+                f"{ON_MESSAGE_SECONDS.count()} samples"
+            ),
+            inline=False
+        )
+        flush_lines = []
+        for table in ("guilds", "vocab", "totals"):
+            flush_lines.append(
+                f"{table}: p50 {_ms(FLUSH_SECONDS.quantile(0.5, table=table))} | "
+                f"p99 {_ms(FLUSH_SECONDS.quantile(0.99, table=table))} | "
+                f"last {FLUSH_LAST_BYTES.value(table=table) / 1024:.1f} KiB"
+            )
+        embed.add_field(name="Persistence Flush", value="\n".join(flush_lines), inline=False)
+        embed.add_field(
+            name="Table Sizes",
+            value="\n".join(
+                [f"{key[0]}: {int(rows)} rows" for key, rows in sorted(TABLE_ROWS.values().items())]
+                + [f"guilds: {int(GUILDS_RESIDENT.value(state='resident'))} resident | "
+                   f"{int(GUILDS_RESIDENT.value(state='archived'))} archived",
+                   f"names: {len(NAMES)} cached"]
+            ),
+            inline=False
+        )
+        embed.add_field(
+            name="Guild Churn",
+            value=(
+                f"{int(GUILD_CHURN_EVENTS.total())} joins/removals | "
+                f"{int(CHURN_UPDATES.value(kind='presence'))} presence updates | "
+                f"{int(CHURN_UPDATES_SAVED.value(kind='presence'))} presence updates and "
+                f"{int(CHURN_UPDATES_SAVED.value(kind='member refresh'))} member refreshes saved"
+            ),
+            inline=False
+        )
+        if STARTUP.serving_after is not None:
+            startup_lines = [f"Serving after {STARTUP.serving_after:.2f}s"]
+            startup_lines += [f"{name}: {_ms(duration)}" for name, _, duration in STARTUP.slowest(4)]
+            if STARTUP.reconnects:
+                at, kind, downtime = STARTUP.reconnects[-1]
+                startup_lines.append(
+                    f"Last reconnect <t:{int(at)}:R> ({kind}) after {downtime:.1f}s down, "
+                    f"{len(STARTUP.reconnects)} recent"
+                )
+            if STARTUP.reconnect_phases:
+                startup_lines.append(
+                    "Last reconnect phases: " + ", ".join(
+                        f"{name} {_ms(duration)}" for name, _, duration in list(STARTUP.reconnect_phases)[-3:]
+                    )
+                )
+            embed.add_field(name="Startup", value="\n".join(startup_lines), inline=False)
+        slowest = sorted(
+            ((key[0], COMMAND_SECONDS.quantile(0.95, command=key[0])) for key in COMMAND_SECONDS.values()),
+            key=lambda kv: kv[1] or 0,
+            reverse=True
+        )[:5]
+        embed.add_field(
+            name="Slowest Commands (p95)",
+            value="\n".join(f"/{name}: {_ms(p95)}" for name, p95 in slowest) or "No commands yet",
+            inline=False
+        )
         await interaction.response.send_message(embed=embed, ephemeral=True)
         await log_action(self.bot, interaction)
 
@@ -185,6 +336,26 @@ class Admin(commands.Cog):
         await interaction.response.send_message("\n".join(msg), ephemeral=True)
         await log_action(self.bot, interaction)
 
+    @dev.command(
+        name="reclassify",
+        description="Re-read the dictionaries and update the dictionary flag of every known word"
+    )
+    @app_commands.check(lambda inter: inter.user.id == BOT_OWNER_ID)
+    async def reclassify(self, interaction: discord.Interaction):
+        """Usage: /dev reclassify (shows progress if one is already running)"""
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        task = RECLASSIFIER.start()
+        message = await interaction.followup.send(f"⏳ {RECLASSIFIER.progress()}", ephemeral=True, wait=True)
+        while not task.done():
+            await asyncio.wait({task}, timeout=2)
+            if not task.done():
+                await message.edit(content=f"⏳ {RECLASSIFIER.progress()}")
+        if task.exception() is not None:
+            await message.edit(content=f"❌ Reclassification failed: {task.exception()}")
+        else:
+            await message.edit(content=f"✅ {RECLASSIFIER.progress()}")
+        await log_action(self.bot, interaction)
+
     @dev.command(
         name="sync",
         description="Force a slash-command sync (global or to a specific guild ID)"
@@ -194,10 +365,10 @@ class Admin(commands.Cog):
     async def sync(self, interaction: discord.Interaction, guild_id: int = None):
         """Usage: /dev sync [guild_id]"""
         if guild_id:
-            await self.bot.tree.sync(guild=discord.Object(id=guild_id))
+            await COMMAND_REGISTRY.sync(self.bot.tree, guild=discord.Object(id=guild_id), force=True)
             msg = f"🔄 Synced commands to guild `{guild_id}`."
         else:
-            await self.bot.tree.sync()
+            await COMMAND_REGISTRY.sync(self.bot.tree, force=True)
             msg = "🔄 Synced commands globally."
         await interaction.response.send_message(msg, ephemeral=True)
         await log_action(self.bot, interaction)
@@ -251,6 +422,131 @@ class Admin(commands.Cog):
 
         await log_action(self.bot, interaction)
 
+    @dev.command(
+        name="profile",
+        description="Profile the live bot (CPU and/or allocations) for a number of seconds"
+    )
+    @app_commands.describe(
+        seconds="How long to profile for (1-120 seconds)",
+        mode="What to profile: cpu, memory or both"
+    )
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="both", value="both"),
+        app_commands.Choice(name="cpu", value="cpu"),
+        app_commands.Choice(name="memory", value="memory"),
+    ])
+    @app_commands.check(lambda inter: inter.user.id == BOT_OWNER_ID)
+    async def profile(
+        self,
+        interaction: discord.Interaction,
+        seconds: app_commands.Range[int, 1, 120] = 10,
+        mode: str = "both"
+    ):
+        """Usage: /dev profile [seconds] [mode]"""
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            summary, report = await run_profile(
+                seconds, cpu=mode in ("both", "cpu"), memory=mode in ("both", "memory")
+            )
+        except RuntimeError as e:
+            return await interaction.followup.send(f"❌ {e}", ephemeral=True)
+
+        pages = _paginate_lines(summary)
+        report_file = discord.File(
+            io.BytesIO(report.encode("utf-8")),
+            filename=f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt"
+        )
+        view = EvalPager(pages)
+        await interaction.followup.send(
+            f"```py\n{pages[0]}\n```", view=view, file=report_file, ephemeral=True
+        )
+        await log_action(self.bot, interaction)
+
+    def _memory_snapshot(self) -> dict:
+        """Copies (or samples) of the stats tables and shallow copies of the rest, for measure() in a thread."""
+        stop_types = (discord.Client, discord.Guild, asyncio.AbstractEventLoop, type(self.bot._connection))
+        view_store = getattr(self.bot._connection, "_view_store", None)
+        views = {}
+        if view_store is not None:
+            for items in list(view_store._views.values()):
+                for item in list(items.values()):
+                    if item.view is not None:
+                        views[id(item.view)] = item.view
+            for view in list(view_store._synced_message_views.values()):
+                views[id(view)] = view
+
+        # Sample up to ~500 cached members spread across guilds and scale to the full cache
+        members, total_members = [], 0
+        guilds = list(self.bot.guilds)
+        per_guild = max(1, 500 // max(1, len(guilds)))
+        for guild in guilds:
+            total_members += len(guild._members)
+            members.extend(itertools.islice(guild._members.values(), per_guild))
+
+        return {
+            "stats": snapshot_table(counter_stats, copy_value=dict),
+            "words_stats": snapshot_table(words_stats),  # Counts are ints; nothing to copy
+            "channel_stats": snapshot_table(channel_stats, copy_value=ChannelStats.copy,
+                                            inner=lambda channels: channels.channels),
+            "vocabulary": {"objects": [VOCAB], "count": len(VOCAB)},
+            "global totals": {"objects": [TOTALS], "count": len(TOTALS.user_totals) + len(TOTALS.words)},
+            "name cache": {"objects": [NAMES._names], "count": len(NAMES)},
+            "leaderboard cards": {"objects": [CARDS._cache], "count": len(CARDS)},
+            # Word lists are memory-mapped files; only their offset indexes and the per-word masks are heap
+            "dictionaries": {
+                "objects": [LEXICON.masks, *(words.offsets for words in LEXICON.lists.values())],
+                "count": sum(len(words) for words in LEXICON.lists.values()),
+            },
+            "pagination views": {"objects": list(views.values()), "stop_types": stop_types},
+            "member cache": {"objects": members, "scale": total_members, "stop_types": stop_types},
+        }
+
+    @dev.command(
+        name="memory",
+        description="Show deep memory usage of the in-memory stats tables and caches"
+    )
+    @app_commands.check(lambda inter: inter.user.id == BOT_OWNER_ID)
+    async def memory(self, interaction: discord.Interaction):
+        """Usage: /dev memory"""
+        global _last_memory_report
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        report = await asyncio.to_thread(measure, self._memory_snapshot())
+        previous = _last_memory_report or {}
+
+        rss = psutil.Process(os.getpid()).memory_info().rss
+        embed = discord.Embed(title="Memory Breakdown", color=discord.Color.blurple())
+        embed.add_field(name="Process RSS", value=_size(rss), inline=False)
+        for name, section in report.items():
+            if name.startswith("_"):
+                continue
+            value = f"{section['rows']:,} rows | {'~' if section['estimated'] else ''}{_size(section['bytes'])}"
+            if name in previous:
+                value += (
+                    f"\nΔ {section['rows'] - previous[name]['rows']:+,} rows | "
+                    f"{_size(section['bytes'] - previous[name]['bytes'], signed=True)}"
+                )
+            embed.add_field(name=name, value=value, inline=True)
+
+        words = report["words_stats"]
+        previous_groups = previous.get("words_stats", {}).get("groups", {})
+        largest = sorted(words["groups"].items(), key=lambda kv: kv[1][1], reverse=True)[:10]
+        lines = []
+        for gid, (rows, size) in largest:
+            guild_obj = self.bot.get_guild(int(gid)) if str(gid).isdigit() else None
+            line = f"{guild_obj.name if guild_obj else gid}: {rows:,} words | {_size(size)}"
+            if gid in previous_groups:
+                line += f" ({_size(size - previous_groups[gid][1], signed=True)})"
+            lines.append(line)
+        embed.add_field(name="Largest Guilds by Word Table", value="\n".join(lines) or "No word data", inline=False)
+        if previous:
+            embed.description = f"Growth since previous sample <t:{int(previous['_taken_at'])}:R>"
+        embed.set_footer(text=f"Measured in {report['_elapsed']:.2f}s off-loop")
+
+        report["_taken_at"] = time.time()
+        _last_memory_report = report
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        await log_action(self.bot, interaction)
+
     @dev.command(
         name="sessions",
         description="Display session data from sessions.csv"
@@ -3,6 +3,7 @@ import random
 from discord.ext import commands
 from discord import app_commands
 from core.logger import log_action
+from core.command_registry import COMMAND_REGISTRY
 
 class HelpView(discord.ui.View):
     def __init__(self, pages: list[discord.Embed]):
@@ -44,13 +45,11 @@ class HelpView(discord.ui.View):
 class General(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.command_ids = {}  # Store command IDs dynamically
 
-    async def fetch_command_ids(self):
-        """Fetch and store command IDs after syncing."""
-        commands = await self.bot.tree.fetch_commands()
-        for cmd in commands:
-            self.command_ids[cmd.name] = cmd.id
+    @property
+    def command_ids(self) -> dict[str, int]:
+        """Command IDs from the persisted registry, kept current by on_ready and /dev sync."""
+        return COMMAND_REGISTRY.ids()
 
     @app_commands.command(name="ping", description="Check the bot's latency.")
     async def ping(self, interaction: discord.Interaction):
@@ -88,10 +87,11 @@ class General(commands.Cog):
 
         # Collect commands grouped by Cog
         cog_commands: dict[str, list[str]] = {}
+        command_ids = self.command_ids
         for cog_name, cog in self.bot.cogs.items():
             lines: list[str] = []
             for cmd in cog.get_app_commands():
-                cmd_id = self.command_ids.get(cmd.name)
+                cmd_id = command_ids.get(cmd.name)
                 mention = f"</{cmd.name}:{cmd_id}>" if cmd_id else f"/{cmd.name}"
                 lines.append(f"**{mention}** - {cmd.description}\n")
             if lines:
@@ -152,7 +152,4 @@ class General(commands.Cog):
         ]
 
 async def setup(bot):
-    cog = General(bot)
-    await cog.fetch_command_ids()  # Fetch IDs before adding the cog
-    await bot.add_cog(cog)
-    # Fetch command IDs in the on_ready event instead of here
+    await bot.add_cog(General(bot))
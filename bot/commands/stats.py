@@ -1,6 +1,9 @@
-import csv
-import os
+import asyncio
+import heapq
 import datetime
+import io
+import tempfile
+from operator import itemgetter
 from zoneinfo import ZoneInfo
 from typing import Optional
 
@@ -10,8 +13,13 @@ from discord.ext import commands
 
 from config import BOT_OWNER_ID, LOG_GUILD_ID
 from core.logger import log_action
-from shared import stats, words_stats
-from main import WORDS_FILE
+from shared import stats, words_stats, channel_stats, guild_ranks, VOCAB, LEXICON, RESIDENCY, TOTALS, NAMES, RECENT
+from core.aggregator import AGGREGATOR, AggregatorUnavailable
+from core.export import FORMATS, compressions, export_table
+from core.cards import CARDS, available as cards_available
+from core.text import KINDS
+from core.channels import channel_of
+from core.ranks import RankIndex
 
 # Pagination view for dump command
 class DumpView(discord.ui.View):
@@ -30,9 +38,53 @@ class DumpView(discord.ui.View):
         self.current = (self.current + 1) % len(self.pages)
         await interaction.response.edit_message(embed=self.pages[self.current], view=self)
 
+# Top n (word, count) pairs from {word index: count}; `flag` keeps only dictionary (True) or non-dictionary (False)
+# words, judged by the word lists in the locale `mask` (the default locales if omitted)
+def _top_words(counts: dict[int, int], n: int = 10, flag: Optional[bool] = None,
+               mask: Optional[int] = None) -> list[tuple[str, int]]:
+    items = counts.items()
+    if flag is not None and (mask is None or mask == LEXICON.default_mask):
+        is_dict = VOCAB.is_dict
+        items = ((widx, count) for widx, count in items if bool(is_dict[widx]) == flag)
+    elif flag is not None:
+        classify = LEXICON.classify
+        items = ((widx, count) for widx, count in items if bool(classify(widx) & mask) == flag)
+    return [(VOCAB.words[widx], count) for widx, count in heapq.nlargest(n, items, key=itemgetter(1))]
+
 class Stats(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self._exporting: set[int] = set()  # Guilds with an export in progress
+
+    # Global top-10 tables come from the aggregator when the bot is split across processes,
+    # otherwise from this process's running totals. Returns (rows, footer note).
+    async def _aggregated_top(self, table: str) -> tuple[list, Optional[str]]:
+        if AGGREGATOR.enabled:
+            try:
+                return await AGGREGATOR.top(table, 10), None
+            except AggregatorUnavailable:
+                return TOTALS.top(table, 10), "Aggregator unreachable: showing this process's guilds only"
+        return TOTALS.top(table, 10), None
+
+    # Data version of the global tables, for reusing rendered cards; None when another process owns them
+    def _global_version(self):
+        return None if AGGREGATOR.enabled else TOTALS.version
+
+    # Send a top-10 board as embed fields, or with `card` as an image rendered off the event loop.
+    # `lines` are (label, value text, value) per rank; cards are reused while `version` and the lines are unchanged.
+    async def _send_board(self, interaction: discord.Interaction, embed: discord.Embed, title: str,
+                          lines: list[tuple[str, str, int]], card: bool, scope: str, version):
+        if card and cards_available():
+            png = await CARDS.render(scope, version, title, embed.description, lines)
+            embed.set_image(url="attachment://leaderboard.png")
+            await interaction.followup.send(embed=embed, file=discord.File(io.BytesIO(png), filename="leaderboard.png"))
+            return
+        if card:
+            note = "Image cards are unavailable: Pillow is not installed"
+            embed.set_footer(text=f"{embed.footer.text} | {note}" if embed.footer.text else note)
+        for rank, (label, text, _) in enumerate(lines, start=1):
+            embed.add_field(name=f"{rank}. {label}", value=text, inline=False)
+        await interaction.followup.send(embed=embed)
 
     # ===== Server Stats Command =====
     @app_commands.command(
@@ -47,44 +99,38 @@ class Stats(commands.Cog):
             return
 
         gid_str = str(guild.id)
+        RESIDENCY.ensure(gid_str)
         # Total word count in this guild
-        total_words = 0
-        word_counts: dict[str, int] = {}
-        dict_counts: dict[str, int] = {}
-        non_dict_counts: dict[str, int] = {}
-
-        for rec in words_stats.values():
-            if rec.get('guild_id') != gid_str:
-                continue
-            word = rec['word']
-            count = rec['count']
-            total_words += count
-            # aggregate overall
-            word_counts[word] = word_counts.get(word, 0) + count
-            # aggregate by dict flag
-            if rec.get('is_dict'):
-                dict_counts[word] = dict_counts.get(word, 0) + count
-            else:
-                non_dict_counts[word] = non_dict_counts.get(word, 0) + count
+        counts = words_stats.get(gid_str, {})
+        total_words = sum(counts.values())
 
         # Determine most-used words
-        most_used_word = max(word_counts.items(), key=lambda kv: kv[1])[0] if word_counts else None
-        most_dict_word = max(dict_counts.items(), key=lambda kv: kv[1])[0] if dict_counts else None
-        most_non_dict_word = max(non_dict_counts.items(), key=lambda kv: kv[1])[0] if non_dict_counts else None
+        mask = LEXICON.guild_mask(gid_str)
+
+        def most_used(flag: Optional[bool] = None) -> Optional[str]:
+            top = _top_words(counts, 1, flag, mask)
+            return top[0][0] if top else None
+
+        most_used_word = most_used()
+        most_dict_word = most_used(True)
+        most_non_dict_word = most_used(False)
 
         # Most chatty member (by message count)
-        chatty_totals: dict[str, int] = {}
-        for (uid, gid), rec in stats.items():
-            if gid != gid_str:
-                continue
-            chatty_totals[uid] = chatty_totals.get(uid, 0) + rec.get('messages', 0)
-        if chatty_totals:
-            top_uid, _ = max(chatty_totals.items(), key=lambda kv: kv[1])
-            member = self.bot.get_user(int(top_uid))
-            most_chatty = member.name if member else f"Unknown User ({top_uid})"
+        users = stats.get(gid_str, {})
+        if users:
+            top_uid = max(users.items(), key=lambda kv: kv[1].get('messages', 0))[0]
+            names = await NAMES.lookup([top_uid], gid_str)
+            most_chatty = names.get(top_uid, f"Unknown User ({top_uid})")
         else:
             most_chatty = None
 
+        # Mentions, emoji, links and code, which are counted apart from words
+        kinds = [0] * len(KINDS)
+        for rec in users.values():
+            for i, count in enumerate(rec.get("kinds", ())):
+                kinds[i] += count
+        content = dict(zip(KINDS, kinds))
+
         embed = discord.Embed(
             title=f"📊 Server Stats: {guild.name}",
             color=discord.Color.random(),
@@ -95,6 +141,75 @@ class Stats(commands.Cog):
         embed.add_field(name="Most Used Dictionary Word", value=most_dict_word or "N/A", inline=False)
         embed.add_field(name="Most Used Non-Dictionary Word", value=most_non_dict_word or "N/A", inline=False)
         embed.add_field(name="Most Chatty Member", value=most_chatty or "N/A", inline=False)
+        embed.add_field(
+            name="Message Content",
+            value=(
+                f"Mentions: {content['user_mentions']} users | {content['role_mentions']} roles | "
+                f"{content['channel_mentions']} channels\n"
+                f"Emojis: {content['emojis']} | Custom emojis: {content['custom_emojis']}\n"
+                f"Links: {content['urls']} | Code blocks: {content['code']}"
+            ),
+            inline=False
+        )
+
+        await interaction.followup.send(embed=embed)
+        await log_action(self.bot, interaction)
+
+    # ===== Channel Stats Command =====
+    # Reads the pre-aggregated channel level (core/channels.py) and the guild's total from the global
+    # totals, so it costs O(K) however many channels and users the guild has
+    @app_commands.command(
+        name="channelstats",
+        description="Show the busiest channels of this server, or the top users of one channel"
+    )
+    @app_commands.describe(channel="Channel to view, defaults to the busiest channels of the server")
+    @app_commands.guild_only()
+    async def channelstats(self, interaction: discord.Interaction, channel: Optional[discord.abc.GuildChannel] = None):
+        await interaction.response.defer(thinking=True)
+        gid_str = str(interaction.guild_id)
+        RESIDENCY.ensure(gid_str)
+        channels = channel_stats.get(gid_str)
+        guild_messages = TOTALS.guilds.get(gid_str)
+
+        def share(messages: int) -> str:
+            return f"{100 * messages / guild_messages:.1f}%" if guild_messages else "N/A"
+
+        embed = discord.Embed(
+            color=discord.Color.random(),
+            timestamp=datetime.datetime.now(ZoneInfo("Asia/Singapore"))
+        )
+        if channel is None:
+            top = channels.top() if channels else []
+            if not top:
+                await interaction.followup.send("No channel data for this server yet.")
+                return
+            leaders = {cid: stat.users.top(1)[0] for cid, stat in top if stat.users}
+            names = await NAMES.lookup([uid for uid, _ in leaders.values()], gid_str)
+            embed.title = f"📺 Busiest Channels: {interaction.guild.name}"
+            embed.description = "Top 10 channels by message count"
+            for i, (cid, stat) in enumerate(top, start=1):
+                value = f"{stat.messages} messages ({share(stat.messages)}) | {stat.words} words"
+                if cid in leaders:
+                    uid, messages = leaders[cid]
+                    value += f"\nMost active: {names.get(uid, f'Unknown User ({uid})')} ({messages})"
+                embed.add_field(name=f"#{i}", value=f"<#{cid}>: {value}", inline=False)
+        else:
+            cid = channel_of(channel)
+            stat = channels.get(cid) if channels else None
+            if stat is None or stat.messages <= 0:
+                await interaction.followup.send(f"No message data for <#{cid}> yet.")
+                return
+            top = stat.users.top()
+            names = await NAMES.lookup([uid for uid, _ in top], gid_str)
+            embed.title = f"📺 Channel Stats: #{getattr(channel, 'name', cid)}"
+            embed.description = (f"{stat.messages} messages ({share(stat.messages)} of the server) | "
+                                 f"{stat.words} words | {stat.characters} characters")
+            embed.add_field(
+                name="Top Users",
+                value="\n".join(f"**{i}.** {names.get(uid, f'Unknown User ({uid})')}: {messages} messages"
+                                for i, (uid, messages) in enumerate(top, start=1)) or "N/A",
+                inline=False
+            )
 
         await interaction.followup.send(embed=embed)
         await log_action(self.bot, interaction)
@@ -109,48 +224,38 @@ class Stats(commands.Cog):
         name="global",
         description="Show the global message leaderboard"
     )
-    async def global_leaderboard(self, interaction: discord.Interaction):
+    @app_commands.describe(card="Show the leaderboard as an image")
+    async def global_leaderboard(self, interaction: discord.Interaction, card: bool = False):
         await interaction.response.defer(thinking=True)
 
-        if not stats:
+        version = self._global_version()
+        rows, note = await self._aggregated_top("users")
+        top = [(uid, {"messages": m, "words": w, "characters": c}) for uid, m, w, c in rows]
+
+        if not top:
             await interaction.followup.send("No message data yet.")
             return
 
-        # Aggregate totals per user across all guilds
-        user_totals: dict[str, dict[str, int]] = {}
-        for (uid, _), rec in stats.items():
-            totals = user_totals.setdefault(uid, {"messages": 0, "words": 0, "characters": 0})
-            totals["messages"] += rec["messages"]
-            totals["words"] += rec["words"]
-            totals["characters"] += rec["characters"]
-
-        # Take top 10 by message count
-        top = sorted(
-            user_totals.items(),
-            key=lambda kv: kv[1]["messages"],
-            reverse=True
-        )[:10]
-
+        title = "Global Message Leaderboard"
         embed = discord.Embed(
-            title="🏆 Global Message Leaderboard",
+            title=f"🏆 {title}",
             description="Top 10 users by message count",
             color=discord.Color.random(),
             timestamp=datetime.datetime.now(ZoneInfo("Asia/Singapore"))
         )
-        for rank, (uid, tot) in enumerate(top, start=1):
-            member = self.bot.get_user(int(uid))
-            name = member.name if member else f"Unknown User ({uid})"
-            embed.add_field(
-                name=f"{rank}. {name}",
-                value=(
-                    f"{tot['messages']} messages | "
-                    f"{tot['words']} words | "
-                    f"{tot['characters']} characters"
-                ),
-                inline=False
+        if note:
+            embed.set_footer(text=note)
+        names = await NAMES.lookup([uid for uid, _ in top])
+        lines = [
+            (
+                names.get(uid, f"Unknown User ({uid})"),
+                f"{tot['messages']} messages | {tot['words']} words | {tot['characters']} characters",
+                tot["messages"],
             )
+            for uid, tot in top
+        ]
 
-        await interaction.followup.send(embed=embed)
+        await self._send_board(interaction, embed, title, lines, card, "lb:global", version)
         await log_action(self.bot, interaction)
 
     @lb.command(
@@ -158,25 +263,20 @@ class Stats(commands.Cog):
         description="Show the guild-specific leaderboard"
     )
     @app_commands.describe(
-        guild_id="Guild ID to view, defaults to current guild"
+        guild_id="Guild ID to view, defaults to current guild",
+        card="Show the leaderboard as an image"
     )
     async def guild_leaderboard(
         self,
         interaction: discord.Interaction,
-        guild_id: Optional[int] = None
+        guild_id: Optional[int] = None,
+        card: bool = False
     ):
         await interaction.response.defer(thinking=True)
 
         gid_str = str(guild_id) if guild_id else str(interaction.guild_id)
-        # Filter stats for this guild
-        user_totals: dict[str, dict[str, int]] = {}
-        for (uid, gid), rec in stats.items():
-            if gid != gid_str:
-                continue
-            totals = user_totals.setdefault(uid, {"messages": 0, "words": 0, "characters": 0})
-            totals["messages"] += rec["messages"]
-            totals["words"] += rec["words"]
-            totals["characters"] += rec["characters"]
+        RESIDENCY.ensure(gid_str)
+        user_totals = stats.get(gid_str, {})
 
         if not user_totals:
             await interaction.followup.send("No message data for this guild.")
@@ -192,25 +292,95 @@ class Stats(commands.Cog):
         guild_obj = self.bot.get_guild(int(gid_str)) if gid_str.isdigit() else None
         guild_name = guild_obj.name if guild_obj else gid_str
 
+        title = f"Guild Leaderboard: {guild_name}"
         embed = discord.Embed(
-            title=f"🏆 Guild Leaderboard: {guild_name}",
+            title=f"🏆 {title}",
             description="Top 10 users by message count in this guild",
             color=discord.Color.random(),
             timestamp=datetime.datetime.now(ZoneInfo("Asia/Singapore"))
         )
-        for rank, (uid, tot) in enumerate(top, start=1):
-            member = self.bot.get_user(int(uid))
-            name = member.name if member else f"Unknown User ({uid})"
-            embed.add_field(
-                name=f"{rank}. {name}",
-                value=(
-                    f"{tot['messages']} messages | "
-                    f"{tot['words']} words | "
-                    f"{tot['characters']} characters"
-                ),
-                inline=False
+        names = await NAMES.lookup([uid for uid, _ in top], gid_str)
+        lines = [
+            (
+                names.get(uid, f"Unknown User ({uid})"),
+                f"{tot['messages']} messages | {tot['words']} words | {tot['characters']} characters",
+                tot["messages"],
             )
+            for uid, tot in top
+        ]
 
+        await self._send_board(interaction, embed, title, lines, card, f"lb:{gid_str}", RESIDENCY.versions.get(gid_str, 0))
+        await log_action(self.bot, interaction)
+
+    # ===== Rank Command =====
+    # Answered from a rank index (core/ranks.py) in O(log n) instead of sorting every user. A guild's
+    # index is built on its first /rank and kept up to date by on_message while the guild stays loaded.
+    @app_commands.command(
+        name="rank",
+        description="Show where a user ranks by message count"
+    )
+    @app_commands.describe(
+        user="User to rank, defaults to yourself",
+        scope="Rank within this server or across all servers (defaults to this server)"
+    )
+    @app_commands.choices(
+        scope=[
+            app_commands.Choice(name="guild", value="guild"),
+            app_commands.Choice(name="global", value="global"),
+        ]
+    )
+    async def rank(self, interaction: discord.Interaction, user: Optional[discord.User] = None, scope: str = "guild"):
+        await interaction.response.defer(thinking=True)
+        target = user or interaction.user
+        uid = str(target.id)
+        note = None
+        if scope == "guild":
+            if interaction.guild_id is None:
+                await interaction.followup.send("Use scope global outside of a server.")
+                return
+            gid_str = str(interaction.guild_id)
+            RESIDENCY.ensure(gid_str)
+            ranks = guild_ranks.get(gid_str)
+            if ranks is None:
+                users = stats.get(gid_str, {})
+                ranks = guild_ranks[gid_str] = RankIndex.from_counts(
+                    (user_id, rec["messages"]) for user_id, rec in users.items()
+                )
+            result = ranks.rank(uid)
+            where = interaction.guild.name if interaction.guild else gid_str
+        else:
+            gid_str = None
+            result = None
+            if AGGREGATOR.enabled:
+                try:
+                    result = await AGGREGATOR.rank(uid)
+                except AggregatorUnavailable:
+                    result, note = TOTALS.rank(uid), "Aggregator unreachable: ranked among this process's guilds only"
+            else:
+                result = TOTALS.rank(uid)
+            where = "all servers"
+
+        if result is None:
+            await interaction.followup.send(f"{target.name} has no messages counted in {where} yet.")
+            return
+
+        neighbours = [result[side][0] for side in ("above", "below") if result[side]]
+        names = await NAMES.lookup(neighbours, gid_str)
+        embed = discord.Embed(
+            title=f"🏅 Rank of {target.name}",
+            description=(f"**#{result['position']}** of {result['total']} in {where} with {result['count']} messages\n"
+                         f"More messages than {result['percentile']:.1f}% of ranked users"),
+            color=discord.Color.random(),
+            timestamp=datetime.datetime.now(ZoneInfo("Asia/Singapore"))
+        )
+        for label, side in (("Next Above", "above"), ("Next Below", "below")):
+            if result[side]:
+                other, count = result[side]
+                gap = abs(count - result["count"])
+                embed.add_field(name=label, value=f"{names.get(other, f'Unknown User ({other})')}: {count} messages "
+                                                  f"({gap} {'ahead' if side == 'above' else 'behind'})", inline=False)
+        if note:
+            embed.set_footer(text=note)
         await interaction.followup.send(embed=embed)
         await log_action(self.bot, interaction)
 
@@ -224,32 +394,29 @@ class Stats(commands.Cog):
         name="overall",
         description="Show the top 10 most used words across all guilds"
     )
-    async def topwords_overall(self, interaction: discord.Interaction):
+    @app_commands.describe(card="Show the top words as an image")
+    async def topwords_overall(self, interaction: discord.Interaction, card: bool = False):
         await interaction.response.defer(thinking=True)
 
-        if not words_stats:
+        version = self._global_version()
+        top, note = await self._aggregated_top("words")
+
+        if not top:
             await interaction.followup.send("No word data yet.")
             return
 
-        # Aggregate counts per word across all guilds
-        totals: dict[str, int] = {}
-        for rec in words_stats.values():
-            word = rec['word']
-            count = rec['count']
-            totals[word] = totals.get(word, 0) + count
-
-        top = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:10]
-
+        title = "Top 10 Words Overall"
         embed = discord.Embed(
-            title="🔤 Top 10 Words Overall",
+            title=f"🔤 {title}",
             description="Most frequently used words across all guilds",
             color=discord.Color.random(),
             timestamp=datetime.datetime.now(ZoneInfo("Asia/Singapore"))
         )
-        for rank, (word, count) in enumerate(top, start=1):
-            embed.add_field(name=f"{rank}. {word}", value=f"{count} uses", inline=False)
+        if note:
+            embed.set_footer(text=note)
+        lines = [(word, f"{count} uses", count) for word, count in top]
 
-        await interaction.followup.send(embed=embed)
+        await self._send_board(interaction, embed, title, lines, card, "topwords:global", version)
         await log_action(self.bot, interaction)
 
     @topwords.command(
@@ -257,76 +424,72 @@ class Stats(commands.Cog):
         description="Show the top 10 most used words in a guild"
     )
     @app_commands.describe(
-        guild_id="Guild ID to view, defaults to current guild"
+        guild_id="Guild ID to view, defaults to current guild",
+        card="Show the top words as an image"
     )
     async def topwords_guild(
         self,
         interaction: discord.Interaction,
-        guild_id: Optional[int] = None
+        guild_id: Optional[int] = None,
+        card: bool = False
     ):
         await interaction.response.defer(thinking=True)
 
         gid_str = str(guild_id) if guild_id else str(interaction.guild_id)
+        RESIDENCY.ensure(gid_str)
 
-        totals: dict[str, int] = {}
-        for (gid, _), rec in words_stats.items():
-            if gid != gid_str:
-                continue
-            word = rec['word']
-            count = rec['count']
-            totals[word] = totals.get(word, 0) + count
-
-        if not totals:
+        top = _top_words(words_stats.get(gid_str, {}))
+        if not top:
             await interaction.followup.send("No word data for this guild.")
             return
 
-        top = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:10]
-
         guild_obj = self.bot.get_guild(int(gid_str)) if gid_str.isdigit() else None
         guild_name = guild_obj.name if guild_obj else gid_str
 
+        title = f"Top 10 Words in Guild: {guild_name}"
         embed = discord.Embed(
-            title=f"🔤 Top 10 Words in Guild: {guild_name}",
+            title=f"🔤 {title}",
             description="Most frequently used words in this guild",
             color=discord.Color.random(),
             timestamp=datetime.datetime.now(ZoneInfo("Asia/Singapore"))
         )
-        for rank, (word, count) in enumerate(top, start=1):
-            embed.add_field(name=f"{rank}. {word}", value=f"{count} uses", inline=False)
+        lines = [(word, f"{count} uses", count) for word, count in top]
 
-        await interaction.followup.send(embed=embed)
+        await self._send_board(interaction, embed, title, lines, card, f"topwords:{gid_str}", RESIDENCY.versions.get(gid_str, 0))
         await log_action(self.bot, interaction)
 
     @topwords.command(name="user", description="Show the top 10 most used words by a user")
-    @app_commands.describe(user="User to view, defaults to yourself")
-    async def topwords_user(self, interaction: discord.Interaction, user: Optional[discord.User] = None):
+    @app_commands.describe(
+        user="User to view, defaults to yourself",
+        guild_id="Guild ID to view, defaults to current guild"
+    )
+    async def topwords_user(
+        self,
+        interaction: discord.Interaction,
+        user: Optional[discord.User] = None,
+        guild_id: Optional[int] = None
+    ):
         await interaction.response.defer(thinking=True)
         target = user or interaction.user
-        totals = {}
-        if not os.path.exists(WORDS_FILE):
-            await interaction.followup.send("Word data file not found.")
-            return
-        with open(WORDS_FILE, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row.get('user_id') != str(target.id):
-                    continue
-                word = row.get('word', '').lower()
-                try:
-                    count = int(row.get('count', '0'))
-                except ValueError:
-                    continue
-                totals[word] = totals.get(word, 0) + count
-        if not totals:
-            await interaction.followup.send(f"No word data for user {target.name}.")
+        gid_str = str(guild_id) if guild_id else str(interaction.guild_id)
+        uid = str(target.id)
+        RESIDENCY.ensure(gid_str)
+
+        # Guild files count words per guild, not per user; the user's own words are only
+        # known for their recent messages, which are kept for reconciling edits and deletes
+        record = stats.get(gid_str, {}).get(uid)
+        counts, messages = RECENT.word_counts(gid_str, uid)
+        top = _top_words(counts)
+        if not record or not top:
+            await interaction.followup.send(f"No recent word data for user {target.name} in this guild.")
             return
-        top = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:10]
         embed = discord.Embed(
             title=f"🔤 Top 10 Words for {target.name}",
-            description="Most frequently used words by this user",
+            description=f"Most frequently used words in their last {messages} message(s) in this guild",
             color=discord.Color.random(),
             timestamp=datetime.datetime.now(ZoneInfo("Asia/Singapore"))
         )
+        embed.set_footer(text=f"{record.get('words', 0)} words counted for them in this guild overall")
         for rank, (word, count) in enumerate(top, start=1):
             embed.add_field(name=f"{rank}. {word}", value=f"{count} uses", inline=False)
         await interaction.followup.send(embed=embed)
@@ -348,12 +511,13 @@ class Stats(commands.Cog):
     async def dictionary(self, interaction: discord.Interaction, is_dict: bool):
         await interaction.response.defer(thinking=True)
 
-        total = len(words_stats)
+        # Distinct words seen across all guilds, split by the global totals' dictionary tables
+        total = len(TOTALS.words)
         if total == 0:
             await interaction.followup.send("No word data yet.")
             return
 
-        count = sum(1 for rec in words_stats.values() if rec.get('is_dict') == is_dict)
+        count = len(TOTALS.dict_words if is_dict else TOTALS.nondict_words)
         percent = (count / total) * 100
 
         embed = discord.Embed(
@@ -376,21 +540,20 @@ class Stats(commands.Cog):
     async def leastused(self, interaction: discord.Interaction):
         await interaction.response.defer(thinking=True)
 
-        if not words_stats:
+        least = heapq.nsmallest(10, TOTALS.words.totals.items(), key=itemgetter(1))
+        if not least:
             await interaction.followup.send("No word data yet.")
             return
 
-        least = sorted(words_stats.values(), key=lambda rec: rec['count'])[:10]
-
         embed = discord.Embed(
             title="🔡 Least Used Words",
             color=discord.Color.random(),
             timestamp=datetime.datetime.now(ZoneInfo("Asia/Singapore"))
         )
-        for rank, rec in enumerate(least, start=1):
+        for rank, (word, count) in enumerate(least, start=1):
             embed.add_field(
-                name=f"{rank}. {rec['word']}",
-                value=f"{rec['count']} uses | is_dict={rec['is_dict']}",
+                name=f"{rank}. {word}",
+                value=f"{count} uses | is_dict={bool(TOTALS.is_dict.get(word))}",
                 inline=False
             )
 
@@ -407,14 +570,19 @@ class Stats(commands.Cog):
     async def search(self, interaction: discord.Interaction, word: str):
         await interaction.response.defer(thinking=True)
 
-        matches = [rec for rec in words_stats.values() if rec['word'].lower() == word.lower()]
-        if not matches:
+        result = None
+        if AGGREGATOR.enabled:
+            try:
+                result = await AGGREGATOR.word(word.lower())
+            except AggregatorUnavailable:
+                pass
+        if result is None:
+            result = TOTALS.handle({"op": "word", "word": word})
+        total_count, is_dict = result["count"], result["is_dict"]
+        if not total_count:
             await interaction.followup.send(f"No stats found for '{word}'.")
             return
 
-        total_count = sum(rec['count'] for rec in matches)
-        is_dict = matches[0].get('is_dict')
-
         embed = discord.Embed(
             title=f"🔍 Word Stats: {word.lower()}",
             description=(
@@ -444,16 +612,17 @@ class Stats(commands.Cog):
 
         records: list[tuple[str, int, bool]] = []
         title = ""
+        words = VOCAB.words
         if scope_lower == "global":
-            for rec in words_stats.values():
-                records.append((rec['word'], rec['count'], rec['is_dict']))
+            is_dict = TOTALS.is_dict
+            records.extend((word, count, bool(is_dict.get(word))) for word, count in TOTALS.words.totals.items())
             title = "Wordstats Dump (Global)"
         else:
             gid_str = str(interaction.guild_id)
-            for rec in words_stats.values():
-                if rec.get('guild_id') != gid_str:
-                    continue
-                records.append((rec['word'], rec['count'], rec['is_dict']))
+            RESIDENCY.ensure(gid_str)
+            counts = words_stats.get(gid_str, {})
+            mask = LEXICON.guild_mask(gid_str)
+            records.extend((words[widx], count, LEXICON.is_dict(widx, mask)) for widx, count in counts.items())
             guild_obj = self.bot.get_guild(interaction.guild_id)
             title = f"Wordstats Dump (Guild: {guild_obj.name if guild_obj else gid_str})"
 
@@ -499,23 +668,18 @@ class Stats(commands.Cog):
     )
     async def topdict_global(self, interaction: discord.Interaction):
         await interaction.response.defer(thinking=True)
-        totals: dict[str, int] = {}
-        for rec in words_stats.values():
-            if not rec.get('is_dict'):
-                continue
-            word = rec['word']
-            count = rec['count']
-            totals[word] = totals.get(word, 0) + count
-        if not totals:
+        top, note = await self._aggregated_top("dict")
+        if not top:
             await interaction.followup.send("No dictionary word data yet.")
             return
-        top = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:10]
         embed = discord.Embed(
             title="📚 Top 10 Dictionary Words (Global)",
             description="Most frequently used dictionary words across all guilds",
             color=discord.Color.random(),
             timestamp=datetime.datetime.now(ZoneInfo("Asia/Singapore"))
         )
+        if note:
+            embed.set_footer(text=note)
         for rank, (word, count) in enumerate(top, start=1):
             embed.add_field(name=f"{rank}. {word}", value=f"{count} uses", inline=False)
         await interaction.followup.send(embed=embed)
@@ -535,17 +699,11 @@ class Stats(commands.Cog):
     ):
         await interaction.response.defer(thinking=True)
         gid = str(guild_id) if guild_id else str(interaction.guild_id)
-        totals: dict[str, int] = {}
-        for rec in words_stats.values():
-            if rec.get('guild_id') != gid or not rec.get('is_dict'):
-                continue
-            word = rec['word']
-            count = rec['count']
-            totals[word] = totals.get(word, 0) + count
-        if not totals:
+        RESIDENCY.ensure(gid)
+        top = _top_words(words_stats.get(gid, {}), flag=True, mask=LEXICON.guild_mask(gid))
+        if not top:
             await interaction.followup.send("No dictionary word data for this guild.")
             return
-        top = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:10]
         guild_obj = self.bot.get_guild(int(gid)) if gid.isdigit() else None
         guild_name = guild_obj.name if guild_obj else gid
         embed = discord.Embed(
@@ -571,23 +729,18 @@ class Stats(commands.Cog):
     )
     async def nondict_global(self, interaction: discord.Interaction):
         await interaction.response.defer(thinking=True)
-        totals: dict[str, int] = {}
-        for rec in words_stats.values():
-            if rec.get('is_dict'):
-                continue
-            word = rec['word']
-            count = rec['count']
-            totals[word] = totals.get(word, 0) + count
-        if not totals:
+        top, note = await self._aggregated_top("nondict")
+        if not top:
             await interaction.followup.send("No non-dictionary word data yet.")
             return
-        top = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:10]
         embed = discord.Embed(
             title="📝 Top 10 Non-Dictionary Words (Global)",
             description="Most frequently used non-dictionary words across all guilds",
             color=discord.Color.random(),
             timestamp=datetime.datetime.now(ZoneInfo("Asia/Singapore"))
         )
+        if note:
+            embed.set_footer(text=note)
         for rank, (word, count) in enumerate(top, start=1):
             embed.add_field(name=f"{rank}. {word}", value=f"{count} uses", inline=False)
         await interaction.followup.send(embed=embed)
@@ -607,17 +760,11 @@ class Stats(commands.Cog):
     ):
         await interaction.response.defer(thinking=True)
         gid = str(guild_id) if guild_id else str(interaction.guild_id)
-        totals: dict[str, int] = {}
-        for rec in words_stats.values():
-            if rec.get('guild_id') != gid or rec.get('is_dict'):
-                continue
-            word = rec['word']
-            count = rec['count']
-            totals[word] = totals.get(word, 0) + count
-        if not totals:
+        RESIDENCY.ensure(gid)
+        top = _top_words(words_stats.get(gid, {}), flag=False, mask=LEXICON.guild_mask(gid))
+        if not top:
             await interaction.followup.send("No non-dictionary word data for this guild.")
             return
-        top = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:10]
         guild_obj = self.bot.get_guild(int(gid)) if gid.isdigit() else None
         guild_name = guild_obj.name if guild_obj else gid
         embed = discord.Embed(
@@ -631,5 +778,115 @@ class Stats(commands.Cog):
         await interaction.followup.send(embed=embed)
         await log_action(self.bot, interaction)
 
+    # ===== Dictionary Locales Command =====
+    @app_commands.command(
+        name="locales",
+        description="Show or choose the dictionaries used for this server's dictionary word stats"
+    )
+    @app_commands.describe(
+        locales="Comma-separated locales, e.g. 'en,de', or 'default'; leave empty to show the current ones"
+    )
+    @app_commands.guild_only()
+    @app_commands.default_permissions(manage_guild=True)
+    async def locales(self, interaction: discord.Interaction, locales: Optional[str] = None):
+        gid = str(interaction.guild_id)
+        available = ", ".join(LEXICON.locales) or "none"
+        if locales is not None:
+            chosen = [locale.strip().lower() for locale in locales.split(",") if locale.strip()]
+            unknown = [locale for locale in chosen if locale not in LEXICON.bits and locale != "default"]
+            if unknown:
+                await interaction.response.send_message(
+                    f"Unknown locale(s): {', '.join(unknown)}. Available: {available}", ephemeral=True
+                )
+                return
+            LEXICON.set_guild(gid, [] if "default" in chosen else chosen)
+
+        current = ", ".join(LEXICON.names(LEXICON.guild_mask(gid))) or "none"
+        suffix = "" if gid in LEXICON.guilds else " (default)"
+        await interaction.response.send_message(
+            f"Dictionaries for this server: **{current}**{suffix}\nAvailable: {available}", ephemeral=True
+        )
+        await log_action(self.bot, interaction)
+
+    # ===== Export Command =====
+    @app_commands.command(
+        name="export",
+        description="Export this guild's stats as compressed CSV or NDJSON files"
+    )
+    @app_commands.describe(
+        table="Which stats to export",
+        fmt="File format",
+        compression="Compression for the files"
+    )
+    @app_commands.choices(
+        table=[
+            app_commands.Choice(name="all", value="all"),
+            app_commands.Choice(name="messages", value="messages"),
+            app_commands.Choice(name="words", value="words"),
+        ],
+        fmt=[app_commands.Choice(name=f, value=f) for f in FORMATS],
+        compression=[app_commands.Choice(name=c, value=c) for c in compressions()],
+    )
+    @app_commands.guild_only()
+    @app_commands.default_permissions(manage_guild=True)
+    async def export(
+        self,
+        interaction: discord.Interaction,
+        table: str = "all",
+        fmt: str = "csv",
+        compression: str = "gzip"
+    ):
+        guild = interaction.guild
+        if guild.id in self._exporting:
+            await interaction.response.send_message("An export for this server is already running.", ephemeral=True)
+            return
+        await interaction.response.defer(thinking=True, ephemeral=True)
+
+        gid = str(guild.id)
+        RESIDENCY.ensure(gid)
+        # Only the keys are collected here; rows are read and compressed in a worker thread
+        jobs = []
+        if table in ("all", "messages"):
+            users = stats.get(gid, {})
+
+            def message_row(uid):
+                rec = users.get(uid)
+                if rec is not None:
+                    return {"user_id": rec["user_id"], "messages": rec["messages"],
+                            "words": rec["words"], "characters": rec["characters"],
+                            **dict(zip(KINDS, rec.get("kinds") or [0] * len(KINDS)))}
+            jobs.append(("messages", list(users), ["user_id", "messages", "words", "characters", *KINDS], message_row))
+        if table in ("all", "words"):
+            counts = words_stats.get(gid, {})
+            mask = LEXICON.guild_mask(gid)
+
+            def word_row(widx):
+                count = counts.get(widx)
+                if count is not None:
+                    return {"word": VOCAB.words[widx], "count": count, "is_dict": LEXICON.is_dict(widx, mask)}
+            jobs.append(("words", list(counts), ["word", "count", "is_dict"], word_row))
+        if not any(keys for _, keys, _, _ in jobs):
+            await interaction.followup.send("No stats recorded for this server yet.", ephemeral=True)
+            return
+
+        self._exporting.add(guild.id)
+        try:
+            with tempfile.TemporaryDirectory(prefix="chatcounter-export-") as directory:
+                parts, rows = [], 0
+                for name, keys, fields, project in jobs:
+                    paths, written = await asyncio.to_thread(
+                        export_table, directory, f"{gid}-{name}", fmt, compression,
+                        guild.filesize_limit, keys, fields, project
+                    )
+                    parts.extend(paths)
+                    rows += written
+                # One attachment per message so each stays under the upload limit
+                for index, path in enumerate(parts, start=1):
+                    content = f"📦 Export of **{guild.name}**: {rows} rows in {len(parts)} file(s)" if index == 1 else None
+                    await interaction.followup.send(content, file=discord.File(path), ephemeral=True)
+        finally:
+            self._exporting.discard(guild.id)
+        await log_action(self.bot, interaction)
+
 async def setup(bot):
     await bot.add_cog(Stats(bot))
@@ -0,0 +1,280 @@
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+
+import requests
+
+from config import DISCORD_TOKEN, BASE_DIR, ROOT_DB_DIR
+from core.storage import migrate_csv, read_json, write_json
+from core.vocab import Vocabulary
+
+# ----- Cluster launcher -----
+# Splits the shards across N worker processes, each running main.py with a
+# contiguous shard range (SHARD_IDS/SHARD_COUNT) and its own db/cluster-<id>
+# directory, and restarts workers that crash (non-zero exit or killed by a
+# signal) with exponential backoff. A worker that exits with code 0 shut down
+# on purpose and is left stopped; once every shard worker has, the launcher
+# stops the services it runs for them (the aggregator) and exits.
+# Guild -> shard is (guild_id >> 22) % shard_count, so changing the shard or
+# cluster count moves guilds between clusters; keep them fixed once data exists.
+# db/clusters.json records the layout, and the launcher refuses to start with
+# a different one.
+#
+# Stats left in db/ by a single-process bot are split between the clusters on
+# the first start: each guild file moves to the cluster owning its shard, with
+# a copy of the vocabulary its word indexes refer to. Each cluster rebuilds its
+# totals from its guild files on that first start.
+#
+# Usage: python cluster.py --clusters 4 [--shards 16]
+#        python cluster.py --clusters 2 --shards 4 --stub   (offline, stubbed gateways)
+# With --aggregator, a core.aggregator process is supervised alongside the
+# workers and global commands are answered from it (see core/aggregator.py).
+
+
+def recommended_shard_count() -> int:
+    """Ask Discord how many shards this bot should run."""
+    resp = requests.get(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {DISCORD_TOKEN}"},
+        timeout=10,
+    )
+    resp.raise_for_status()
+    return int(resp.json()["shards"])
+
+
+def shard_ranges(shard_count: int, clusters: int) -> list[list[int]]:
+    """Contiguous, near-equal shard ranges, one per cluster."""
+    clusters = max(1, min(clusters, shard_count))
+    base, extra = divmod(shard_count, clusters)
+    ranges, start = [], 0
+    for cluster_id in range(clusters):
+        size = base + (1 if cluster_id < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+# ----- Splitting single-process data -----
+SPLIT_SUFFIX = ".split"  # Root files superseded by the per-cluster copies are kept under this suffix
+
+
+def _guild_files(directory: str) -> list[str]:
+    if not os.path.isdir(directory):
+        return []
+    return [name for name in os.listdir(directory) if name.endswith(".json")]
+
+
+def split_root_data(root: str, ranges: list[list[int]], shard_count: int) -> int:
+    """Move single-process stats in `root` into the cluster directories; returns the guilds moved.
+
+    Exits instead if `root` was split for another layout, or if both `root` and a cluster hold stats.
+    """
+    layout = {"shard_count": shard_count, "ranges": ranges}
+    layout_path = os.path.join(root, "clusters.json")
+    previous = read_json(layout_path)
+    if previous is not None and previous != layout:
+        sys.exit(f"[cluster] {root} is laid out for {previous['shard_count']} shard(s) in "
+                 f"{len(previous['ranges'])} cluster(s); start with the same --shards and --clusters")
+
+    guilds_dir = os.path.join(root, "guilds")
+    counter, words, archive = (os.path.join(root, name) for name in ("counter.csv", "words.csv", "archive"))
+    if not _guild_files(guilds_dir) and not any(os.path.exists(path) for path in (counter, words, archive)):
+        os.makedirs(root, exist_ok=True)
+        write_json(layout_path, layout)
+        return 0
+    clusters = [os.path.join(root, f"cluster-{cluster_id}") for cluster_id in range(len(ranges))]
+    if any(_guild_files(os.path.join(directory, "guilds")) for directory in clusters):
+        sys.exit(f"[cluster] both {root} and its cluster directories hold guild stats; "
+                 f"move one of them away before starting in cluster mode")
+
+    vocab_path = os.path.join(root, "vocab.tsv")
+    if any(os.path.exists(path) for path in (counter, words, archive)):
+        vocab = Vocabulary(vocab_path)
+        vocab.load()
+        migrate_csv(counter, words, archive, guilds_dir, vocab)
+
+    owner = {shard: cluster_id for cluster_id, shard_ids in enumerate(ranges) for shard in shard_ids}
+    locales = read_json(os.path.join(root, "locales.json")) or {}
+    cluster_locales: list[dict] = [{} for _ in clusters]
+    for directory in clusters:
+        os.makedirs(os.path.join(directory, "guilds"), exist_ok=True)
+        for name in ("vocab.tsv", "imports.json"):  # Indexes and import ranges of other guilds are harmless
+            if os.path.exists(os.path.join(root, name)):
+                shutil.copy2(os.path.join(root, name), os.path.join(directory, name))
+    moved = 0
+    for name in _guild_files(guilds_dir):
+        gid = name[:-len(".json")]
+        cluster_id = owner[(int(gid) >> 22) % shard_count]
+        os.replace(os.path.join(guilds_dir, name), os.path.join(clusters[cluster_id], "guilds", name))
+        if gid in locales:
+            cluster_locales[cluster_id][gid] = locales[gid]
+        moved += 1
+    for directory, choices in zip(clusters, cluster_locales):
+        if choices:
+            write_json(os.path.join(directory, "locales.json"), choices)
+
+    # The root copies no longer describe any guild; keep them aside rather than deleting them
+    for name in ("manifest.json", "totals.json", "vocab.tsv", "locales.json", "imports.json"):
+        path = os.path.join(root, name)
+        if os.path.exists(path):
+            os.replace(path, path + SPLIT_SUFFIX)
+    if not os.listdir(guilds_dir):
+        os.rmdir(guilds_dir)
+    write_json(layout_path, layout)
+    print(f"[cluster] split the stats of {moved} guild(s) in {root} between {len(clusters)} cluster(s)")
+    return moved
+
+
+class Worker:
+    command: list[str] | None = None  # None: the supervisor's worker command
+    service = False                   # Runs for the shard workers; stopped once they have all finished
+
+    def __init__(self, cluster_id: int, shard_ids: list[int], shard_count: int, aggregator_socket: str | None = None):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.aggregator_socket = aggregator_socket
+        self.process: subprocess.Popen | None = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.next_start = 0.0
+        self.finished = False  # Exited cleanly; not restarted
+
+    @property
+    def name(self) -> str:
+        return f"cluster {self.cluster_id}"
+
+    @property
+    def workdir(self) -> str:
+        # sessions.csv and users.txt are written relative to the working directory
+        return os.path.join(ROOT_DB_DIR, f"cluster-{self.cluster_id}")
+
+    def env(self) -> dict:
+        env = dict(os.environ)
+        env.update({
+            "CLUSTER_ID": str(self.cluster_id),
+            "SHARD_IDS": ",".join(map(str, self.shard_ids)),
+            "SHARD_COUNT": str(self.shard_count),
+            "CHATCOUNTER_DB_DIR": ROOT_DB_DIR,
+            "PYTHONPATH": os.pathsep.join(filter(None, [BASE_DIR, env.get("PYTHONPATH")])),
+        })
+        if self.aggregator_socket:
+            env["AGGREGATOR_SOCKET"] = self.aggregator_socket
+        return env
+
+
+class AggregatorProcess(Worker):
+    service = True
+
+    def __init__(self, socket_path: str):
+        super().__init__(cluster_id=-1, shard_ids=[], shard_count=0, aggregator_socket=socket_path)
+        self.command = [sys.executable, "-m", "core.aggregator", "--socket", socket_path]
+
+    @property
+    def name(self) -> str:
+        return "aggregator"
+
+    @property
+    def workdir(self) -> str:
+        return ROOT_DB_DIR
+
+
+class Supervisor:
+    def __init__(self, workers: list[Worker], command: list[str],
+                 min_backoff: float = 1.0, max_backoff: float = 60.0, stable_after: float = 60.0):
+        self.workers = workers
+        self.command = command
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.stopping = False
+
+    def start(self, worker: Worker):
+        os.makedirs(worker.workdir, exist_ok=True)
+        worker.process = subprocess.Popen(worker.command or self.command, cwd=worker.workdir, env=worker.env())
+        worker.started_at = time.monotonic()
+        shards = f" shards {worker.shard_ids}" if worker.shard_ids else ""
+        print(f"[cluster] started {worker.name}{shards} "
+              f"(pid {worker.process.pid}, restarts {worker.restarts})")
+
+    def check(self, worker: Worker):
+        now = time.monotonic()
+        if worker.process is None:
+            if not worker.finished and now >= worker.next_start:
+                self.start(worker)
+            return
+        code = worker.process.poll()
+        if code is None:
+            if worker.restarts and now - worker.started_at > self.stable_after:
+                worker.restarts = 0  # Ran long enough; reset the backoff
+            return
+        worker.process = None
+        if self.stopping:
+            return
+        if code == 0:
+            worker.finished = True
+            print(f"[cluster] {worker.name} exited cleanly; not restarting it")
+            return
+        backoff = min(self.max_backoff, self.min_backoff * (2 ** worker.restarts))
+        worker.restarts += 1
+        worker.next_start = now + backoff
+        print(f"[cluster] {worker.name} exited with code {code}; restarting in {backoff:.0f}s")
+
+    def stop(self, *_):
+        self.stopping = True
+        for worker in self.workers:
+            if worker.process is not None and worker.process.poll() is None:
+                worker.process.terminate()
+
+    def run(self, poll_interval: float = 1.0, run_for: float | None = None):
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        deadline = time.monotonic() + run_for if run_for else None
+        for worker in self.workers:
+            self.start(worker)
+        while not self.stopping:
+            for worker in self.workers:
+                self.check(worker)
+            if deadline and time.monotonic() >= deadline:
+                self.stop()
+            shard_workers = [worker for worker in self.workers if not worker.service]
+            if shard_workers and all(worker.finished for worker in shard_workers):
+                print("[cluster] every shard worker exited cleanly; stopping")
+                self.stop()
+            time.sleep(poll_interval)
+        for worker in self.workers:
+            if worker.process is not None:
+                try:
+                    worker.process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    worker.process.kill()
+        print("[cluster] all workers stopped")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Run the bot as several shard-owning worker processes")
+    parser.add_argument("--clusters", type=int, default=os.cpu_count() or 1, help="Worker processes to run")
+    parser.add_argument("--shards", type=int, default=None, help="Total shard count (default: Discord's recommendation)")
+    parser.add_argument("--stub", action="store_true", help="Run stub workers with fake gateways instead of main.py")
+    parser.add_argument("--run-for", type=float, default=None, help="Stop all workers after this many seconds")
+    parser.add_argument("--aggregator", action="store_true", help="Also run the cross-process aggregator for global commands")
+    args = parser.parse_args()
+
+    shard_count = args.shards or (args.clusters if args.stub else recommended_shard_count())
+    ranges = shard_ranges(shard_count, args.clusters)
+    socket_path = os.path.join(ROOT_DB_DIR, "aggregator.sock") if args.aggregator else None
+    workers = [Worker(cluster_id, shard_ids, shard_count, socket_path) for cluster_id, shard_ids in enumerate(ranges)]
+    if socket_path:
+        workers.insert(0, AggregatorProcess(socket_path))  # Start it before the bots connect
+    command = [sys.executable, "-m", "bench.stub_worker"] if args.stub else [sys.executable, "-m", "main"]
+    print(f"[cluster] {shard_count} shard(s) across {len(ranges)} worker(s)")
+    split_root_data(ROOT_DB_DIR, ranges, shard_count)
+    Supervisor(workers, command).run(run_for=args.run_for)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -9,3 +9,76 @@ LOG_GUILD_ID = int(os.getenv("LOG_GUILD_ID")) if os.getenv("LOG_GUILD_ID") else
 LOG_CHANNEL_ID = int(os.getenv("LOG_CHANNEL_ID")) if os.getenv("LOG_CHANNEL_ID") else None
 BOT_OWNER_ID = int(os.getenv("BOT_OWNER_ID")) if os.getenv("BOT_OWNER_ID") else None
 DISCORD_CLIENT_ID = int(os.getenv("DISCORD_CLIENT_ID")) if os.getenv("DISCORD_CLIENT_ID") else None
+
+# Cluster mode: cluster.py sets these for each worker process it supervises
+CLUSTER_ID = int(os.getenv("CLUSTER_ID")) if os.getenv("CLUSTER_ID") else None
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+SHARD_IDS = [int(s) for s in os.getenv("SHARD_IDS").split(",")] if os.getenv("SHARD_IDS") else None
+
+# Where stats files are stored (defaults to ./db, override with CHATCOUNTER_DB_DIR).
+# Each cluster worker keeps the stats of its own guilds in db/cluster-<id>.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DB_DIR = os.getenv("CHATCOUNTER_DB_DIR") or os.path.join(BASE_DIR, "db")
+DB_DIR = os.path.join(ROOT_DB_DIR, f"cluster-{CLUSTER_ID}") if CLUSTER_ID is not None else ROOT_DB_DIR
+VOCAB_FILE = os.path.join(DB_DIR, "vocab.tsv")
+# Stats are stored as one file per guild plus a manifest and the global totals (see core/residency.py)
+GUILDS_DIR = os.path.join(DB_DIR, "guilds")
+MANIFEST_FILE = os.path.join(DB_DIR, "manifest.json")
+TOTALS_FILE = os.path.join(DB_DIR, "totals.json")
+# Earlier single-file layout, migrated to the above on first start
+COUNTER_FILE = os.path.join(DB_DIR, "counter.csv")
+WORDS_FILE = os.path.join(DB_DIR, "words.csv")
+ARCHIVE_DIR = os.path.join(DB_DIR, "archive")
+# Word lists for the is_dict flag: the shipped English list ("en"), plus one file per extra locale
+# in db/dictionaries (e.g. db/dictionaries/de), indexed once into DICTIONARY_CACHE_DIR (see core/lexicon.py).
+# Guilds that did not pick their own locales with /locales, and the global tables, use DEFAULT_LOCALES.
+DICTIONARY_FILE = os.path.join(BASE_DIR, "db", "american-english")
+DICTIONARY_DIR = os.path.join(BASE_DIR, "db", "dictionaries")
+DICTIONARY_CACHE_DIR = os.path.join(ROOT_DB_DIR, "dictionary-index")
+DEFAULT_LOCALES = [locale.strip().lower() for locale in os.getenv("DEFAULT_LOCALES", "en").split(",") if locale.strip()]
+LOCALES_FILE = os.path.join(DB_DIR, "locales.json")
+
+# Optional local Prometheus-style metrics endpoint (disabled when METRICS_PORT is unset)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT")) if os.getenv("METRICS_PORT") else None
+
+# Event loop lag monitor: stall threshold and optional asyncio debug mode
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+LOOP_DEBUG = os.getenv("LOOP_DEBUG", "").lower() in ("1", "true", "yes")
+
+# Cross-process aggregator for global commands (disabled when AGGREGATOR_SOCKET is unset)
+AGGREGATOR_SOCKET = os.getenv("AGGREGATOR_SOCKET") or None
+AGGREGATOR_FLUSH_SECONDS = float(os.getenv("AGGREGATOR_FLUSH_SECONDS", "2"))
+
+# Guild residency: once resident stats + word rows exceed RESIDENT_ROWS, the least recently
+# used guilds are archived to disk (0 keeps everything in memory). Guilds untouched for
+# GUILD_IDLE_MINUTES are archived as well (0 disables).
+RESIDENT_ROWS = int(os.getenv("RESIDENT_ROWS", "0"))
+GUILD_IDLE_MINUTES = float(os.getenv("GUILD_IDLE_MINUTES", "0"))
+# How often the global totals are checkpointed so the next start can skip scanning every guild file
+CHECKPOINT_MINUTES = float(os.getenv("CHECKPOINT_MINUTES", "5"))
+# How often changed guild files are written between checkpoints (at most a minute apart)
+GUILD_FLUSH_SECONDS = float(os.getenv("GUILD_FLUSH_SECONDS", "10"))
+
+# User names shown on leaderboards: at most NAME_CACHE_SIZE names are kept (least recently seen
+# dropped first) and refetched after NAME_TTL_HOURS. MEMBER_CACHE=false stops discord.py caching
+# every guild member; leaderboards then rely on the name cache alone.
+NAMES_FILE = os.path.join(DB_DIR, "names.json")
+NAME_CACHE_SIZE = int(os.getenv("NAME_CACHE_SIZE", "50000"))
+NAME_TTL_HOURS = float(os.getenv("NAME_TTL_HOURS", "168"))
+MEMBER_CACHE = os.getenv("MEMBER_CACHE", "true").lower() not in ("0", "false", "no")
+
+# Guild joins/removals are applied together (one presence update, one member refresh) once
+# none arrived for GUILD_CHURN_SECONDS, or at most GUILD_CHURN_MAX_SECONDS after the first
+GUILD_CHURN_SECONDS = float(os.getenv("GUILD_CHURN_SECONDS", "10"))
+GUILD_CHURN_MAX_SECONDS = float(os.getenv("GUILD_CHURN_MAX_SECONDS", "60"))
+
+# Leaderboard image cards (/lb and /topwords with card=True): threads that render them
+# and how many rendered cards are kept for reuse
+CARD_RENDER_THREADS = int(os.getenv("CARD_RENDER_THREADS", "2"))
+CARD_CACHE_SIZE = int(os.getenv("CARD_CACHE_SIZE", "64"))
+
+# Edited and deleted messages are reconciled from a cache of what each recent message counted:
+# at most RECENT_MESSAGES of them (0 disables), for messages younger than RECENT_MESSAGE_HOURS
+RECENT_MESSAGES = int(os.getenv("RECENT_MESSAGES", "20000"))
+RECENT_MESSAGE_HOURS = float(os.getenv("RECENT_MESSAGE_HOURS", "24"))
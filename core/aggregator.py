@@ -0,0 +1,468 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+
+from config import AGGREGATOR_SOCKET, AGGREGATOR_FLUSH_SECONDS, CLUSTER_ID
+from core.ranks import RankIndex
+from core.topk import TopK
+
+# ----- Cross-process aggregator -----
+# When the bot runs as several cluster processes, no single process holds every
+# guild, so global commands (/lb global, /topwords overall, ...) ask this small
+# service instead. Each bot process sends compact per-guild deltas over a Unix
+# socket as newline-delimited JSON; the aggregator folds them into global totals
+# and keeps top-K tables so global queries are O(K).
+#
+# Protocol (one JSON object per line, one reply line per request):
+#   {"op": "reset", "source": s}                 forget everything source s sent
+#   {"op": "delta", "source": s, "guilds": [...]} add per-guild deltas, each
+#       {"g": guild_id, "u": {user_id: [messages, words, characters]},
+#        "w": {word: count}, "d": [words that are dictionary words]}
+#   {"op": "reclassify", "dict": [...], "nondict": [...]}  words whose
+#       dictionary flag changed (the "d" lists of deltas only ever set it)
+#   {"op": "top", "table": "users|guilds|words|dict|nondict", "k": 10}
+#   {"op": "word", "word": w}
+#   {"op": "rank", "user": user_id}             position by messages, and neighbours
+#   {"op": "info"}
+#
+# A bot process resets and re-sends its full totals on every (re)connect, so
+# the aggregator needs no storage of its own and a restart of either side
+# converges. Contributions of a source that went away stay counted until it
+# reconnects and resets.
+#
+# Run the stand-in locally with: python -m core.aggregator --socket /tmp/chatcounter.sock
+
+TABLES = ("users", "guilds", "words", "dict", "nondict")
+STREAM_LIMIT = 64 * 1024 * 1024
+SNAPSHOT_CHUNK = 20_000  # Rows per delta line when uploading a full snapshot
+
+
+class Aggregator:
+    def __init__(self, k: int = 100, track_sources: bool = True):
+        self.users = TopK(k)        # user_id -> messages
+        self.user_totals: dict[str, list[int]] = {}  # user_id -> [messages, words, characters]
+        self.guilds = TopK(k)       # guild_id -> messages
+        self.words = TopK(k)
+        self.dict_words = TopK(k)
+        self.nondict_words = TopK(k)
+        self.is_dict: dict[str, bool] = {}
+        # source -> what it contributed, so a reset can subtract it again. A bot process
+        # keeps its own totals in an Aggregator too, with a single source and no tracking.
+        self.track_sources = track_sources
+        self.sources: dict[str, dict] = {}
+        self.version = 0  # Bumped on every change, so derived results (e.g. leaderboard cards) can be reused
+        self.ranks: RankIndex | None = None  # Built on the first rank query, then kept up to date
+
+    def _add_user(self, uid: str, values: list[int], sign: int):
+        totals = self.user_totals.setdefault(uid, [0, 0, 0])
+        for i, value in enumerate(values):
+            totals[i] += sign * value
+        self.users.add(uid, sign * values[0])
+        if self.ranks is not None and values[0]:
+            self.ranks.set(uid, totals[0])
+        if not any(totals):
+            del self.user_totals[uid]
+
+    def _add_word(self, word: str, count: int, sign: int):
+        self.words.add(word, sign * count)
+        table = self.dict_words if self.is_dict.get(word) else self.nondict_words
+        table.add(word, sign * count)
+        if word not in self.words.totals:
+            self.is_dict.pop(word, None)  # Gone from both tables (edits, deletes, a reset); forget it too
+
+    def _set_dict(self, word: str, is_dict: bool):
+        if self.is_dict.get(word, False) == is_dict:
+            self.is_dict[word] = is_dict
+            return
+        # Reclassified: move its running total to the other table
+        total = self.words.get(word)
+        (self.dict_words if is_dict else self.nondict_words).add(word, total)
+        (self.nondict_words if is_dict else self.dict_words).add(word, -total)
+        self.is_dict[word] = is_dict
+
+    def apply(self, source: str, guilds: list[dict]):
+        contrib = self.sources.setdefault(source, {"users": {}, "guilds": {}, "words": {}}) if self.track_sources else None
+        self.version += 1
+        for entry in guilds:
+            gid = str(entry["g"])
+            for word in entry.get("d", ()):
+                self._set_dict(word, True)
+            messages = 0
+            for uid, values in entry.get("u", {}).items():
+                self._add_user(uid, values, 1)
+                if contrib is not None:
+                    mine = contrib["users"].setdefault(uid, [0, 0, 0])
+                    for i, value in enumerate(values):
+                        mine[i] += value
+                messages += values[0]
+            if messages:
+                self.guilds.add(gid, messages)
+                if contrib is not None:
+                    contrib["guilds"][gid] = contrib["guilds"].get(gid, 0) + messages
+            for word, count in entry.get("w", {}).items():
+                self.is_dict.setdefault(word, False)
+                self._add_word(word, count, 1)
+                if contrib is not None:
+                    contrib["words"][word] = contrib["words"].get(word, 0) + count
+
+    def record(self, gid: str, uid: str, words: int, characters: int, tokens: list[tuple[str, bool]]):
+        """Add one message directly; same arguments as AggregatorClient.record."""
+        counts: dict[str, int] = {}
+        dict_words = []
+        for word, is_dict in tokens:
+            counts[word] = counts.get(word, 0) + 1
+            if is_dict:
+                dict_words.append(word)
+        self.apply("local", [{"g": gid, "u": {uid: [1, words, characters]}, "w": counts, "d": dict_words}])
+
+    def adjust(self, gid: str, uid: str, values: list[int], counts: dict[str, int], dict_words: list[str]):
+        """Add signed [messages, words, characters] and word count deltas, e.g. for an edited or deleted message."""
+        self.apply("local", [{"g": gid, "u": {uid: values}, "w": counts, "d": dict_words}])
+
+    def reset(self, source: str):
+        contrib = self.sources.pop(source, None)
+        if not contrib:
+            return
+        self.version += 1
+        for uid, values in contrib["users"].items():
+            self._add_user(uid, values, -1)
+        for gid, messages in contrib["guilds"].items():
+            self.guilds.add(gid, -messages)
+        for word, count in contrib["words"].items():
+            self._add_word(word, count, -1)
+
+    def reclassify(self, dict_words, nondict_words):
+        """Move known words between the dictionary and non-dictionary tables, e.g. after a word list changed."""
+        self.version += 1
+        for words, is_dict in ((dict_words, True), (nondict_words, False)):
+            for word in words:
+                if word in self.is_dict:
+                    self._set_dict(word, is_dict)
+
+    def top(self, table: str, k: int) -> list[list]:
+        if table == "users":
+            return [[uid, *self.user_totals[uid]] for uid, _ in self.users.top(k)]
+        source = {"guilds": self.guilds, "words": self.words,
+                  "dict": self.dict_words, "nondict": self.nondict_words}[table]
+        return [[key, value] for key, value in source.top(k)]
+
+    def rank(self, uid: str) -> dict | None:
+        """Where `uid` stands by messages (see RankIndex.rank); None if they have none."""
+        if self.ranks is None:
+            self.ranks = RankIndex.from_counts((uid, values[0]) for uid, values in self.user_totals.items())
+        return self.ranks.rank(uid)
+
+    def state(self) -> dict:
+        """A copy of the totals, safe to serialize in a worker thread; see load_state."""
+        return {
+            "users": {uid: list(values) for uid, values in self.user_totals.items()},
+            "guilds": dict(self.guilds.totals),
+            "words": dict(self.words.totals),
+            "dict": [word for word, is_dict in self.is_dict.items() if is_dict],
+        }
+
+    def load_state(self, state: dict):
+        self.version += 1
+        self.user_totals = {uid: list(values) for uid, values in state["users"].items()}
+        self.users.load({uid: values[0] for uid, values in self.user_totals.items()})
+        self.ranks = None
+        self.guilds.load(state["guilds"])
+        words = state["words"]
+        self.is_dict = dict.fromkeys(words, False)
+        self.is_dict.update(dict.fromkeys(state["dict"], True))
+        self.words.load(words)
+        self.dict_words.load({word: count for word, count in words.items() if self.is_dict[word]})
+        self.nondict_words.load({word: count for word, count in words.items() if not self.is_dict[word]})
+
+    def info(self) -> dict:
+        return {
+            "sources": sorted(self.sources),
+            "users": len(self.user_totals),
+            "guilds": len(self.guilds),
+            "words": len(self.words),
+        }
+
+    def handle(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "delta":
+            self.apply(str(request["source"]), request.get("guilds", []))
+            return {"ok": True}
+        if op == "reset":
+            self.reset(str(request["source"]))
+            return {"ok": True}
+        if op == "reclassify":
+            self.reclassify(request.get("dict", []), request.get("nondict", []))
+            return {"ok": True}
+        if op == "top":
+            table = request.get("table")
+            if table not in TABLES:
+                return {"ok": False, "error": f"unknown table {table!r}"}
+            return {"ok": True, "rows": self.top(table, int(request.get("k", 10)))}
+        if op == "word":
+            word = str(request.get("word", "")).lower()
+            return {"ok": True, "count": self.words.get(word), "is_dict": self.is_dict.get(word)}
+        if op == "rank":
+            return {"ok": True, "rank": self.rank(str(request.get("user", "")))}
+        if op == "info":
+            return {"ok": True, **self.info()}
+        return {"ok": False, "error": f"unknown op {op!r}"}
+
+
+async def serve(path: str, aggregator: Aggregator | None = None) -> asyncio.AbstractServer:
+    """Listen on a Unix socket and answer aggregator requests."""
+    aggregator = aggregator or Aggregator()
+
+    async def on_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                try:
+                    reply = aggregator.handle(json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    reply = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(reply, separators=(",", ":")).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        except asyncio.CancelledError:
+            pass  # Shutting down; ending quietly keeps 3.11's stream callback from logging it
+        finally:
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)  # Stale socket from a previous run
+    return await asyncio.start_unix_server(on_client, path=path, limit=STREAM_LIMIT)
+
+
+# ----- Bot-side client -----
+class AggregatorUnavailable(Exception):
+    pass
+
+
+def guild_entry(gid: str, users: dict, counts: dict, vocab) -> dict:
+    words, is_dict = vocab.words, vocab.is_dict
+    return {
+        "g": gid,
+        "u": {uid: [rec["messages"], rec["words"], rec["characters"]] for uid, rec in users.items()},
+        "w": {words[widx]: count for widx, count in counts.items()},
+        "d": [words[widx] for widx in counts if is_dict[widx]],
+    }
+
+
+async def snapshot_shared() -> tuple[list[dict], list[str]]:
+    """This process's full totals as one delta entry per guild, archived guilds included.
+
+    Loaded guilds are copied on the event loop; archived guild files are read and converted in a
+    worker thread. A guild that changed while its file was being read is taken again from its
+    current state, and returned in the second list so the caller can drop deltas queued for it.
+    """
+    from shared import stats, words_stats, VOCAB, RESIDENCY
+
+    entries = [guild_entry(gid, stats.get(gid, {}), words_stats.get(gid, {}), VOCAB)
+               for gid in set(stats) | set(words_stats)]
+    archived = list(RESIDENCY.archived)
+    versions = {gid: RESIDENCY.versions.get(gid, 0) for gid in archived}
+
+    def read_archived():
+        return [(gid, guild_entry(gid, users, counts, VOCAB))
+                for gid, users, counts in RESIDENCY.iter_archived(archived)]
+
+    read = await asyncio.to_thread(read_archived)
+    changed = []
+    for gid, entry in read:
+        if RESIDENCY.versions.get(gid, 0) == versions[gid]:
+            entries.append(entry)
+        else:
+            changed.append(gid)
+    for gid in changed:  # Rare: reloaded and changed during the read. Everything below runs without yielding.
+        if gid in stats or gid in words_stats:
+            users, counts = stats.get(gid, {}), words_stats.get(gid, {})
+        else:
+            users, counts, _ = RESIDENCY._read(gid)
+        entries.append(guild_entry(gid, users, counts, VOCAB))
+    return entries, changed
+
+
+def _chunks(entries: list[dict], rows: int = SNAPSHOT_CHUNK):
+    batch, size = [], 0
+    for entry in entries:
+        batch.append(entry)
+        size += len(entry["u"]) + len(entry["w"])
+        if size >= rows:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+class AggregatorClient:
+    def __init__(self, path: str | None, source: str, flush_interval: float = 2.0):
+        self.path = path
+        self.source = source
+        self.flush_interval = flush_interval
+        self._pending: dict[str, dict] = {}
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def record(self, gid: str, uid: str, words: int, characters: int, tokens: list[tuple[str, bool]]):
+        """Queue one message's contribution; sent with the next flush."""
+        entry = self._pending.setdefault(gid, {"g": gid, "u": {}, "w": {}, "d": set()})
+        totals = entry["u"].setdefault(uid, [0, 0, 0])
+        totals[0] += 1
+        totals[1] += words
+        totals[2] += characters
+        counts = entry["w"]
+        for word, is_dict in tokens:
+            counts[word] = counts.get(word, 0) + 1
+            if is_dict:
+                entry["d"].add(word)
+
+    def adjust(self, gid: str, uid: str, values: list[int], counts: dict[str, int], dict_words: list[str]):
+        """Queue signed deltas for one user and their words; same arguments as Aggregator.adjust."""
+        entry = self._pending.setdefault(gid, {"g": gid, "u": {}, "w": {}, "d": set()})
+        totals = entry["u"].setdefault(uid, [0, 0, 0])
+        for i, value in enumerate(values):
+            totals[i] += value
+        pending = entry["w"]
+        for word, count in counts.items():
+            pending[word] = pending.get(word, 0) + count
+        entry["d"].update(dict_words)
+
+    def _take_pending(self) -> list[dict]:
+        entries = [{**entry, "d": list(entry["d"])} for entry in self._pending.values()]
+        self._pending.clear()
+        return entries
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def _request(self, payload: dict) -> dict:
+        async with self._lock:
+            if self._writer is None:
+                raise AggregatorUnavailable("not connected")
+            try:
+                self._writer.write(json.dumps(payload, separators=(",", ":")).encode() + b"\n")
+                await self._writer.drain()
+                line = await self._reader.readline()
+            except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+                self._close()
+                raise AggregatorUnavailable(str(e)) from e
+            if not line:
+                self._close()
+                raise AggregatorUnavailable("connection closed")
+        reply = json.loads(line)
+        if not reply.get("ok"):
+            raise AggregatorUnavailable(reply.get("error", "request failed"))
+        return reply
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_unix_connection(self.path, limit=STREAM_LIMIT)
+        # Snapshot and clear the queue together so nothing is counted twice
+        self._pending.clear()
+        entries, changed = await snapshot_shared()  # Read up front: the tables may change while uploading
+        for gid in changed:
+            self._pending.pop(gid, None)  # Its entry was taken after these deltas; they are already in it
+        await self._request({"op": "reset", "source": self.source})
+        for batch in _chunks(entries):
+            await self._request({"op": "delta", "source": self.source, "guilds": batch})
+        print(f"[aggregator] connected to {self.path} as {self.source}, uploaded {len(entries)} guild(s)")
+
+    async def flush(self):
+        entries = self._take_pending()
+        if entries:
+            # If this fails the deltas are dropped; the reconnect re-uploads full totals
+            await self._request({"op": "delta", "source": self.source, "guilds": entries})
+
+    async def _run(self):
+        backoff = 1.0
+        while True:
+            try:
+                if not self.connected:
+                    await self._connect()
+                    backoff = 1.0
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+            except (OSError, AggregatorUnavailable) as e:
+                self._close()
+                print(f"[aggregator] {e}; retrying in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(60.0, backoff * 2)
+
+    def start(self):
+        if self.enabled and not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.connected:
+            try:
+                await self.flush()
+            except AggregatorUnavailable:
+                pass
+        self._close()
+
+    async def reclassify(self, dict_words: list[str], nondict_words: list[str]):
+        await self._request({"op": "reclassify", "dict": dict_words, "nondict": nondict_words})
+
+    async def top(self, table: str, k: int = 10) -> list[list]:
+        return (await self._request({"op": "top", "table": table, "k": k}))["rows"]
+
+    async def word(self, word: str) -> dict:
+        return await self._request({"op": "word", "word": word})
+
+    async def rank(self, uid: str) -> dict | None:
+        return (await self._request({"op": "rank", "user": uid}))["rank"]
+
+
+AGGREGATOR = AggregatorClient(
+    AGGREGATOR_SOCKET,
+    source=f"cluster-{CLUSTER_ID}" if CLUSTER_ID is not None else "main",
+    flush_interval=AGGREGATOR_FLUSH_SECONDS,
+)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Run the cross-process stats aggregator")
+    parser.add_argument("--socket", default=AGGREGATOR_SOCKET, help="Unix socket path to listen on")
+    parser.add_argument("--k", type=int, default=100, help="Rows kept in each top-K table")
+    args = parser.parse_args()
+    if not args.socket:
+        parser.error("--socket or AGGREGATOR_SOCKET is required")
+
+    async def run():
+        server = await serve(args.socket, Aggregator(k=args.k))
+        print(f"[aggregator] listening on {args.socket}", flush=True)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await stop.wait()
+        server.close()
+        await server.wait_closed()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,113 @@
+import asyncio
+import io
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # Optional: leaderboards fall back to embed fields
+    Image = None
+
+from config import CARD_CACHE_SIZE, CARD_RENDER_THREADS
+from core.metrics import CARD_RENDERS, CARD_RENDER_SECONDS
+
+# ----- Leaderboard image cards -----
+# Renders a top-10 board as a PNG with Pillow. Rendering runs on a small
+# dedicated thread pool, so it neither blocks the event loop nor queues behind
+# file I/O on asyncio's default executor. Finished cards are kept per scope
+# (e.g. "lb:global", "topwords:<guild_id>") in LRU order, tagged with the data
+# version they were drawn from; a request for an unchanged board reuses the
+# bytes. The rows are compared too, since a name resolved later changes the
+# card without changing the stats.
+
+WIDTH = 800
+HEADER = 96
+ROW_HEIGHT = 52
+PADDING = 28
+BACKGROUND = (30, 31, 34)
+TEXT = (242, 243, 245)
+MUTED = (148, 155, 164)
+BAR = (88, 101, 242)
+MEDALS = {1: (240, 190, 50), 2: (192, 199, 207), 3: (205, 127, 50)}
+
+
+def available() -> bool:
+    return Image is not None
+
+
+def _font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 has a single bitmap size
+        return ImageFont.load_default()
+
+
+def _fit(draw, text: str, font, width: float) -> str:
+    """`text`, shortened with an ellipsis until it fits in `width` pixels."""
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+def render_card(title: str, subtitle: str, rows: tuple[tuple[str, str, int], ...]) -> bytes:
+    """PNG of a board; `rows` are (label, value text, value) with the value scaling each bar."""
+    height = HEADER + ROW_HEIGHT * len(rows) + PADDING
+    image = Image.new("RGB", (WIDTH, height), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    title_font, label_font, small_font = _font(30), _font(20), _font(16)
+    draw.text((PADDING, 22), title, font=title_font, fill=TEXT)
+    draw.text((PADDING, 62), subtitle, font=small_font, fill=MUTED)
+
+    top = max((value for _, _, value in rows), default=0) or 1
+    bar_left, bar_width = PADDING + 48, WIDTH - 2 * PADDING - 48
+    for rank, (label, text, value) in enumerate(rows, start=1):
+        y = HEADER + (rank - 1) * ROW_HEIGHT
+        draw.text((PADDING, y + 12), f"{rank}.", font=label_font, fill=MEDALS.get(rank, MUTED))
+        draw.rounded_rectangle(
+            (bar_left, y + 40, bar_left + max(4, int(bar_width * value / top)), y + 46), radius=3, fill=BAR,
+        )
+        text_width = draw.textlength(text, font=small_font)
+        label = _fit(draw, label, label_font, WIDTH - PADDING - text_width - bar_left - 16)
+        draw.text((bar_left, y + 10), label, font=label_font, fill=TEXT)
+        draw.text((WIDTH - PADDING, y + 14), text, font=small_font, fill=MUTED, anchor="ra")
+
+    out = io.BytesIO()
+    image.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+
+class CardRenderer:
+    def __init__(self, max_entries: int = 64, threads: int = 2):
+        self.max_entries = max_entries
+        self.threads = threads
+        self._cache: OrderedDict[str, tuple] = OrderedDict()  # scope -> (version, title, rows, png)
+        self._executor: ThreadPoolExecutor | None = None
+
+    def __len__(self):
+        return len(self._cache)
+
+    async def render(self, scope: str, version, title: str, subtitle: str, rows) -> bytes:
+        """PNG for the board at `scope`; re-rendered only when `version` or the rows changed."""
+        rows = tuple(rows)
+        cached = self._cache.get(scope)
+        if cached is not None and cached[:3] == (version, title, rows):
+            self._cache.move_to_end(scope)
+            CARD_RENDERS.inc(result="cached")
+            return cached[3]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="card")
+        started = time.perf_counter()
+        png = await asyncio.get_running_loop().run_in_executor(self._executor, render_card, title, subtitle, rows)
+        CARD_RENDER_SECONDS.observe(time.perf_counter() - started)
+        CARD_RENDERS.inc(result="rendered")
+        self._cache[scope] = (version, title, rows, png)
+        self._cache.move_to_end(scope)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return png
+
+
+CARDS = CardRenderer(CARD_CACHE_SIZE, CARD_RENDER_THREADS)
@@ -0,0 +1,85 @@
+from core.topk import TopK
+
+# ----- Channel stats -----
+# The lowest level of the stats hierarchy: channel -> guild -> global. Every
+# message is added to each level as it arrives (this table, the guild's user
+# records, the global totals), so a query at any level reads counts that are
+# already summed instead of adding up the level below. Thread messages count
+# towards their parent channel.
+#
+# Per guild, channels are ranked by messages in a TopK, and each channel ranks
+# its own users in another, so "top channels" and "top users in a channel" cost
+# O(K) however many channels and users there are. Kept in the guild's file,
+# next to its users and words (core/storage.py).
+
+CHANNEL_TOP_K = 10
+
+
+class ChannelStats:
+    __slots__ = ("messages", "words", "characters", "users")
+
+    def __init__(self, k: int = CHANNEL_TOP_K):
+        self.messages = 0
+        self.words = 0
+        self.characters = 0
+        self.users = TopK(k)  # user_id -> messages in this channel
+
+    def copy(self) -> "ChannelStats":
+        channel = ChannelStats(self.users.k)
+        channel.messages, channel.words, channel.characters = self.messages, self.words, self.characters
+        channel.users = self.users.copy()
+        return channel
+
+
+class GuildChannels:
+    def __init__(self, k: int = CHANNEL_TOP_K):
+        self.k = k
+        self.channels: dict[str, ChannelStats] = {}
+        self.ranking = TopK(k)  # channel_id -> messages
+        self.rows = 0           # One per user of each channel, for the residency budget
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def get(self, cid: str) -> ChannelStats | None:
+        return self.channels.get(cid)
+
+    def record(self, cid: str, uid: str, messages: int, words: int, characters: int):
+        """Add (or with negative values, take back) messages of `uid` in `cid`."""
+        channel = self.channels.get(cid)
+        if channel is None:
+            channel = self.channels[cid] = ChannelStats(self.k)
+        channel.messages += messages
+        channel.words += words
+        channel.characters += characters
+        if messages:
+            users = len(channel.users)
+            channel.users.add(uid, messages)
+            self.rows += len(channel.users) - users
+            self.ranking.add(cid, messages)
+        if channel.messages <= 0 and not channel.users:
+            del self.channels[cid]
+
+    def top(self, n: int = CHANNEL_TOP_K) -> list[tuple[str, ChannelStats]]:
+        return [(cid, self.channels[cid]) for cid, _ in self.ranking.top(n)]
+
+    def to_rows(self) -> list[list]:
+        """[[channel_id, messages, words, characters, [[user_id, messages], ...]], ...], for the guild file."""
+        return [[cid, c.messages, c.words, c.characters, list(c.users.totals.items())]
+                for cid, c in self.channels.items()]
+
+    @classmethod
+    def from_rows(cls, rows, k: int = CHANNEL_TOP_K) -> "GuildChannels":
+        table = cls(k)
+        for cid, messages, words, characters, users in rows:
+            channel = table.channels[cid] = ChannelStats(k)
+            channel.messages, channel.words, channel.characters = messages, words, characters
+            channel.users.load(dict(users))
+            table.rows += len(channel.users)
+        table.ranking.load({cid: c.messages for cid, c in table.channels.items()})
+        return table
+
+
+def channel_of(channel) -> str:
+    """The channel a message counts towards: its own, or a thread's parent."""
+    return str(getattr(channel, "parent_id", None) or channel.id)
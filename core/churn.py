@@ -0,0 +1,73 @@
+import asyncio
+import time
+import traceback
+
+from core.metrics import GUILD_CHURN_EVENTS, CHURN_UPDATES, CHURN_UPDATES_SAVED
+
+# ----- Guild churn coalescing -----
+# Joining or leaving a guild used to trigger a presence change and a member
+# sweep of every guild, each time. During mass joins (or a wave of removals
+# after an outage) that is a burst of gateway and REST calls that only get
+# rate-limited. Events are collected here instead and applied together once no
+# new one arrived for `window` seconds (or `max_delay` after the first), as a
+# single presence update and a single member refresh: only the joined guilds
+# when nothing was removed, otherwise one full sweep.
+
+
+class GuildChurn:
+    def __init__(self, apply, window: float = 10.0, max_delay: float = 60.0):
+        self.apply = apply              # async apply(joined: list[Guild], removed: set[int])
+        self.window = window
+        self.max_delay = max_delay
+        self.joined: dict[int, object] = {}   # guild_id -> Guild
+        self.removed: set[int] = set()
+        self.events = 0
+        self._event = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._applying = asyncio.Lock()  # A slow member sweep must not overlap the next window's
+
+    def _note(self, kind: str):
+        GUILD_CHURN_EVENTS.inc(event=kind)
+        self.events += 1
+        self._event.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def joined_guild(self, guild):
+        self.removed.discard(guild.id)
+        self.joined[guild.id] = guild
+        self._note("join")
+
+    def removed_guild(self, guild):
+        self.joined.pop(guild.id, None)
+        self.removed.add(guild.id)
+        self._note("remove")
+
+    async def _run(self):
+        first = time.monotonic()
+        while True:
+            self._event.clear()
+            remaining = min(self.window, first + self.max_delay - time.monotonic())
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break  # Quiet for a whole window
+        joined, removed, events = list(self.joined.values()), self.removed, self.events
+        self.joined, self.removed, self.events = {}, set(), 0
+        self._task = None  # Events from here on start the next window
+        refresh = "full" if removed else "targeted" if joined else None
+        CHURN_UPDATES.inc(kind="presence")
+        CHURN_UPDATES_SAVED.inc(events - 1, kind="presence")
+        if refresh is not None:
+            CHURN_UPDATES.inc(kind=f"{refresh} member refresh")
+            CHURN_UPDATES_SAVED.inc(events - 1, kind="member refresh")
+        try:
+            async with self._applying:
+                await self.apply(joined, removed)
+        except Exception:
+            traceback.print_exc()
+        if events > 1:
+            print(f"[churn] applied {len(joined)} join(s) and {len(removed)} removal(s) "
+                  f"from {events} events with one presence update and one {refresh} member refresh")
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+
+import discord
+
+from config import ROOT_DB_DIR
+
+# ----- Command tree sync registry -----
+# Hashes the local command tree per scope (global or a guild) and only calls
+# tree.sync() when the hash changed. The command IDs Discord returned are
+# persisted so /help mentions and the startup listing need no REST calls.
+# The file is shared by all cluster workers; only the primary cluster syncs.
+
+REGISTRY_FILE = os.path.join(ROOT_DB_DIR, "commands.json")
+
+
+def _scope_key(guild: discord.abc.Snowflake | None) -> str:
+    return "global" if guild is None else str(guild.id)
+
+
+def tree_hash(tree: discord.app_commands.CommandTree, guild: discord.abc.Snowflake | None = None) -> str:
+    """Stable hash of everything tree.sync() would upload for this scope."""
+    payload = [cmd.to_dict(tree) for cmd in tree.get_commands(guild=guild)]
+    payload.sort(key=lambda d: (d.get("type", 1), d["name"]))
+    blob = json.dumps(
+        {"application_id": tree.client.application_id, "commands": payload},
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class CommandRegistry:
+    def __init__(self, path: str = REGISTRY_FILE):
+        self.path = path
+        # scope -> {"hash": str, "ids": {command name: command id}}
+        self.scopes: dict[str, dict] = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.scopes = data.get("scopes", {})
+        except (OSError, ValueError):
+            self.scopes = {}
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"scopes": self.scopes}, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def ids(self) -> dict[str, int]:
+        """Command name -> ID across every scope (guild scopes override global)."""
+        merged: dict[str, int] = {}
+        for scope in sorted(self.scopes, key=lambda s: s != "global"):
+            merged.update({name: int(cid) for name, cid in self.scopes[scope].get("ids", {}).items()})
+        return merged
+
+    def get(self, name: str) -> int | None:
+        return self.ids().get(name)
+
+    def _store(self, guild, digest: str, commands: list[discord.app_commands.AppCommand]):
+        self.scopes[_scope_key(guild)] = {
+            "hash": digest,
+            "ids": {cmd.name: cmd.id for cmd in commands},
+        }
+        self.save()
+
+    async def sync(self, tree, guild: discord.abc.Snowflake | None = None, force: bool = False) -> bool:
+        """Sync the tree for this scope if it changed. Returns True if a sync was sent."""
+        digest = tree_hash(tree, guild)
+        scope = self.scopes.get(_scope_key(guild), {})
+        if not force and scope.get("hash") == digest:
+            return False
+        commands = await tree.sync(guild=guild)
+        self._store(guild, digest, commands)
+        return True
+
+
+COMMAND_REGISTRY = CommandRegistry()
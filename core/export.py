@@ -0,0 +1,93 @@
+import csv
+import gzip
+import io
+import json
+import os
+
+try:
+    import zstandard
+except ImportError:  # Optional: gzip is always available
+    zstandard = None
+
+# ----- Streaming table export -----
+# Writes a guild's rows to compressed CSV or NDJSON part files on disk, meant to
+# run in a worker thread. Rows are read by key in bounded chunks straight from
+# the live tables (dict lookups are safe under the GIL; a row removed meanwhile
+# is skipped), so neither the rows nor the output are held in memory. A new part
+# is started before the compressed output would exceed the upload limit.
+
+CHUNK_ROWS = 5_000
+FORMATS = ("csv", "ndjson")
+
+
+def compressions() -> tuple[str, ...]:
+    return ("gzip", "zstd") if zstandard is not None else ("gzip",)
+
+
+class PartWriter:
+    def __init__(self, directory: str, prefix: str, fmt: str, compression: str, fields: list[str], limit: int):
+        self.directory = directory
+        self.prefix = prefix
+        self.fmt = fmt
+        self.compression = compression
+        self.fields = fields
+        # Compressors buffer some output internally; leave headroom below the limit
+        self.limit = limit - min(1 << 20, limit // 10)
+        self.paths: list[str] = []
+        self._raw = None
+        self._stream = None
+        self._text = None
+        self._csv = None
+
+    def _open(self):
+        ext = "csv" if self.fmt == "csv" else "ndjson"
+        suffix = "gz" if self.compression == "gzip" else "zst"
+        path = os.path.join(self.directory, f"{self.prefix}-part{len(self.paths) + 1}.{ext}.{suffix}")
+        self._raw = open(path, "wb")
+        if self.compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode="wb")
+        else:
+            self._stream = zstandard.ZstdCompressor(level=6).stream_writer(self._raw, closefd=False)
+        self._text = io.TextIOWrapper(self._stream, encoding="utf-8", newline="")
+        if self.fmt == "csv":
+            self._csv = csv.DictWriter(self._text, fieldnames=self.fields)
+            self._csv.writeheader()
+        self.paths.append(path)
+
+    def write_chunk(self, rows: list[dict]):
+        if self._raw is None:
+            self._open()
+        if self._csv is not None:
+            self._csv.writerows(rows)
+        else:
+            self._text.writelines(json.dumps(row, separators=(",", ":")) + "\n" for row in rows)
+        self._text.flush()
+        if self._raw.tell() >= self.limit:
+            self.close()
+
+    def close(self):
+        if self._raw is None:
+            return
+        self._text.close()  # Closes the compressor, which writes its trailer
+        self._raw.close()
+        self._raw = self._stream = self._text = self._csv = None
+
+
+def export_table(directory: str, prefix: str, fmt: str, compression: str, limit: int,
+                 keys: list, fields: list[str], project) -> tuple[list[str], int]:
+    """Write project(key) for every key (None rows are skipped). Returns (part paths, rows written)."""
+    writer = PartWriter(directory, prefix, fmt, compression, fields, limit)
+    written = 0
+    try:
+        for start in range(0, len(keys), CHUNK_ROWS):
+            rows = []
+            for key in keys[start:start + CHUNK_ROWS]:
+                row = project(key)
+                if row is not None:
+                    rows.append(row)
+            if rows:
+                writer.write_chunk(rows)
+                written += len(rows)
+    finally:
+        writer.close()
+    return writer.paths, written
@@ -0,0 +1,185 @@
+import mmap
+import os
+from array import array
+
+from core.storage import read_json, write_json
+
+# ----- Dictionaries (word lists per locale) -----
+# Each locale's word list (db/american-english for "en", db/dictionaries/<locale>
+# for the others) is normalized once into a sorted, deduplicated file under the
+# db directory plus an index of line offsets. Lookups binary-search the file
+# through mmap, so a list costs a few bytes of offsets per word instead of a
+# Python set, and the pages are shared by every process (cluster workers, the
+# importer's pool) that maps it.
+#
+# Locales are numbered into a bitmask. A word's mask (which lists contain it) is
+# cached per vocabulary index, two bytes per distinct word, so classifying a word
+# for any guild after the first lookup is a single array read. Guilds pick their
+# locales with /locales; the rest use DEFAULT_LOCALES, which also decides the
+# global is_dict flag kept in the vocabulary.
+
+MAX_LOCALES = 15
+CLASSIFIED = 1 << 15   # Set in a cached mask once the word has been looked up
+CLASSIFY_CHUNK = 50_000
+
+
+def dictionary_sources(english_path: str, directory: str) -> dict[str, str]:
+    """Locale -> word list path: "en" for the shipped list, plus one per file in `directory`."""
+    sources = {"en": english_path} if os.path.exists(english_path) else {}
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path) and not name.startswith("."):
+                sources[os.path.splitext(name)[0].lower()] = path
+    return sources
+
+
+def _build(source: str, words_path: str, index_path: str):
+    with open(source, encoding="utf-8") as f:
+        words = sorted({line.strip().lower().encode("utf-8") for line in f if line.strip()})
+    offsets = array("I", [0])
+    position = 0
+    for word in words:
+        position += len(word) + 1
+        offsets.append(position)
+    for path, write in ((words_path, lambda f: f.writelines(word + b"\n" for word in words)),
+                        (index_path, offsets.tofile)):
+        tmp = f"{path}.{os.getpid()}.tmp"  # Cluster workers may build the same list at once
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+
+
+class WordList:
+    def __init__(self, source: str, cache_dir: str, name: str):
+        words_path = os.path.join(cache_dir, f"{name}.words")
+        index_path = os.path.join(cache_dir, f"{name}.idx")
+        if (not os.path.exists(words_path) or not os.path.exists(index_path)
+                or os.path.getmtime(index_path) < os.path.getmtime(source)):
+            os.makedirs(cache_dir, exist_ok=True)
+            _build(source, words_path, index_path)
+        self.offsets = array("I")
+        with open(index_path, "rb") as f:
+            self.offsets.frombytes(f.read())
+        with open(words_path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def _word(self, i: int) -> bytes:
+        return self._data[self.offsets[i]:self.offsets[i + 1] - 1]
+
+    def __contains__(self, word: str) -> bool:
+        key = word.encode("utf-8")
+        lo, hi = 0, len(self.offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < len(self.offsets) - 1 and self._word(lo) == key
+
+    def __iter__(self):
+        return (self._word(i).decode("utf-8") for i in range(len(self)))
+
+    def chunks(self, size: int):
+        """The words in lists of up to `size`, read straight from the mapped file."""
+        for start in range(0, len(self), size):
+            end = min(start + size, len(self))
+            yield self._data[self.offsets[start]:self.offsets[end]].decode("utf-8").splitlines()
+
+
+class Lexicon:
+    def __init__(self, sources: dict[str, str], default_locales: list[str], cache_dir: str,
+                 vocab=None, guilds_path: str | None = None):
+        self.sources = sources
+        # "en" keeps bit 0; more locales than fit in the mask are ignored
+        self.locales = sorted(sources, key=lambda locale: (locale != "en", locale))[:MAX_LOCALES]
+        self.bits = {locale: 1 << i for i, locale in enumerate(self.locales)}
+        self.cache_dir = cache_dir
+        self.vocab = vocab
+        self.guilds_path = guilds_path
+        self.lists: dict[str, WordList] = {}
+        self.default_locales = [locale for locale in default_locales if locale in self.bits]
+        self.default_mask = self.mask(self.default_locales)
+        self.guilds: dict[str, int] = {}   # guild_id -> locale mask, for guilds that chose their own
+        self.masks = array("H")            # vocabulary index -> cached locale mask (0 = not looked up yet)
+
+    def load(self):
+        for locale in self.locales:
+            self.lists[locale] = WordList(self.sources[locale], self.cache_dir, locale)
+        if self.guilds_path:
+            choices = read_json(self.guilds_path) or {}
+            self.guilds = {gid: self.mask(locales) for gid, locales in choices.items()}
+
+    def save(self) -> int:
+        if not self.guilds_path:
+            return 0
+        return write_json(self.guilds_path, {gid: self.names(mask) for gid, mask in self.guilds.items()})
+
+    def mask(self, locales) -> int:
+        return sum(self.bits[locale] for locale in set(locales) if locale in self.bits)
+
+    def names(self, mask: int) -> list[str]:
+        return [locale for locale in self.locales if mask & self.bits[locale]]
+
+    def word_mask(self, word: str) -> int:
+        """Which word lists contain `word`."""
+        return sum(bit for locale, bit in self.bits.items() if word in self.lists[locale])
+
+    def in_default(self, word: str) -> bool:
+        return any(word in self.lists[locale] for locale in self.default_locales)
+
+    def classify(self, widx: int) -> int:
+        """Locale mask of vocabulary word `widx`, looked up on first use and cached."""
+        masks = self.masks
+        if widx >= len(masks):
+            masks.frombytes(bytes(2 * (len(self.vocab) - len(masks))))
+        mask = masks[widx]
+        if not mask:
+            mask = masks[widx] = self.word_mask(self.vocab.words[widx]) | CLASSIFIED
+        return mask
+
+    def classify_vocab(self, count: int, on_chunk=None) -> array:
+        """Masks of the first `count` vocabulary words, computed in bulk rather than word by word.
+
+        Each word list is streamed once in chunks whose words are looked up in the vocabulary's
+        word -> index dict, so the cost follows the size of the lists, not of the vocabulary.
+        `on_chunk(words)` is called after every chunk, for progress reporting.
+        """
+        masks = array("H", [CLASSIFIED]) * count
+        index = self.vocab.index
+        for locale, bit in self.bits.items():
+            for chunk in self.lists[locale].chunks(CLASSIFY_CHUNK):
+                for word in chunk:
+                    widx = index.get(word)
+                    if widx is not None and widx < count:  # Added after the job started: classified on first use
+                        masks[widx] |= bit
+                if on_chunk is not None:
+                    on_chunk(len(chunk))
+        return masks
+
+    def adopt(self, other: "Lexicon"):
+        """Switch to the word lists and cached masks of `other` in one step, keeping each guild's choice."""
+        choices = {gid: self.names(mask) for gid, mask in self.guilds.items()}
+        self.sources, self.locales, self.bits, self.lists = other.sources, other.locales, other.bits, other.lists
+        self.default_locales, self.default_mask = other.default_locales, other.default_mask
+        self.masks = other.masks
+        self.guilds = {gid: self.mask(locales) for gid, locales in choices.items() if self.mask(locales)}
+
+    def is_dict(self, widx: int, mask: int) -> bool:
+        return bool(self.classify(widx) & mask)
+
+    def guild_mask(self, gid: str) -> int:
+        return self.guilds.get(gid, self.default_mask)
+
+    def set_guild(self, gid: str, locales: list[str]):
+        """Use `locales` for `gid`; the defaults if empty."""
+        mask = self.mask(locales)
+        if mask and mask != self.default_mask:
+            self.guilds[gid] = mask
+        else:
+            self.guilds.pop(gid, None)
+        self.save()
@@ -0,0 +1,131 @@
+import asyncio
+import contextvars
+import time
+from collections import deque
+
+from core.metrics import REGISTRY
+
+# ----- Event loop lag monitor -----
+# A background task sleeps for a fixed interval and records how late it wakes up.
+# Every loop callback is also timed, so a stall can be pinned on the handler
+# (on_message, a slash command, ...) whose step was running when it happened.
+
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "chatcounter_loop_lag_seconds",
+    "Event loop wake-up delay measured by the lag sampler",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+SLOW_CALLBACKS = REGISTRY.counter(
+    "chatcounter_slow_callbacks_total",
+    "Event loop callbacks that ran longer than the stall threshold",
+    ("handler",),
+)
+
+# Name of the handler running in the current task. Every event and interaction is
+# dispatched in its own task, so setting it at the top of a handler scopes it to that handler.
+CURRENT_HANDLER: contextvars.ContextVar[str | None] = contextvars.ContextVar("current_handler", default=None)
+
+
+def _describe_callback(handle) -> str:
+    callback = getattr(handle, "_callback", None)
+    task = getattr(callback, "__self__", None)
+    if isinstance(task, asyncio.Task):
+        coro = task.get_coro()
+        return getattr(coro, "__qualname__", repr(coro))
+    return getattr(callback, "__qualname__", repr(callback))
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = 0.25, threshold: float = 0.1, windows=(60, 300, 900), max_stalls: int = 50):
+        self.interval = interval
+        self.threshold = threshold
+        self.windows = tuple(windows)
+        # (monotonic timestamp, lag seconds) covering the largest window
+        self.samples: deque[tuple[float, float]] = deque(maxlen=int(max(self.windows) / interval) + 1)
+        # (wall timestamp, duration seconds, handler, callback)
+        self.stalls: deque[tuple[float, float, str, str]] = deque(maxlen=max_stalls)
+        self._task: asyncio.Task | None = None
+        self._original_run = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, debug: bool = False):
+        """Start sampling on the running loop and enable slow-callback reporting."""
+        if self.running:
+            return
+        loop = asyncio.get_running_loop()
+        loop.slow_callback_duration = self.threshold
+        if debug:
+            # asyncio's own debug mode additionally logs slow callbacks with tracebacks
+            loop.set_debug(True)
+        self._install_callback_timer()
+        self._task = loop.create_task(self._sample(), name="loop-lag-monitor")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._original_run is not None:
+            asyncio.events.Handle._run = self._original_run
+            self._original_run = None
+
+    def _install_callback_timer(self):
+        if self._original_run is not None:
+            return
+        original = asyncio.events.Handle._run
+        monitor = self
+
+        def _run(handle):
+            started = time.perf_counter()
+            original(handle)
+            elapsed = time.perf_counter() - started
+            if elapsed >= monitor.threshold:
+                monitor._record_stall(handle, elapsed)
+
+        self._original_run = original
+        asyncio.events.Handle._run = _run
+
+    def _record_stall(self, handle, elapsed: float):
+        context = getattr(handle, "_context", None)
+        handler = context.get(CURRENT_HANDLER) if context is not None else None
+        handler = handler or "unknown"
+        SLOW_CALLBACKS.inc(handler=handler)
+        self.stalls.append((time.time(), elapsed, handler, _describe_callback(handle)))
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.samples.append((time.monotonic(), lag))
+            LOOP_LAG_SECONDS.observe(lag)
+
+    def percentiles(self, window: float) -> dict[str, float] | None:
+        """p50/p95/p99/max lag in seconds over the last `window` seconds."""
+        cutoff = time.monotonic() - window
+        recent = sorted(lag for at, lag in self.samples if at >= cutoff)
+        if not recent:
+            return None
+        return {
+            "p50": _percentile(recent, 0.50),
+            "p95": _percentile(recent, 0.95),
+            "p99": _percentile(recent, 0.99),
+            "max": recent[-1],
+            "samples": len(recent),
+        }
+
+    def recent_stalls(self, limit: int = 5) -> list[tuple[float, float, str, str]]:
+        return list(self.stalls)[-limit:][::-1]
+
+
+LOOP_MONITOR = LoopMonitor()
@@ -0,0 +1,124 @@
+import random
+import sys
+import time
+import types
+
+# ----- Memory accounting -----
+# Deep-size helpers for /dev memory. The event loop takes copies (or a sample)
+# of the table rows; the expensive object walk runs in a worker thread.
+
+# Tables of more rows than this (over all guilds) are measured on a random sample and extrapolated
+SAMPLE_LIMIT = 200_000
+SAMPLE_SIZE = 20_000
+
+_ATOMIC = (str, bytes, int, float, bool, type(None))
+_SKIP = (types.ModuleType, type, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def deep_sizeof(obj, seen: set | None = None, stop_types: tuple = ()) -> int:
+    """Approximate retained size of `obj`, following containers and instance attributes."""
+    if seen is None:
+        seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SKIP) or (stop_types and isinstance(current, stop_types)):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, _ATOMIC):
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        else:
+            attrs = getattr(current, "__dict__", None)
+            if attrs is not None:
+                stack.append(attrs)
+            for slot in getattr(type(current), "__slots__", ()):
+                value = getattr(current, slot, None)
+                if value is not None:
+                    stack.append(value)
+    return total
+
+
+def snapshot_table(table: dict, copy_value=None, inner=None) -> dict:
+    """Rows of a {group: {key: value}} table for measure(); runs on the event loop.
+
+    The walk runs in a worker thread while the bot keeps updating the table, so rows are taken
+    here and mutable values copied with `copy_value`. `inner(value)` gives a group's row dict when
+    it is wrapped in an object. Over SAMPLE_LIMIT rows in total, SAMPLE_SIZE rows are sampled
+    across the groups in proportion to their size.
+    """
+    copy_value = copy_value or (lambda value: value)
+    groups = {group: inner(value) if inner else value for group, value in table.items()}
+    counts = {group: len(entries) for group, entries in groups.items()}
+    total = sum(counts.values())
+    if total > SAMPLE_LIMIT:
+        fraction = SAMPLE_SIZE / total
+        rows = []
+        for group, entries in groups.items():
+            n = min(len(entries), int(len(entries) * fraction + random.random()))
+            if n:
+                rows.extend((group, key, copy_value(entries[key])) for key in random.sample(list(entries), n))
+    else:
+        rows = [(group, key, copy_value(value)) for group, entries in groups.items() for key, value in entries.items()]
+    return {
+        "rows": rows,
+        "counts": counts,
+        "overhead": {group: sys.getsizeof(entries) for group, entries in groups.items()},  # Hash tables
+        "container": sys.getsizeof(table),
+        "estimated": total > SAMPLE_LIMIT,
+    }
+
+
+def _measure_rows(section: dict) -> tuple[int, dict]:
+    """Total size and {group: (rows, bytes)} of a snapshot_table() section, scaling up a sample."""
+    seen: set = set()
+    sizes: dict = {}
+    for group, key, value in section["rows"]:
+        sizes[group] = sizes.get(group, 0) + deep_sizeof(key, seen) + deep_sizeof(value, seen)
+    counts, overhead = section["counts"], section["overhead"]
+    if section["estimated"]:
+        avg = sum(sizes.values()) / max(1, len(section["rows"]))
+        per_group = {group: (count, overhead[group] + int(count * avg)) for group, count in counts.items()}
+    else:
+        per_group = {group: (count, overhead[group] + sizes.get(group, 0)) for group, count in counts.items()}
+    return section["container"] + sum(size for _, size in per_group.values()), per_group
+
+
+def measure(snapshot: dict) -> dict:
+    """Walk a snapshot taken by the bot; safe to run in a worker thread.
+
+    `snapshot` maps section name -> a snapshot_table() section for tables, or
+    {"objects", "scale", "count"} for object populations (member cache, views, word lists).
+    """
+    started = time.perf_counter()
+    report = {}
+    for name, section in snapshot.items():
+        if "rows" in section:
+            size, per_group = _measure_rows(section)
+            report[name] = {
+                "rows": sum(section["counts"].values()),
+                "bytes": size,
+                "estimated": section["estimated"],
+                "groups": per_group,
+            }
+        else:
+            objects = section["objects"]
+            stop_types = section.get("stop_types", ())
+            size = sum(deep_sizeof(obj, stop_types=stop_types) for obj in objects)
+            scale = section.get("scale", len(objects))
+            if objects and scale != len(objects):
+                size = int(size / len(objects) * scale)
+            report[name] = {
+                "rows": section.get("count", scale),
+                "bytes": size,
+                "estimated": scale != len(objects),
+                "groups": {},
+            }
+    report["_elapsed"] = time.perf_counter() - started
+    return report
@@ -0,0 +1,406 @@
+import asyncio
+import bisect
+import math
+import threading
+import time
+
+# ----- Metric types -----
+# Tiny in-process metrics registry rendered in the Prometheus text format.
+# Kept dependency-free so offline tools (benchmarks, importers) can use it too.
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """Yield (suffix, labels, value) tuples for exposition."""
+        return iter(())
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def values(self) -> dict[tuple, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._values.values())
+
+    def samples(self):
+        for key, value in sorted(self.values().items()):
+            yield "", _format_labels(self.labelnames, key), value
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+        self._functions: dict[tuple, callable] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn, **labels):
+        """Compute the gauge lazily at scrape time (e.g. table sizes)."""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = fn
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        fn = self._functions.get(key)
+        if fn is not None:
+            return fn()
+        return self._values.get(key, 0)
+
+    def values(self) -> dict[tuple, float]:
+        with self._lock:
+            current = dict(self._values)
+            functions = dict(self._functions)
+        for key, fn in functions.items():
+            try:
+                current[key] = fn()
+            except Exception:
+                continue
+        return current
+
+    def samples(self):
+        for key, value in sorted(self.values().items()):
+            yield "", _format_labels(self.labelnames, key), value
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self._start
+        self.histogram.observe(self.elapsed, **self.labels)
+        return False
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # key -> [per-bucket counts..., sum, count]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            row[index] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def time(self, **labels) -> _Timer:
+        """Context manager that observes the elapsed wall time of its block."""
+        return _Timer(self, labels)
+
+    def values(self) -> dict[tuple, list]:
+        with self._lock:
+            return {key: list(row) for key, row in self._values.items()}
+
+    def count(self, **labels) -> int:
+        row = self._values.get(self._key(labels))
+        return row[-1] if row else 0
+
+    def quantile(self, q: float, **labels) -> float | None:
+        """Estimate a quantile by linear interpolation inside the matching bucket."""
+        row = self.values().get(self._key(labels))
+        return self._quantile(row, q) if row else None
+
+    def merged_quantile(self, q: float) -> float | None:
+        """Quantile over every label set combined."""
+        rows = list(self.values().values())
+        if not rows:
+            return None
+        merged = [sum(column) for column in zip(*rows)]
+        return self._quantile(merged, q)
+
+    def _quantile(self, row, q):
+        total = row[-1]
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        lower = 0.0
+        for bound, hits in zip(self.buckets, row):
+            if hits and cumulative + hits >= rank:
+                if bound == math.inf:
+                    return lower
+                return lower + (bound - lower) * ((rank - cumulative) / hits)
+            cumulative += hits
+            if bound != math.inf:
+                lower = bound
+        return lower
+
+    def samples(self):
+        for key, row in sorted(self.values().items()):
+            cumulative = 0
+            for bound, hits in zip(self.buckets, row):
+                cumulative += hits
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(float(bound)))])
+                yield "_bucket", labels, cumulative
+            labels = _format_labels(self.labelnames, key)
+            yield "_sum", labels, row[-2]
+            yield "_count", labels, row[-1]
+
+
+# ----- Registry -----
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self.started_at = time.time()
+
+    def register(self, metric: Metric) -> Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            # Cog reloads re-import modules; hand back the live instance
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Metric | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ----- Bot metrics -----
+MESSAGES_INGESTED = REGISTRY.counter(
+    "chatcounter_messages_ingested_total",
+    "Guild messages counted by on_message, per shard",
+    ("shard",),
+)
+ON_MESSAGE_SECONDS = REGISTRY.histogram(
+    "chatcounter_on_message_seconds",
+    "Time spent processing a single message in on_message",
+)
+FLUSH_SECONDS = REGISTRY.histogram(
+    "chatcounter_flush_seconds",
+    "Time spent persisting a stats table to disk",
+    ("table",),
+)
+FLUSH_BYTES = REGISTRY.counter(
+    "chatcounter_flush_bytes_total",
+    "Bytes written while persisting stats tables",
+    ("table",),
+)
+FLUSH_LAST_BYTES = REGISTRY.gauge(
+    "chatcounter_flush_last_bytes",
+    "Size in bytes of the most recent flush of each table",
+    ("table",),
+)
+COMMAND_SECONDS = REGISTRY.histogram(
+    "chatcounter_command_seconds",
+    "Slash command latency from dispatch to completion",
+    ("command",),
+)
+COMMAND_ERRORS = REGISTRY.counter(
+    "chatcounter_command_errors_total",
+    "Slash command invocations that raised an error",
+    ("command",),
+)
+TABLE_ROWS = REGISTRY.gauge(
+    "chatcounter_table_rows",
+    "Number of rows held in each in-memory stats table",
+    ("table",),
+)
+GUILDS_RESIDENT = REGISTRY.gauge(
+    "chatcounter_guilds",
+    "Guilds whose stats are held in memory (resident) or only on disk (archived)",
+    ("state",),
+)
+GUILD_EVICTIONS = REGISTRY.counter(
+    "chatcounter_guild_evictions_total",
+    "Guilds archived to disk, by reason (budget, idle, departed)",
+    ("reason",),
+)
+GUILD_RELOADS = REGISTRY.counter(
+    "chatcounter_guild_reloads_total",
+    "Archived guilds loaded back into memory on access",
+)
+NAME_CACHE_SIZE = REGISTRY.gauge(
+    "chatcounter_name_cache_entries",
+    "User names held in the leaderboard name cache",
+)
+NAME_LOOKUPS = REGISTRY.counter(
+    "chatcounter_name_lookups_total",
+    "Leaderboard name lookups, by where the name came from (cache, member_cache, fetched, unresolved)",
+    ("source",),
+)
+GUILD_CHURN_EVENTS = REGISTRY.counter(
+    "chatcounter_guild_churn_events_total",
+    "Guild joins and removals seen, by event (join, remove)",
+    ("event",),
+)
+CHURN_UPDATES = REGISTRY.counter(
+    "chatcounter_churn_updates_total",
+    "Presence updates and member refreshes sent after guild churn, by kind",
+    ("kind",),
+)
+CHURN_UPDATES_SAVED = REGISTRY.counter(
+    "chatcounter_churn_updates_saved_total",
+    "Presence updates and member refreshes avoided by coalescing guild churn, by kind",
+    ("kind",),
+)
+CARD_RENDERS = REGISTRY.counter(
+    "chatcounter_card_renders_total",
+    "Leaderboard image cards requested, by whether they were rendered or reused from the cache",
+    ("result",),
+)
+CARD_RENDER_SECONDS = REGISTRY.histogram(
+    "chatcounter_card_render_seconds",
+    "Time spent rendering a leaderboard image card, including the wait for a render thread",
+)
+
+RECENT_MESSAGES_CACHED = REGISTRY.gauge(
+    "chatcounter_recent_messages_cached",
+    "Recent messages whose word deltas are kept for reconciling edits and deletes",
+)
+MESSAGES_RECONCILED = REGISTRY.counter(
+    "chatcounter_messages_reconciled_total",
+    "Message edits and deletes seen, by event (edit, delete, bulk_delete) and result (applied, unchanged, missed)",
+    ("event", "result"),
+)
+
+
+# ----- Exposition endpoint -----
+async def _handle_scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, registry: Registry):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Drain headers; we only care about the request line
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout=5)
+            if not line or line in (b"\r\n", b"\n"):
+                break
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] in ("/", "/metrics"):
+            body = registry.render().encode("utf-8")
+            status = "200 OK"
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = b"Not Found\n"
+            status = "404 Not Found"
+            content_type = "text/plain; charset=utf-8"
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str, port: int, registry: Registry = REGISTRY) -> asyncio.AbstractServer:
+    """Serve the registry at http://host:port/metrics on the running event loop."""
+    server = await asyncio.start_server(
+        lambda r, w: _handle_scrape(r, w, registry), host=host, port=port
+    )
+    print(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return server
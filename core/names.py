@@ -0,0 +1,205 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import discord
+
+from core.metrics import NAME_CACHE_SIZE, NAME_LOOKUPS
+from core.storage import read_json, write_json
+
+# ----- User name cache -----
+# Leaderboards need a name for every user ID they list. Instead of relying on
+# discord.py's user/member cache (which, with the members intent, holds every
+# member of every guild), the names seen on messages and member fetches are
+# kept here: bounded in LRU order, persisted to names.json, and refreshed once
+# older than the TTL.
+#
+# Names that are missing or stale are fetched in the background, batched: up to
+# 100 users of one guild per gateway member query, and one REST call per user
+# only when no guild is known for them. A leaderboard waits briefly for the
+# names it is missing and shows "Unknown User" for whatever is still pending.
+
+NAMES_VERSION = 1
+QUERY_BATCH = 100       # Most user IDs one guild.query_members() request accepts
+FETCH_CONCURRENCY = 4   # Parallel fetch_user() calls for users with no known guild
+BATCH_WINDOW = 0.05     # Seconds to collect more lookups before sending a batch
+
+
+class NameCache:
+    def __init__(self, path: str, max_entries: int = 50_000, ttl_seconds: float = 7 * 86400,
+                 save_seconds: float = 300):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.save_seconds = save_seconds
+        # user_id -> (name, last seen (epoch seconds), guild_id it was last seen in)
+        self._names: OrderedDict[str, tuple[str, float, str | None]] = OrderedDict()
+        self._pending: dict[str, str | None] = {}       # user_id -> guild to look it up in
+        self._waiters: dict[str, asyncio.Future] = {}   # user_id -> resolves to its name (or None)
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._dirty = False
+        self.bot = None
+        NAME_CACHE_SIZE.set_function(lambda: len(self._names))
+
+    def __len__(self):
+        return len(self._names)
+
+    def load(self):
+        data = read_json(self.path) or {}
+        for uid, name, seen, gid in data.get("names", ()):
+            self._names[uid] = (name, seen, gid)
+        self._trim()
+
+    def _payload(self) -> dict:
+        return {"version": NAMES_VERSION, "names": [[uid, *entry] for uid, entry in self._names.items()]}
+
+    def save(self) -> int:
+        """Write names.json if anything changed; returns the bytes written."""
+        if not self._dirty:
+            return 0
+        self._dirty = False
+        return write_json(self.path, self._payload())
+
+    def _trim(self):
+        while len(self._names) > self.max_entries:
+            self._names.popitem(last=False)
+
+    def see(self, uid: str, name: str, gid: str | None = None):
+        """Record the current name of `uid` (called for every message, so usually a no-op)."""
+        entry = self._names.get(uid)
+        now = time.time()
+        if entry is None or entry[0] != name or now - entry[1] > self.ttl_seconds / 2 or (gid and entry[2] != gid):
+            self._names[uid] = (name, now, gid or (entry[2] if entry else None))
+            self._dirty = True
+            if entry is None:
+                self._trim()
+        self._names.move_to_end(uid)
+        waiter = self._waiters.pop(uid, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(name)
+
+    def get(self, uid: str) -> str | None:
+        entry = self._names.get(uid)
+        return entry[0] if entry else None
+
+    def _queue(self, uid: str, gid: str | None) -> asyncio.Future:
+        waiter = self._waiters.get(uid)
+        if waiter is None:  # Otherwise already queued or being fetched
+            waiter = self._waiters[uid] = asyncio.get_running_loop().create_future()
+            self._pending[uid] = gid
+            if self._wake is not None:
+                self._wake.set()
+        return waiter
+
+    async def lookup(self, uids, gid: str | None = None, timeout: float = 1.5) -> dict[str, str]:
+        """Names for `uids`; waits up to `timeout` for missing ones, which are fetched in one batch.
+
+        Users still unresolved are left out, stale names are returned and refreshed in the background.
+        """
+        names: dict[str, str] = {}
+        missing = []
+        now = time.time()
+        for uid in uids:
+            entry = self._names.get(uid)
+            if entry is not None:
+                names[uid] = entry[0]
+                NAME_LOOKUPS.inc(source="cache")
+                if now - entry[1] > self.ttl_seconds:
+                    self._queue(uid, gid or entry[2])
+                continue
+            user = self.bot.get_user(int(uid)) if self.bot is not None else None
+            if user is not None:
+                self.see(uid, user.name, gid)
+                names[uid] = user.name
+                NAME_LOOKUPS.inc(source="member_cache")
+                continue
+            missing.append(uid)
+        if missing and self._task is not None:
+            waiters = [self._queue(uid, gid) for uid in missing]
+            await asyncio.wait(waiters, timeout=timeout)
+            for uid, waiter in zip(missing, waiters):
+                if waiter.done() and waiter.result():
+                    names[uid] = waiter.result()
+                    NAME_LOOKUPS.inc(source="fetched")
+        NAME_LOOKUPS.inc(len(uids) - len(names), source="unresolved")
+        return names
+
+    async def _query_guild(self, guild: discord.Guild, uids: list[str]) -> set[str]:
+        found = set()
+        for start in range(0, len(uids), QUERY_BATCH):
+            chunk = uids[start:start + QUERY_BATCH]
+            try:
+                members = await guild.query_members(user_ids=[int(uid) for uid in chunk], limit=len(chunk), cache=False)
+            except (asyncio.TimeoutError, discord.ClientException, discord.HTTPException):
+                continue  # Falls back to fetch_user() below
+            for member in members:
+                self.see(str(member.id), member.name, str(guild.id))
+                found.add(str(member.id))
+        return found
+
+    async def _fetch_users(self, uids: list[str]):
+        limit = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+        async def fetch(uid: str):
+            async with limit:
+                try:
+                    user = await self.bot.fetch_user(int(uid))
+                except discord.HTTPException:
+                    return  # Deleted account or rate limited; stays unresolved until asked again
+            self.see(uid, user.name)
+
+        await asyncio.gather(*(fetch(uid) for uid in uids))
+
+    async def _resolve(self, pending: dict[str, str | None]):
+        by_guild: dict[str, list[str]] = {}
+        for uid, gid in pending.items():
+            by_guild.setdefault(gid, []).append(uid)
+        leftover = by_guild.pop(None, [])
+        for gid, uids in by_guild.items():
+            guild = self.bot.get_guild(int(gid)) if gid.isdigit() else None
+            found = await self._query_guild(guild, uids) if guild is not None else set()
+            leftover.extend(uid for uid in uids if uid not in found)
+        if leftover:
+            await self._fetch_users(leftover)
+
+    async def _run(self):
+        last_save = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.save_seconds)
+            except asyncio.TimeoutError:
+                pass
+            if self._pending:
+                await asyncio.sleep(BATCH_WINDOW)
+                pending, self._pending = self._pending, {}
+                self._wake.clear()
+                try:
+                    await self._resolve(pending)
+                finally:
+                    for uid in pending:
+                        waiter = self._waiters.pop(uid, None)
+                        if waiter is not None and not waiter.done():
+                            waiter.set_result(self.get(uid))
+            else:
+                self._wake.clear()
+            if self._dirty and time.monotonic() - last_save >= self.save_seconds:
+                last_save = time.monotonic()
+                self._dirty = False
+                await asyncio.to_thread(write_json, self.path, self._payload())
+
+    def start(self, bot):
+        self.bot = bot
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for waiter in self._waiters.values():
+            if not waiter.done():
+                waiter.set_result(None)
+        self._waiters.clear()
+        self._pending.clear()
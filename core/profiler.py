@@ -0,0 +1,87 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+
+# ----- On-demand profiler -----
+# Profiles the live event loop thread for a fixed window: cProfile for CPU time,
+# tracemalloc for allocation sites. Only one profile may run at a time.
+
+_profile_lock = asyncio.Lock()
+_ignore_tracemalloc = (tracemalloc.Filter(False, tracemalloc.__file__),)
+
+
+def _short_path(filename: str) -> str:
+    try:
+        rel = os.path.relpath(filename)
+    except ValueError:
+        return filename
+    return filename if rel.startswith("..") else rel
+
+
+def _cpu_summary(stats: pstats.Stats, limit: int) -> list[str]:
+    rows = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:limit]
+    lines = [f"{'cumtime':>9} {'tottime':>9} {'calls':>8}  function"]
+    for (filename, lineno, func), (_, ncalls, tottime, cumtime, _) in rows:
+        where = f"{_short_path(filename)}:{lineno}" if lineno else filename
+        lines.append(f"{cumtime:9.4f} {tottime:9.4f} {ncalls:8d}  {func} ({where})")
+    return lines
+
+
+def _memory_summary(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, limit: int) -> list[str]:
+    diffs = after.compare_to(before, "lineno")
+    diffs = [d for d in diffs if d.size_diff > 0][:limit]
+    lines = [f"{'+KiB':>9} {'+blocks':>8}  allocation site"]
+    for diff in diffs:
+        frame = diff.traceback[0]
+        lines.append(
+            f"{diff.size_diff / 1024:9.1f} {diff.count_diff:8d}  {_short_path(frame.filename)}:{frame.lineno}"
+        )
+    return lines
+
+
+async def run_profile(seconds: float, cpu: bool = True, memory: bool = True, limit: int = 20) -> tuple[str, str]:
+    """Profile the running bot for `seconds`. Returns (summary, full report)."""
+    if _profile_lock.locked():
+        raise RuntimeError("A profile is already running.")
+    async with _profile_lock:
+        profiler = cProfile.Profile() if cpu else None
+        started_tracing = False
+        before = None
+        if memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                started_tracing = True
+            before = tracemalloc.take_snapshot().filter_traces(_ignore_tracemalloc)
+        if profiler is not None:
+            profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            after = tracemalloc.take_snapshot().filter_traces(_ignore_tracemalloc) if memory else None
+            if started_tracing:
+                tracemalloc.stop()
+
+    summary: list[str] = []
+    report = io.StringIO()
+    if profiler is not None:
+        stats = pstats.Stats(profiler, stream=report)
+        summary.append(f"Top functions by cumulative time ({seconds:g}s window)")
+        summary.extend(_cpu_summary(stats, limit))
+        summary.append("")
+        report.write(f"===== cProfile ({seconds:g}s, sorted by cumulative time) =====\n")
+        stats.sort_stats("cumulative").print_stats(200)
+    if memory:
+        summary.append("Top allocation sites (net growth during window)")
+        summary.extend(_memory_summary(before, after, limit))
+        report.write(f"\n===== tracemalloc ({seconds:g}s, net growth by line) =====\n")
+        for diff in after.compare_to(before, "traceback")[:50]:
+            if diff.size_diff <= 0:
+                continue
+            report.write(f"\n+{diff.size_diff / 1024:.1f} KiB in {diff.count_diff:+d} blocks\n")
+            report.write("\n".join(diff.traceback.format()) + "\n")
+    return "\n".join(summary).rstrip(), report.getvalue()
@@ -0,0 +1,153 @@
+# ----- Rank index -----
+# "What's my rank?" without sorting every user: users are counted per message
+# count bucket in a Fenwick tree, so the number of users ahead of someone, and
+# who sits next to them, are prefix sums and a tree descent, O(log buckets).
+#
+# Counts below EXACT each have their own bucket. Larger counts share buckets
+# of 1/64 of a power of two, which keeps the tree small (at most a few thousand
+# buckets) however high counts get. Ties inside such a bucket are settled by
+# looking at its members, and few users have counts that high. Ranks are
+# competition style: users with equal counts share a position.
+
+EXACT = 1024
+MANTISSA_BITS = 6
+
+
+def bucket(count: int) -> int:
+    if count < EXACT:
+        return count
+    exponent = count.bit_length() - 1
+    mantissa = (count >> (exponent - MANTISSA_BITS)) & ((1 << MANTISSA_BITS) - 1)
+    return EXACT + ((exponent - EXACT.bit_length() + 1) << MANTISSA_BITS) + mantissa
+
+
+class RankIndex:
+    def __init__(self):
+        self.counts: dict[str, int] = {}          # user_id -> count (> 0)
+        self._members: dict[int, set[str]] = {}   # bucket -> user_ids in it
+        self._tree = [0] * 65                     # Fenwick tree over buckets, 1-based
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    @classmethod
+    def from_counts(cls, counts) -> "RankIndex":
+        """Index (user_id, count) pairs in O(users + buckets)."""
+        index = cls()
+        for uid, count in counts:
+            if count > 0:
+                index.counts[uid] = count
+                index._members.setdefault(bucket(count), set()).add(uid)
+        index._rebuild(max(index._members, default=0) + 1)
+        return index
+
+    def _rebuild(self, buckets: int):
+        size = len(self._tree) - 1
+        while size < buckets:
+            size *= 2
+        tree = [0] * (size + 1)
+        for b, members in self._members.items():
+            tree[b + 1] = len(members)
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _add(self, b: int, delta: int):
+        tree = self._tree
+        i = b + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _below(self, b: int) -> int:
+        """Users in buckets lower than `b`."""
+        tree = self._tree
+        total, i = 0, min(b, len(tree) - 1)
+        while i:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def _find(self, k: int) -> int:
+        """Bucket holding the k-th user (0-based) in ascending order of count."""
+        tree = self._tree
+        position, step = 0, 1 << ((len(tree) - 1).bit_length() - 1)
+        while step:
+            if position + step < len(tree) and tree[position + step] <= k:
+                position += step
+                k -= tree[position]
+            step >>= 1
+        return position
+
+    def set(self, uid: str, count: int):
+        """Record `uid`'s current count; 0 or less removes it."""
+        old = self.counts.get(uid, 0)
+        if count == old:
+            return
+        b_old, b_new = bucket(old), bucket(count)
+        if old > 0 and count > 0 and b_old == b_new:
+            self.counts[uid] = count
+            return
+        if old > 0:
+            members = self._members[b_old]
+            members.discard(uid)
+            if not members:
+                del self._members[b_old]
+            self._add(b_old, -1)
+            del self.counts[uid]
+        if count > 0:
+            self._members.setdefault(b_new, set()).add(uid)
+            self.counts[uid] = count
+            if b_new + 1 < len(self._tree):
+                self._add(b_new, 1)
+            else:
+                self._rebuild(b_new + 1)  # Past the last bucket: grow the tree
+
+    def _pick(self, b: int, highest: bool, above: int = 0, below: int | None = None) -> tuple[str, int] | None:
+        """A member of bucket `b` with the highest or lowest count strictly between `above` and `below`."""
+        counts = self.counts
+        members = self._members.get(b, ())
+        if b < EXACT:
+            uid = next(iter(members), None)  # All tied; only asked for buckets other than the user's own
+            return (uid, counts[uid]) if uid is not None else None
+        candidates = [(counts[uid], uid) for uid in members
+                      if above < counts[uid] and (below is None or counts[uid] < below)]
+        if not candidates:
+            return None
+        count, uid = max(candidates) if highest else min(candidates)
+        return uid, count
+
+    def rank(self, uid: str) -> dict | None:
+        """Position (1 = most), users ranked, and the nearest user above and below `uid`; None if unranked."""
+        count = self.counts.get(uid)
+        if count is None:
+            return None
+        total = len(self.counts)
+        b = bucket(count)
+        ahead = total - self._below(b + 1)
+        behind = self._below(b)
+        if b >= EXACT:
+            for other in self._members[b]:
+                other_count = self.counts[other]
+                if other_count > count:
+                    ahead += 1
+                elif other_count < count:
+                    behind += 1
+
+        # Nearest strictly higher and lower counts: the same bucket first, then the next non-empty one
+        above = self._pick(b, False, above=count) if b >= EXACT else None
+        if above is None and ahead:
+            above = self._pick(self._find(total - ahead), False)
+        below = self._pick(b, True, below=count) if b >= EXACT else None
+        if below is None and behind:
+            below = self._pick(self._find(behind - 1), True)
+        return {
+            "position": ahead + 1,
+            "total": total,
+            "count": count,
+            "percentile": 100 * behind / total,  # Share of ranked users with fewer
+            "above": list(above) if above else None,
+            "below": list(below) if below else None,
+        }
@@ -0,0 +1,83 @@
+import time
+from array import array
+from collections import OrderedDict
+
+from core.metrics import RECENT_MESSAGES_CACHED
+
+# ----- Recent message deltas -----
+# What each recently counted message added to the stats, so an edit or delete
+# can be reconciled without fetching anything from Discord: the guild, channel,
+# author, character count, markup counts per KINDS and the vocabulary index of
+# every word, packed into an array. Entries are kept in arrival order and
+# dropped from the oldest end once there are more than `max_entries` or they
+# are older than `max_age_seconds` (going by the message ID's timestamp). A
+# message that is no longer here is left as it was counted.
+
+DISCORD_EPOCH_MS = 1_420_070_400_000
+
+
+def message_time(message_id: int) -> float:
+    """Creation time of a message (epoch seconds), from its snowflake ID."""
+    return ((message_id >> 22) + DISCORD_EPOCH_MS) / 1000
+
+
+class RecentMessage:
+    __slots__ = ("gid", "cid", "uid", "characters", "kinds", "words")
+
+    def __init__(self, gid: str, cid: str, uid: str, characters: int, kinds: list[int] | None, words: array):
+        self.gid = gid
+        self.cid = cid
+        self.uid = uid
+        self.characters = characters
+        self.kinds = tuple(kinds) if kinds else None
+        self.words = words  # Vocabulary indexes, one per word occurrence
+
+
+class RecentMessages:
+    def __init__(self, max_entries: int = 20_000, max_age_seconds: float = 86400):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self._messages: OrderedDict[int, RecentMessage] = OrderedDict()
+        RECENT_MESSAGES_CACHED.set_function(lambda: len(self._messages))
+
+    def __len__(self):
+        return len(self._messages)
+
+    def _trim(self):
+        messages = self._messages
+        while len(messages) > self.max_entries:
+            messages.popitem(last=False)
+        if self.max_age_seconds and messages:
+            cutoff = time.time() - self.max_age_seconds
+            while messages and message_time(next(iter(messages))) < cutoff:
+                messages.popitem(last=False)
+
+    def remember(self, message_id: int, gid: str, cid: str, uid: str, characters: int,
+                 kinds: list[int] | None, words: list[int]):
+        if self.max_entries <= 0:
+            return
+        self._messages[message_id] = RecentMessage(gid, cid, uid, characters, kinds, array("I", words))
+        self._trim()
+
+    def get(self, message_id: int) -> RecentMessage | None:
+        return self._messages.get(message_id)
+
+    def pop(self, message_id: int) -> RecentMessage | None:
+        return self._messages.pop(message_id, None)
+
+    def word_counts(self, gid: str, uid: str) -> tuple[dict[int, int], int]:
+        """Vocabulary index -> uses over the messages of `uid` in `gid` still held here, and how many messages."""
+        counts, messages = {}, 0
+        for entry in self._messages.values():
+            if entry.gid == gid and entry.uid == uid:
+                messages += 1
+                for widx in entry.words:
+                    counts[widx] = counts.get(widx, 0) + 1
+        return counts, messages
+
+    def forget_guild(self, gid: str) -> int:
+        """Drop every message of `gid`, e.g. after the bot left it; returns how many."""
+        stale = [mid for mid, entry in self._messages.items() if entry.gid == gid]
+        for mid in stale:
+            del self._messages[mid]
+        return len(stale)
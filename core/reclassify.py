@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+from config import DICTIONARY_FILE, DICTIONARY_DIR, DICTIONARY_CACHE_DIR, DEFAULT_LOCALES, LOCALES_FILE
+from core.aggregator import AGGREGATOR, AggregatorUnavailable
+from core.lexicon import Lexicon, dictionary_sources
+
+# ----- Dictionary reclassification -----
+# A word's is_dict flag is decided when it first enters the vocabulary, so an
+# edited word list leaves existing words as they were. This job re-reads the
+# word lists and reclassifies every word in bulk, without stalling the bot:
+#
+#   1. A fresh Lexicon is built and the whole vocabulary is classified against
+#      it in a worker thread (Lexicon.classify_vocab), with progress recorded.
+#   2. Back on the event loop, in one synchronous step: the new lists and masks
+#      replace the live ones, changed flags are written to the vocabulary, and
+#      the global totals move those words between the dictionary and
+#      non-dictionary tables. Words added while the job ran are checked then.
+#   3. The vocabulary and a totals checkpoint are written to disk, and the
+#      cross-process aggregator (if any) is told which words changed.
+#
+# Word counts are keyed by vocabulary index and hold no flag, so no guild file
+# has to be rewritten.
+
+
+class Reclassifier:
+    def __init__(self):
+        self.total = 0          # Words in the word lists to stream
+        self.done = 0
+        self.changed = 0        # Words whose is_dict flag flipped
+        self.started: float | None = None
+        self.finished: float | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def progress(self) -> str:
+        if self.started is None:
+            return "No reclassification has run yet"
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        if self.finished is None:
+            percent = 100 * self.done / self.total if self.total else 0
+            return f"Reclassifying: {self.done:,}/{self.total:,} dictionary words streamed ({percent:.0f}%), {elapsed:.1f}s"
+        return f"Reclassified {self.changed:,} word(s) in {elapsed:.1f}s"
+
+    def start(self) -> asyncio.Task:
+        """The running job's task, starting a job unless one is already running."""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    def _step(self, words: int):
+        self.done += words  # Called from the worker thread
+
+    async def _run(self) -> int:
+        from core.shutdown import flush_all
+        from shared import VOCAB, LEXICON, TOTALS
+
+        self.started, self.finished, self.done, self.changed = time.perf_counter(), None, 0, 0
+        sources = dictionary_sources(DICTIONARY_FILE, DICTIONARY_DIR)
+        fresh = Lexicon(sources, DEFAULT_LOCALES, DICTIONARY_CACHE_DIR, VOCAB, LOCALES_FILE)
+        count = len(VOCAB)
+
+        def classify():
+            fresh.load()  # Re-indexes any list whose file changed
+            self.total = sum(len(words) for words in fresh.lists.values())
+            masks = fresh.classify_vocab(count, self._step)
+            flags = VOCAB.is_dict
+            changed = [widx for widx in range(count) if bool(masks[widx] & fresh.default_mask) != bool(flags[widx])]
+            return masks, changed
+
+        masks, changed = await asyncio.to_thread(classify)
+
+        # Everything below runs without yielding, so commands see either the old or the new classification
+        fresh.masks = masks
+        changed += [widx for widx in range(count, len(VOCAB))
+                    if fresh.in_default(VOCAB.words[widx]) != bool(VOCAB.is_dict[widx])]
+        dict_words, nondict_words = [], []
+        for widx in changed:
+            is_dict = not VOCAB.is_dict[widx]
+            VOCAB.set_dict(widx, is_dict)
+            (dict_words if is_dict else nondict_words).append(VOCAB.words[widx])
+        LEXICON.adopt(fresh)
+        TOTALS.reclassify(dict_words, nondict_words)
+        self.changed = len(changed)
+
+        await flush_all()
+        if AGGREGATOR.enabled and changed:
+            try:
+                await AGGREGATOR.reclassify(dict_words, nondict_words)
+            except AggregatorUnavailable:
+                pass  # It still has the old flags for these words; a restart of the aggregator catches up
+        self.finished = time.perf_counter()
+        print(f"[reclassify] {len(dict_words)} word(s) now dictionary, {len(nondict_words)} no longer, "
+              f"out of {len(VOCAB)} in {self.finished - self.started:.1f}s")
+        return self.changed
+
+
+RECLASSIFIER = Reclassifier()
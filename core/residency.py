@@ -0,0 +1,295 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+from core.aggregator import guild_entry
+from core.channels import GuildChannels
+from core.metrics import GUILDS_RESIDENT, GUILD_EVICTIONS, GUILD_RELOADS
+from core.storage import read_guild, write_guild, read_json, write_json
+
+# ----- Guild partitions and residency -----
+# Stats live on disk as one file per guild (guilds/<guild_id>.json, holding its
+# stats rows, word counts and channel stats), with manifest.json listing the guilds and
+# totals.json holding the global totals that /lb global and friends read.
+# Startup loads only the manifest and the totals; a guild's partition is read
+# on its first message or query via ensure(), and a flush rewrites only the
+# partitions that changed since the last one. Messages only mark a guild dirty;
+# the background loop flushes every `flush_seconds`, and eviction and shutdown
+# write whatever is still dirty.
+#
+# Loaded guilds are tracked in LRU order. When the loaded rows exceed the
+# budget, or a guild goes idle or removes the bot, it is flushed if dirty and
+# dropped from the in-memory tables; the next access loads it again.
+#
+# totals.json is only written at checkpoints. The manifest says whether the
+# checkpoint still matches the partitions ("clean"): the first partition write
+# after a checkpoint clears the flag, so after a crash the next start rebuilds
+# the totals by reading every partition once, then checkpoints again.
+#
+# A checkpoint taken at shutdown also lists the guilds that were loaded, most
+# recently used last ("warm"); the next process loads those back in the
+# background so a restart comes up with the same working set.
+
+MANIFEST_VERSION = 1
+
+
+class GuildResidency:
+    def __init__(self, stats: dict, words_stats: dict, channel_stats: dict, directory: str, manifest_path: str,
+                 totals_path: str, max_rows: int = 0, idle_seconds: float = 0, checkpoint_seconds: float = 0,
+                 flush_seconds: float = 0, caches: tuple[dict, ...] = (), before_write=None):
+        self.stats = stats
+        self.words_stats = words_stats
+        self.channel_stats = channel_stats
+        self.caches = caches  # {guild_id: ...} tables derived from a guild's stats, dropped when it is unloaded
+        self.directory = directory
+        self.manifest_path = manifest_path
+        self.totals_path = totals_path
+        self.max_rows = max_rows
+        self.idle_seconds = idle_seconds
+        self.checkpoint_seconds = checkpoint_seconds
+        self.flush_seconds = flush_seconds
+        self.before_write = before_write  # Called before any partition is written, e.g. to save the vocabulary first
+        self.archived: set[str] = set()   # Guilds with a partition on disk that is not loaded
+        self.dirty: set[str] = set()      # Loaded guilds changed since their partition was written
+        self.max_id = 0
+        self.clean = False                # totals.json matches the partitions on disk
+        self.resident_rows = 0
+        self._lru: OrderedDict[str, float] = OrderedDict()  # guild_id -> last access (monotonic)
+        self._rows: dict[str, int] = {}                      # guild_id -> rows counted at last access
+        self._writes = 0                                     # Partition writes so far; lets a checkpoint detect a race
+        self._checkpoint_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._warm_task: asyncio.Task | None = None
+        self.warm: list[str] = []         # Guilds loaded when the previous process shut down
+        self.versions: dict[str, int] = {}  # guild_id -> changes this process made to it
+        GUILDS_RESIDENT.set_function(lambda: len(self._lru), state="resident")
+        GUILDS_RESIDENT.set_function(lambda: len(self.archived), state="archived")
+
+    def _path(self, gid: str) -> str:
+        return os.path.join(self.directory, f"{gid}.json")
+
+    def guilds(self) -> set[str]:
+        """Every guild with stats, loaded or not."""
+        return self.archived | self.stats.keys() | self.words_stats.keys()
+
+    def load(self, totals=None, vocab=None):
+        """Read the manifest; restore `totals` from the last checkpoint, or rebuild it from every partition."""
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = read_json(self.manifest_path) or {}
+        state = read_json(self.totals_path) if totals is not None and manifest.get("clean") else None
+        if manifest.get("clean") and (totals is None or state is not None):
+            self.archived = set(manifest["guilds"])
+            self.max_id = manifest["max_id"]
+            self.warm = [gid for gid in manifest.get("warm", ()) if gid in self.archived]
+            if totals is not None:
+                totals.load_state(state)
+            self.clean = True
+            return
+        # No usable checkpoint: list the partitions and read each of them once
+        self.archived = {name[:-len(".json")] for name in os.listdir(self.directory) if name.endswith(".json")}
+        for gid, users, counts in self.iter_archived():
+            self.max_id = max(self.max_id, max((rec["id"] for rec in users.values()), default=0))
+            if totals is not None:
+                totals.apply("local", [guild_entry(gid, users, counts, vocab)])
+        if totals is not None:
+            print(f"Rebuilt global totals from {len(self.archived)} guild file(s)")
+
+    def next_id(self) -> int:
+        self.max_id += 1
+        return self.max_id
+
+    def _count(self, gid: str):
+        rows = len(self.stats.get(gid, ())) + len(self.words_stats.get(gid, ())) + len(self.channel_stats.get(gid, ()))
+        self.resident_rows += rows - self._rows.get(gid, 0)
+        self._rows[gid] = rows
+
+    def ensure(self, gid: str):
+        """Make `gid` resident, loading its partition if needed, and mark it most recently used."""
+        if gid in self.archived:
+            self._reload(gid)
+        self._lru[gid] = time.monotonic()
+        self._lru.move_to_end(gid)
+        self._count(gid)
+        self.enforce()
+
+    def _read(self, gid: str) -> tuple[dict, dict, GuildChannels]:
+        try:
+            return read_guild(self._path(gid), gid)
+        except FileNotFoundError:
+            return {}, {}, GuildChannels()  # Listed in the manifest but never written
+
+    def _reload(self, gid: str):
+        users, counts, channels = self._read(gid)
+        self.stats[gid] = users
+        self.words_stats[gid] = counts
+        self.channel_stats[gid] = channels
+        self.archived.discard(gid)
+        GUILD_RELOADS.inc()
+
+    async def preload(self, gids: list[str]):
+        """Load `gids` in order, reading files in a worker thread; guilds loaded meanwhile are skipped.
+
+        A guild loaded, changed and unloaded again while its file was being read is archived once
+        more but its file is newer than what was read, so that read is dropped too.
+        """
+        for gid in gids:
+            if gid not in self.archived:
+                continue
+            version = self.versions.get(gid, 0)
+            users, counts, channels = await asyncio.to_thread(self._read, gid)
+            if gid in self.archived and self.versions.get(gid, 0) == version:
+                self.stats[gid] = users
+                self.words_stats[gid] = counts
+                self.channel_stats[gid] = channels
+                self.archived.discard(gid)
+                self._lru[gid] = time.monotonic()
+                self._count(gid)
+                self.enforce()
+
+    def mark_dirty(self, gid: str):
+        self.dirty.add(gid)
+        self.versions[gid] = self.versions.get(gid, 0) + 1
+
+    def _write(self, gid: str, users: dict, counts: dict, channels: GuildChannels | None) -> int:
+        if self.clean:
+            # Before the first change to a partition, so a crash can never leave a stale clean checkpoint
+            self.clean = False
+            self._write_manifest()
+        if self.before_write is not None:
+            self.before_write()
+        self._writes += 1
+        return write_guild(self._path(gid), gid, users, counts, channels)
+
+    def flush(self) -> int:
+        """Write every dirty partition; returns the bytes written."""
+        written = 0
+        for gid in self.dirty:
+            if gid in self.stats or gid in self.words_stats:
+                written += self._write(gid, self.stats.get(gid, {}), self.words_stats.get(gid, {}),
+                                       self.channel_stats.get(gid))
+        self.dirty.clear()
+        return written
+
+    def enforce(self):
+        """Unload least recently used guilds until the resident rows fit the budget."""
+        if not self.max_rows:
+            return
+        while self.resident_rows > self.max_rows and len(self._lru) > 1:
+            self.evict(next(iter(self._lru)), "budget")
+
+    def evict(self, gid: str, reason: str) -> bool:
+        """Write `gid` if it changed and drop it from memory; False if it held no rows."""
+        users = self.stats.pop(gid, None) or {}
+        counts = self.words_stats.pop(gid, None) or {}
+        channels = self.channel_stats.pop(gid, None)
+        for cache in self.caches:
+            cache.pop(gid, None)
+        self._lru.pop(gid, None)
+        self.resident_rows -= self._rows.pop(gid, 0)
+        if gid in self.dirty:
+            self.dirty.discard(gid)
+            if users or counts:
+                self._write(gid, users, counts, channels)
+        if not users and not counts:
+            return False
+        self.archived.add(gid)
+        GUILD_EVICTIONS.inc(reason=reason)
+        return True
+
+    def evict_idle(self) -> int:
+        if not self.idle_seconds:
+            return 0
+        cutoff = time.monotonic() - self.idle_seconds
+        idle = []
+        for gid, last_used in self._lru.items():
+            if last_used > cutoff:
+                break  # LRU order: everything after this was used more recently
+            idle.append(gid)
+        return sum(self.evict(gid, "idle") for gid in idle)
+
+    def iter_archived(self, gids: list[str] | None = None):
+        """Yield (guild_id, users, counts) for every guild that is not loaded (or of `gids`), without loading it."""
+        for gid in list(self.archived) if gids is None else gids:
+            try:
+                users, counts, _ = read_guild(self._path(gid), gid)
+            except FileNotFoundError:
+                continue
+            yield gid, users, counts
+
+    def _write_manifest(self, warm: list[str] | None = None) -> int:
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "clean": self.clean,
+            "max_id": self.max_id,
+            "guilds": sorted(self.guilds()),
+        }
+        if warm:
+            manifest["warm"] = warm
+        return write_json(self.manifest_path, manifest)
+
+    def checkpoint_now(self, totals) -> int:
+        """Flush, then write the totals and a clean manifest; returns the bytes written."""
+        written = self.flush() + write_json(self.totals_path, totals.state())
+        self.clean = True
+        return written + self._write_manifest()
+
+    async def checkpoint(self, totals, warm: bool = False) -> int:
+        """Like checkpoint_now, with the totals serialized in a worker thread.
+
+        With `warm`, the loaded guilds are recorded for the next process to preload.
+        """
+        async with self._checkpoint_lock:  # Two writers of totals.json could finish out of order
+            # Flushed and snapshotted in one loop tick, so the totals match the partitions on disk.
+            # Changes made after this only mark guilds dirty; the first of them to be written clears
+            # `clean` again, so only a partition written while totals.json is being written spoils it.
+            written = self.flush()
+            writes, state = self._writes, totals.state()
+            written += await asyncio.to_thread(write_json, self.totals_path, state)
+            if self._writes != writes:
+                return written  # A partition was written meanwhile; the next checkpoint will catch up
+            self.clean = True
+            return written + self._write_manifest(list(self._lru) if warm else None)
+
+    async def _run(self, totals, on_checkpoint=None, on_flush=None):
+        intervals = [seconds for seconds in (self.idle_seconds / 4, self.checkpoint_seconds, self.flush_seconds)
+                     if seconds]
+        interval = max(1.0, min([60.0, *intervals]))
+        last_checkpoint = time.monotonic()
+        while True:
+            await asyncio.sleep(interval)
+            evicted = self.evict_idle()
+            if evicted:
+                print(f"[residency] unloaded {evicted} idle guild(s); {len(self._lru)} resident, "
+                      f"{len(self.archived)} on disk")
+            if self.checkpoint_seconds and time.monotonic() - last_checkpoint >= self.checkpoint_seconds:
+                last_checkpoint = time.monotonic()
+                if not self.clean:
+                    started = time.perf_counter()
+                    # Shielded: stop() must not abandon a totals.json write halfway
+                    written = await asyncio.shield(self.checkpoint(totals))
+                    if on_checkpoint is not None:
+                        on_checkpoint(started, written)
+                    continue
+            if self.dirty:
+                started = time.perf_counter()
+                written = self.flush()
+                if on_flush is not None:
+                    on_flush(started, written)
+
+    async def _warm_up(self):
+        warm, self.warm = self.warm, []
+        started = time.perf_counter()
+        await self.preload(warm)
+        print(f"[residency] preloaded {len(warm)} guild(s) from the last shutdown in {time.perf_counter() - started:.2f}s")
+
+    def start(self, totals, on_checkpoint=None, on_flush=None):
+        if self.warm:
+            self._warm_task = asyncio.create_task(self._warm_up())
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(totals, on_checkpoint, on_flush))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
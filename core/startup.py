@@ -0,0 +1,100 @@
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psutil
+
+# ----- Startup tracer -----
+# Timestamps each startup phase relative to process start, so we can see where
+# the time goes between `python main.py` and the bot serving slash commands.
+# Reconnects (on_disconnect -> on_resumed/on_ready) are tracked as well.
+
+
+def _process_started() -> float:
+    """Wall-clock time the interpreter process started."""
+    try:
+        # /proc start time is in clock ticks since boot; compare against the boot clock
+        # directly, which avoids the boot-time drift baked into psutil's create_time()
+        with open(f"/proc/{os.getpid()}/stat", encoding="ascii") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        age = time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf("SC_CLK_TCK")
+        return time.time() - age
+    except (OSError, ValueError, IndexError, AttributeError):
+        return psutil.Process(os.getpid()).create_time()
+
+
+class StartupTracer:
+    def __init__(self):
+        self.process_started = _process_started()
+        # (phase, offset from process start, duration) in seconds
+        self.phases: list[tuple[str, float, float]] = []
+        self.serving_after: float | None = None
+        self.booting = True
+        self.disconnected_at: float | None = None
+        # (wall timestamp, kind, downtime seconds)
+        self.reconnects: deque[tuple[float, str, float]] = deque(maxlen=20)
+        # Phases timed after the first ready, i.e. repeated on reconnects
+        self.reconnect_phases: deque[tuple[str, float, float]] = deque(maxlen=50)
+        self.mark("interpreter + early imports")
+
+    def offset(self) -> float:
+        return time.time() - self.process_started
+
+    def mark(self, name: str):
+        """Record an instant phase ending now (duration = time since the previous phase ended)."""
+        now = self.offset()
+        previous_end = self.phases[-1][1] + self.phases[-1][2] if self.phases else 0.0
+        self.phases.append((name, previous_end, max(0.0, now - previous_end)))
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block; works around `await` inside async functions too."""
+        started = self.offset()
+        target = self.phases if self.booting else self.reconnect_phases
+        try:
+            yield
+        finally:
+            target.append((name, started, self.offset() - started))
+
+    def serving(self):
+        """Call once the bot is ready to answer commands; only the first call counts."""
+        if self.serving_after is None:
+            self.serving_after = self.offset()
+
+    def finished(self):
+        """End of the first on_ready: print the timeline; later phases count as reconnect work."""
+        if self.booting:
+            self.booting = False
+            print(self.report())
+
+    def disconnected(self):
+        if self.disconnected_at is None:
+            self.disconnected_at = time.time()
+
+    def reconnected(self, kind: str):
+        if self.disconnected_at is None:
+            return
+        self.reconnects.append((time.time(), kind, time.time() - self.disconnected_at))
+        self.disconnected_at = None
+
+    def slowest(self, limit: int = 5) -> list[tuple[str, float, float]]:
+        return sorted(self.phases, key=lambda p: p[2], reverse=True)[:limit]
+
+    def as_dict(self) -> dict:
+        return {
+            "serving_after": self.serving_after,
+            "phases": [{"phase": n, "start": s, "duration": d} for n, s, d in self.phases],
+        }
+
+    def report(self) -> str:
+        lines = ["\n=== Startup Timeline ==="]
+        for name, started, duration in self.phases:
+            lines.append(f"{started * 1000:9.1f} ms  +{duration * 1000:8.1f} ms  {name}")
+        if self.serving_after is not None:
+            lines.append(f"Serving commands {self.serving_after:.2f}s after process start")
+        lines.append("========================\n")
+        return "\n".join(lines)
+
+
+STARTUP = StartupTracer()
@@ -0,0 +1,198 @@
+import csv
+import json
+import os
+import random
+import shutil
+import string
+
+from core.channels import GuildChannels
+
+# ----- CSV storage -----
+# Row layout of the older counter.csv and words.csv, which are now only read to
+# migrate them to per-guild files (below). Word rows refer to the global
+# vocabulary (core/vocab.py) by index.
+
+STATS_FIELDS = ['id', 'entry_id', 'user_id', 'guild_id', 'messages', 'words', 'characters']
+WORDS_FIELDS = ['guild_id', 'word_id', 'count']  # word_id is the index into vocab.tsv
+
+
+# Generate a random 8-char entry_id
+def generate_word_id():
+    return ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
+
+
+def _create(path: str, fields: list[str]):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerow(fields)
+
+
+# Load counter.csv into `stats` ({guild_id: {user_id: record}}); returns the highest row id
+def load_stats(path: str, stats: dict) -> int:
+    max_id = 0
+    if not os.path.exists(path):
+        _create(path, STATS_FIELDS)
+        return max_id
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                rid = int(row['id'])
+                uid = row["user_id"]
+                gid = row["guild_id"]
+                stats.setdefault(gid, {})[uid] = {
+                    "id": rid,
+                    "entry_id": row["entry_id"],
+                    "user_id": uid,
+                    "guild_id": gid,
+                    "messages": int(row["messages"]),
+                    "words": int(row["words"]),
+                    "characters": int(row["characters"]),
+                }
+                max_id = max(max_id, rid)
+            except (KeyError, ValueError):
+                continue
+    return max_id
+
+
+# Load words.csv into `words_stats` ({guild_id: {word index: count}}); returns the row count.
+# A legacy per-row words.csv (guild_id, word, is_dict, ...) is migrated in place and kept as words.csv.legacy.
+def load_words(path: str, words_stats: dict, vocab) -> int:
+    rows = 0
+    if not os.path.exists(path):
+        _create(path, WORDS_FIELDS)
+        return rows
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        if 'word' in header:
+            rows = _read_legacy_words(reader, header, words_stats, vocab)
+        else:
+            for row in reader:
+                try:
+                    gid, widx, count = row[0], int(row[1]), int(row[2])
+                except (IndexError, ValueError):
+                    continue
+                if widx < len(vocab):  # Counts for words missing from vocab.tsv cannot be named
+                    words_stats.setdefault(gid, {})[widx] = count
+                    rows += 1
+            return rows
+    # Keep the old file, and only swap in the new one once it is complete
+    shutil.copy2(path, path + '.legacy')
+    vocab.save()
+    write_words(path + '.tmp', words_stats)
+    os.replace(path + '.tmp', path)
+    print(f"Migrated {rows} legacy word rows to {len(vocab)} vocabulary words (old file kept as {path}.legacy)")
+    return rows
+
+
+def _read_legacy_words(reader, header: list[str], words_stats: dict, vocab) -> int:
+    col = {name: i for i, name in enumerate(header)}
+    rows = 0
+    for row in reader:
+        try:
+            gid = row[col['guild_id']]
+            widx = vocab.add(row[col['word']], row[col['is_dict']] in ('True', 'true', '1'))
+            counts = words_stats.setdefault(gid, {})
+            counts[widx] = counts.get(widx, 0) + int(row[col['count']])
+            rows += 1
+        except (IndexError, KeyError, ValueError):
+            continue
+    return rows
+
+
+# Rewrite words.csv from {guild_id: {word index: count}}; returns the bytes written
+def write_words(path: str, words_stats: dict) -> int:
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(WORDS_FIELDS)
+        for gid, counts in words_stats.items():
+            writer.writerows((gid, widx, count) for widx, count in counts.items())
+        return f.tell()
+
+
+# ----- Per-guild files -----
+# The bot's storage layout (see core/residency.py): one file per guild, as compact JSON
+#   {"guild_id": ..., "users": [[user_id, id, entry_id, messages, words, characters(, kinds)], ...],
+#    "words": [[word index, count], ...],
+#    "channels": [[channel_id, messages, words, characters, [[user_id, messages], ...]], ...]}
+# where kinds, the per-kind counts from core.text.scan, is only written for users that have any,
+# and channels (core/channels.py) only for guilds with messages counted per channel.
+# next to a small manifest.json and the global totals in totals.json.
+
+# Write `payload` as JSON atomically; returns the bytes written
+def write_json(path: str, payload) -> int:
+    data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+    return len(data)
+
+
+def read_json(path: str):
+    """Parsed contents of `path`, or None if it is missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _user_row(uid: str, r: dict) -> list:
+    row = [uid, r["id"], r["entry_id"], r["messages"], r["words"], r["characters"]]
+    if "kinds" in r:
+        row.append(r["kinds"])
+    return row
+
+
+# Write one guild's {user_id: record}, {word index: count} and channels; returns the bytes written
+def write_guild(path: str, gid: str, users: dict, counts: dict, channels: GuildChannels | None = None) -> int:
+    payload = {
+        "guild_id": gid,
+        "users": [_user_row(uid, r) for uid, r in users.items()],
+        "words": list(counts.items()),
+    }
+    if channels:
+        payload["channels"] = channels.to_rows()
+    return write_json(path, payload)
+
+
+# Read a file written by write_guild back into ({user_id: record}, {word index: count}, GuildChannels)
+def read_guild(path: str, gid: str) -> tuple[dict, dict, GuildChannels]:
+    with open(path, "rb") as f:
+        payload = json.load(f)
+    users = {}
+    for uid, rid, entry_id, messages, words, characters, *kinds in payload.get("users", ()):
+        users[uid] = {"id": rid, "entry_id": entry_id, "user_id": uid, "guild_id": gid,
+                      "messages": messages, "words": words, "characters": characters}
+        if kinds:
+            users[uid]["kinds"] = kinds[0]
+    counts = {widx: count for widx, count in payload.get("words", ())}
+    return users, counts, GuildChannels.from_rows(payload.get("channels", ()))
+
+
+# Split counter.csv / words.csv, and guilds archived next to them, into per-guild files.
+# The CSVs are kept as *.migrated; returns the number of guilds written, or None if there was nothing to migrate.
+def migrate_csv(counter_path: str, words_path: str, archive_dir: str, guilds_dir: str, vocab) -> int | None:
+    if not any(os.path.exists(path) for path in (counter_path, words_path, archive_dir)):
+        return None
+    os.makedirs(guilds_dir, exist_ok=True)
+    stats, words_stats = {}, {}
+    if os.path.exists(counter_path):
+        load_stats(counter_path, stats)
+    if os.path.exists(words_path):
+        load_words(words_path, words_stats, vocab)
+    vocab.save()
+    guilds = stats.keys() | words_stats.keys()
+    for gid in guilds:
+        write_guild(os.path.join(guilds_dir, f"{gid}.json"), gid, stats.get(gid, {}), words_stats.get(gid, {}))
+    if os.path.isdir(archive_dir):
+        # Archived files are already in the per-guild format; a guild also in the CSVs keeps the CSV copy
+        for name in os.listdir(archive_dir):
+            if name.endswith(".json") and name[:-len(".json")] not in guilds:
+                os.replace(os.path.join(archive_dir, name), os.path.join(guilds_dir, name))
+                guilds.add(name[:-len(".json")])
+        shutil.rmtree(archive_dir)
+    for path in (counter_path, words_path):
+        if os.path.exists(path):
+            os.replace(path, path + ".migrated")
+    print(f"Migrated stats of {len(guilds)} guild(s) to per-guild files in {guilds_dir}")
+    return len(guilds)
@@ -0,0 +1,148 @@
+import re
+import unicodedata
+from itertools import filterfalse
+
+# ----- Message tokenizer -----
+# Shared by on_message and the history importer so live and imported counts agree.
+#
+# Discord markup is cut out of a message first, and counted by kind (KINDS, in
+# that order): code (inline or fenced), URLs, user / role / channel mentions,
+# custom emoji, and uncounted markup such as timestamps. Each kind is one regex
+# pass that only runs when the message contains the literal it starts with, so
+# plain messages skip them all. The rest is read for words in a single pass:
+# ASCII text, most messages, is split after one bytes.translate() turns word
+# breaks into spaces; other scripts take their plain words from str.split()
+# and only send the leftover tokens (emoji, punctuation inside a word) through
+# a pattern that tells unicode emoji from words. Only words go into the word
+# tables.
+#
+# A word is a run of Unicode letters, digits and combining marks, and may be
+# joined inside by apostrophes, hyphens, periods or underscores ("don't",
+# "e-mail", "u.s.a", "snake_case"); those are dropped at either end, like the
+# rest of the punctuation and markdown around it.
+
+KINDS = ("user_mentions", "role_mentions", "channel_mentions", "emojis", "custom_emojis", "urls", "code")
+USER_MENTIONS, ROLE_MENTIONS, CHANNEL_MENTIONS, EMOJIS, CUSTOM_EMOJIS, URLS, CODE = range(len(KINDS))
+
+def _char_class(codepoints) -> str:
+    """Regex character class body for ascending `codepoints`, as ranges."""
+    ranges, start, prev = [], None, None
+    for cp in codepoints:
+        if start is not None and cp == prev + 1:
+            prev = cp
+            continue
+        if start is not None:
+            ranges.append((start, prev))
+        start = prev = cp
+    if start is not None:
+        ranges.append((start, prev))
+    return "".join(re.escape(chr(a)) if a == b else f"{re.escape(chr(a))}-{re.escape(chr(b))}" for a, b in ranges)
+
+
+# Combining marks (vowel signs, accents) are not \w, but are part of words in most scripts.
+# Variation selectors and the keycap mark belong to emoji instead.
+_MARKS = _char_class(
+    cp for cp in range(0x300, 0x10000)
+    if unicodedata.category(chr(cp)).startswith("M") and not 0xFE00 <= cp <= 0xFE0F and cp != 0x20E3
+)
+
+_EMOJI_BASE = (
+    r"\u203c\u2049\u2194-\u2199\u21a9\u21aa\u231a\u231b\u2328\u23cf\u23e9-\u23f3\u23f8-\u23fa\u24c2"
+    r"\u25aa\u25ab\u25b6\u25c0\u25fb-\u25fe\u2600-\u27bf\u2934\u2935\u2b05-\u2b07\u2b1b\u2b1c\u2b50\u2b55"
+    r"\u3030\u303d\u3297\u3299\U0001f000-\U0001f1e5\U0001f200-\U0001faff"
+)
+_EMOJI_MODS = r"\ufe0f\U0001f3fb-\U0001f3ff\U000e0020-\U000e007f"  # Presentation, skin tones, flag tags
+_FLAG_LETTERS = r"\U0001f1e6-\U0001f1ff"   # Regional indicators, which come in pairs (one flag)
+# Starts with a single character class, so the regex engine can skip ahead to candidates
+_EMOJI = (
+    rf"[{_EMOJI_BASE}{_FLAG_LETTERS}](?:(?<=[{_FLAG_LETTERS}])[{_FLAG_LETTERS}])?[{_EMOJI_MODS}]*+"
+    rf"(?:\u200d[{_EMOJI_BASE}][{_EMOJI_MODS}]*+)*+"  # Sequence joined by ZWJ
+)
+_LETTER = rf"(?:[^\W_]++[{_MARKS}]*+)++"   # Letters or digits with any combining marks
+_WORD = rf"{_LETTER}(?:[-'\u2019._]++{_LETTER})*+"
+
+# Punctuation that always separates words in ASCII text, mapped to spaces with one bytes.translate()
+_BREAKS = b'!"#$%&()*+,/:;<=>?@[\\]^`{|}~'
+_ASCII_BREAKS = bytes.maketrans(_BREAKS, b" " * len(_BREAKS))
+ASCII_JOINERS = "-'._"
+
+# Wrapping a plain word; never the first character of markup or emoji
+EDGE_PUNCTUATION = "!\"$%&'()*+,-./;=?[\\]^_{|}~\u2018\u2019\u201c\u201d\u00ab\u00bb\u00bf\u00a1\u2026\u2013\u2014"
+
+# Markup, cut out of the text before words are read. Each pattern starts with a literal, which the
+# regex engine finds with a fast substring search, and runs only if the message contains that literal.
+CODE_RE = re.compile(r"```.*?```|`[^`\n]+`", re.DOTALL)
+MARKUP = (
+    # (kind or None to drop uncounted, literal the message must contain, pattern)
+    (URLS, "://", re.compile(r"https?://[^\s<>]+")),
+    (USER_MENTIONS, "<@", re.compile(r"<@!?\d+>")),
+    (ROLE_MENTIONS, "<@&", re.compile(r"<@&\d+>")),
+    (ROLE_MENTIONS, "@", re.compile(r"@everyone|@here")),  # The guild's default role
+    (CHANNEL_MENTIONS, "<#", re.compile(r"<#\d+>")),
+    (CUSTOM_EMOJIS, ":", re.compile(r"<a?:\w+:\d+>")),
+    (None, "<", re.compile(r"</[^\s<>:]+:\d+>|<t:-?\d+(?::[a-z])?>")),  # Slash command mentions, timestamps
+)
+EMOJI_RE = re.compile(_EMOJI)
+KEYCAP_RE = re.compile(r"[0-9#*]\ufe0f?\u20e3")
+WORD_RE = re.compile(_WORD)
+
+
+def _ascii_words(content: str) -> list[str]:
+    """Words of lowercased ASCII text: the same as _WORD, without running a regex over it."""
+    tokens = content.encode().translate(_ASCII_BREAKS).decode().split()
+    if "." in content or "'" in content or "-" in content or "_" in content:
+        return [word for word in (token.strip(ASCII_JOINERS) for token in tokens) if word]
+    return tokens
+
+
+def scan(content: str) -> tuple[list[str], list[int] | None]:
+    """Lowercased words of a message, and counts per KINDS (None when it has only words)."""
+    content = content.lower()
+    kinds = None
+    if "`" in content:
+        content, code = CODE_RE.subn(" ", content)
+        if code:
+            kinds = [0] * len(KINDS)
+            kinds[CODE] = code
+    if "<" in content or "@" in content or "://" in content:
+        for kind, literal, pattern in MARKUP:
+            if literal in content:
+                content, found = pattern.subn(" ", content)
+                if found and kind is not None:
+                    if kinds is None:
+                        kinds = [0] * len(KINDS)
+                    kinds[kind] += found
+    if not content.isascii():
+        for literal, pattern in (("\u20e3", KEYCAP_RE), ("", EMOJI_RE)):
+            if literal in content:
+                content, found = pattern.subn(" ", content)
+                if found:
+                    if kinds is None:
+                        kinds = [0] * len(KINDS)
+                    kinds[EMOJIS] += found
+    if content.isascii():
+        return _ascii_words(content), kinds
+
+    # Plain words are picked out at C speed; only the tokens left over are looked at one by one
+    tokens = content.split()
+    words = list(filter(str.isalnum, tokens))
+    if len(words) < len(tokens):
+        for token in filterfalse(str.isalnum, tokens):
+            word = token.strip(EDGE_PUNCTUATION)
+            if word.isalnum():
+                words.append(word)
+            else:
+                words.extend(WORD_RE.findall(token))
+    return words, kinds
+
+
+def add_kinds(rec: dict, kinds: list[int] | None):
+    """Add the counts from scan() to a user record's "kinds" (created on first use)."""
+    if not kinds:
+        return
+    totals = rec.get("kinds")
+    if totals is None:
+        rec["kinds"] = list(kinds)
+    else:
+        for i, count in enumerate(kinds):
+            totals[i] += count
@@ -0,0 +1,71 @@
+import heapq
+
+# ----- Incremental top-K table -----
+# Keeps exact totals for every key plus a cached set of the K largest, so
+# "top 10" queries are O(K log K) instead of a sort over every key. Increases
+# update the cache in place; a decrease of a cached key marks it dirty and the
+# next query rebuilds it with one O(n) pass.
+
+
+class TopK:
+    def __init__(self, k: int = 10):
+        self.k = k
+        self.totals: dict = {}
+        self._top: dict = {}
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self.totals)
+
+    def get(self, key, default=0):
+        return self.totals.get(key, default)
+
+    def add(self, key, delta: int):
+        value = self.totals.get(key, 0) + delta
+        if value > 0:
+            self.totals[key] = value
+        else:
+            self.totals.pop(key, None)
+            value = 0
+
+        if self._dirty:
+            return
+        if key in self._top:
+            if delta < 0:
+                self._dirty = True
+            else:
+                self._top[key] = value
+        elif delta > 0:
+            if len(self._top) < self.k:
+                self._top[key] = value
+            else:
+                floor_key = min(self._top, key=self._top.__getitem__)
+                if value > self._top[floor_key]:
+                    del self._top[floor_key]
+                    self._top[key] = value
+
+    def load(self, totals: dict):
+        """Replace every total at once; the cache is rebuilt on the next query."""
+        self.totals = {key: value for key, value in totals.items() if value > 0}
+        self._top.clear()
+        self._dirty = True
+
+    def copy(self) -> "TopK":
+        table = TopK(self.k)
+        table.totals, table._top, table._dirty = dict(self.totals), dict(self._top), self._dirty
+        return table
+
+    def clear(self):
+        self.totals.clear()
+        self._top.clear()
+        self._dirty = False
+
+    def top(self, n: int | None = None) -> list[tuple]:
+        """The n (<= K) largest (key, total) pairs, largest first."""
+        n = self.k if n is None else n
+        if n > self.k:
+            return heapq.nlargest(n, self.totals.items(), key=lambda kv: kv[1])
+        if self._dirty:
+            self._top = dict(heapq.nlargest(self.k, self.totals.items(), key=lambda kv: kv[1]))
+            self._dirty = False
+        return sorted(self._top.items(), key=lambda kv: kv[1], reverse=True)[:n]
@@ -0,0 +1,96 @@
+import os
+import time
+
+from core.metrics import FLUSH_SECONDS, FLUSH_BYTES, FLUSH_LAST_BYTES
+
+# ----- Global vocabulary -----
+# Every distinct word is stored once and interned to a dense integer index, with
+# its is_dict flag kept once per word. Per-guild word counts are keyed by that
+# index, so a word used in a thousand guilds costs one string, not a thousand.
+#
+# Persisted as vocab.tsv next to words.csv: one "word<TAB>is_dict" line per
+# word, the line number being its index. Words are only ever appended, so a
+# save normally writes just the words added since the last one.
+#
+# Because indexes are positions, load never skips or merges a line: a word
+# listed twice keeps both lines (the first one is what lookups return), and a
+# last line cut short by a crash is dropped and the file rewritten whole before
+# anything is appended to it. Guild files are written after the vocabulary, so
+# nothing can refer to a word whose line never made it to disk.
+
+
+class Vocabulary:
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.words: list[str] = []
+        self.index: dict[str, int] = {}
+        self.is_dict = bytearray()
+        self._saved = 0         # Words already on disk
+        self._rewrite = False   # A flag changed; the file must be rewritten
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def get(self, word: str) -> int | None:
+        return self.index.get(word)
+
+    def add(self, word: str, is_dict: bool) -> int:
+        """Index of `word`, adding it with the given flag if it is new."""
+        idx = self.index.get(word)
+        if idx is None:
+            idx = len(self.words)
+            self.words.append(word)
+            self.index[word] = idx
+            self.is_dict.append(1 if is_dict else 0)
+        return idx
+
+    def set_dict(self, idx: int, is_dict: bool):
+        if self.is_dict[idx] != is_dict:
+            self.is_dict[idx] = 1 if is_dict else 0
+            self._rewrite = True
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        duplicates = 0
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    # Cut short while being appended: drop it, and rewrite so the next append starts on a new line
+                    print(f"Warning: dropped an incomplete last line of {self.path}")
+                    self._rewrite = True
+                    break
+                word, _, flag = line[:-1].partition("\t")
+                idx = len(self.words)
+                self.words.append(word)
+                self.is_dict.append(1 if flag == "1" else 0)
+                if self.index.setdefault(word, idx) != idx:
+                    duplicates += 1
+        if duplicates:
+            print(f"Warning: {duplicates} word(s) listed twice in {self.path}; kept in place so no index moves")
+        self._saved = len(self.words)
+
+    def save(self) -> int:
+        """Write words added since the last save (or everything after a flag change); returns bytes written."""
+        if not self.path or (self._saved == len(self.words) and not self._rewrite):
+            return 0
+        started = time.perf_counter()
+        if self._rewrite:
+            start, tmp = 0, self.path + ".tmp"
+            target = open(tmp, "w", encoding="utf-8")
+        else:
+            start, tmp = self._saved, None
+            target = open(self.path, "a", encoding="utf-8")
+        with target as f:
+            lines = [f"{self.words[i]}\t{self.is_dict[i]}\n" for i in range(start, len(self.words))]
+            f.writelines(lines)
+            written = f.tell() if tmp else sum(len(line.encode("utf-8")) for line in lines)
+        if tmp:
+            os.replace(tmp, self.path)
+        self._saved = len(self.words)
+        self._rewrite = False
+        # Saved from several places (guild writes, shutdown, reclassification); recorded here for all of them
+        FLUSH_SECONDS.observe(time.perf_counter() - started, table="vocab")
+        FLUSH_BYTES.inc(written, table="vocab")
+        FLUSH_LAST_BYTES.set(written, table="vocab")
+        return written
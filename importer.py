@@ -0,0 +1,446 @@
+import argparse
+import datetime
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config import (
+    DB_DIR, COUNTER_FILE, WORDS_FILE, VOCAB_FILE, ARCHIVE_DIR, GUILDS_DIR, MANIFEST_FILE, TOTALS_FILE,
+    DICTIONARY_FILE, DICTIONARY_DIR, DICTIONARY_CACHE_DIR, DEFAULT_LOCALES, SHARD_COUNT, SHARD_IDS,
+)
+from core.channels import GuildChannels
+from core.lexicon import Lexicon, dictionary_sources
+from core.residency import GuildResidency
+from core.storage import migrate_csv, generate_word_id
+from core.text import KINDS, scan, add_kinds
+from core.vocab import Vocabulary
+
+# ----- History importer -----
+# Backfills the per-guild stats files (db/guilds/<guild_id>.json) from Discord
+# chat exports so a new guild does not start from zero. Files are streamed
+# (never loaded whole) and parsed in a process pool with the same tokenizer and
+# dictionary as on_message.
+#
+# Supported inputs:
+#   DiscordChatExporter JSON: {"guild": {...}, "channel": {...}, "messages": [...]}
+#   Discord data package:     messages/c<channel id>/messages.json (+ channel.json,
+#                             authored by the owner in account/user.json)
+#
+# Imports are idempotent: db/imports.json records the message-ID ranges already
+# imported per channel, so re-importing a file or a newer overlapping export
+# only adds messages not counted before. A data package only holds its owner's
+# messages, so its ranges are recorded per channel and author ("<channel>/<user>")
+# and only skip that author's messages in later imports. Live counting is not tracked there;
+# pass --before <first message the bot saw> to avoid counting those twice.
+# Thread exports are tracked there under the thread but, as live messages are,
+# counted in the channel stats towards the thread's parent channel.
+#
+# Stop the bot (or that cluster worker) first; it rewrites the same guild files.
+# In cluster mode run once per cluster with CLUSTER_ID/SHARD_IDS/SHARD_COUNT set;
+# guilds on other shards are skipped.
+#
+# Usage: python importer.py exports/ [more files or dirs] --workers 8 [--before 2024-01-01]
+
+LEDGER_FILE = os.path.join(DB_DIR, "imports.json")
+DISCORD_EPOCH_MS = 1420070400000
+COUNTED_TYPES = {"Default", "Reply", 0, 19}
+SKIP_FILES = {"channel.json", "index.json", "user.json", "guild.json"}
+THREAD_TYPES = {10, 11, 12}  # Discord channel types of news, public and private threads
+_WS = re.compile(r"\s*")
+
+
+# ----- Incremental JSON parser -----
+class JsonStream:
+    """Pull parser over a text file: decodes one value at a time with a bounded buffer."""
+
+    def __init__(self, f, chunk_size: int = 1 << 20):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} in {getattr(self.f, 'name', 'stream')}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A value ending exactly at the buffer edge may be truncated (e.g. a number)
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def items(self):
+        """Yield the elements of the array at the cursor."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            sep = self.peek()
+            self.pos += 1
+            if sep == "]":
+                return
+            if sep != ",":
+                raise ValueError("malformed array")
+
+    def members(self):
+        """Yield the keys of the object at the cursor; consume each value before resuming."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            sep = self.peek()
+            self.pos += 1
+            if sep == "}":
+                return
+            if sep != ",":
+                raise ValueError("malformed object")
+
+
+def snowflake_from(value: str) -> int:
+    """A message ID, or an ISO date turned into the first snowflake of that moment."""
+    if value.isdigit():
+        return int(value)
+    moment = datetime.datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return (int(moment.timestamp() * 1000) - DISCORD_EPOCH_MS) << 22
+
+
+def _read_json(path: str):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# ----- Worker side -----
+DICTIONARY: Lexicon | None = None
+
+
+def _init_worker(sources: dict[str, str], default_locales: list[str], cache_dir: str):
+    global DICTIONARY
+    DICTIONARY = Lexicon(sources, default_locales, cache_dir)
+    DICTIONARY.load()
+
+
+def _package_meta(path: str) -> dict:
+    """Guild/channel/author of a data-package messages.json from its sibling files."""
+    channel_dir = os.path.dirname(path)
+    channel = _read_json(os.path.join(channel_dir, "channel.json")) or {}
+    user = _read_json(os.path.join(channel_dir, "..", "..", "account", "user.json")) or {}
+    return {
+        "guild": channel.get("guild") or {},
+        "channel": {"id": channel.get("id"), "type": channel.get("type"), "parent_id": channel.get("parent_id")},
+        "author": str(user.get("id", "")),
+    }
+
+
+def _counted_channel(channel: dict) -> str:
+    """The channel an export's messages count towards, as channel_of does live: its own, or a thread's parent."""
+    kind = channel.get("type")
+    thread = kind in THREAD_TYPES or (isinstance(kind, str) and "Thread" in kind)
+    # DiscordChatExporter lists a thread's parent channel as its category
+    parent = channel.get("parent_id") or (channel.get("categoryId") if thread else None)
+    return str(parent or channel.get("id") or "")
+
+
+def _messages(stream: JsonStream, path: str, meta: dict):
+    """Yield (message id, author id, content) and fill `meta` before the first one."""
+    if stream.peek() == "[":
+        meta.update(_package_meta(path))
+        for m in stream.items():
+            content = m.get("Contents") or m.get("content") or ""
+            yield int(m.get("ID") or m["id"]), meta["author"], content
+        return
+
+    for key in stream.members():
+        if key != "messages":
+            meta[key] = stream.value()
+            continue
+        for m in stream.items():
+            author = m.get("author") or {}
+            if author.get("isBot") or m.get("type", "Default") not in COUNTED_TYPES:
+                continue
+            yield int(m["id"]), str(author.get("id", "")), m.get("content") or ""
+
+
+def import_file(task: dict) -> dict:
+    """Count one export file. Runs in a pool worker; returns per-user and per-word deltas."""
+    path, ranges_by_channel, before = task["path"], task["ranges"], task["before"]
+    result = {"path": path, "guild_id": None, "channel_id": None, "stats_channel_id": None, "ledger_key": None,
+              "users": {}, "words": {}, "dict": [], "range": None, "messages": 0, "skipped": 0, "error": None}
+    users, words = result["users"], result["words"]
+    lo = hi = None
+    meta: dict = {}
+    ranges = None
+    author_ranges: dict[str, list] = {}  # user_id -> ranges imported from that user's data packages
+    try:
+        with open(path, encoding="utf-8") as f:
+            for mid, uid, content in _messages(JsonStream(f), path, meta):
+                if ranges is None:
+                    gid = str((meta.get("guild") or {}).get("id") or "")
+                    cid = str((meta.get("channel") or {}).get("id") or "")
+                    if not gid.isdigit() or not cid:
+                        result["error"] = "not a guild channel export"
+                        return result
+                    result["guild_id"], result["channel_id"] = gid, cid
+                    result["stats_channel_id"] = _counted_channel(meta["channel"])
+                    if task["shard_ids"] and (int(gid) >> 22) % task["shard_count"] not in task["shard_ids"]:
+                        result["error"] = "guild belongs to another cluster"
+                        return result
+                    ranges = ranges_by_channel.get(cid, [])
+                    result["ledger_key"] = ledger_key(cid, meta.get("author"))
+                known = author_ranges.get(uid)
+                if known is None:
+                    known = author_ranges[uid] = ranges_by_channel.get(ledger_key(cid, uid), [])
+                if (not uid or (before and mid >= before) or any(a <= mid <= b for a, b in ranges)
+                        or any(a <= mid <= b for a, b in known)):
+                    result["skipped"] += 1
+                    continue
+
+                totals = users.setdefault(uid, [0, 0, 0, [0] * len(KINDS)])
+                found, kinds = scan(content)
+                totals[0] += 1
+                totals[1] += len(found)
+                totals[2] += len(content)
+                if kinds:
+                    for i, count in enumerate(kinds):
+                        totals[3][i] += count
+                for w in found:
+                    words[w] = words.get(w, 0) + 1
+                lo = mid if lo is None else min(lo, mid)
+                hi = mid if hi is None else max(hi, mid)
+                result["messages"] += 1
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        # A truncated or foreign file is reported, not half-merged
+        result.update(users={}, words={}, messages=0, range=None, error=f"{type(e).__name__}: {e}")
+        return result
+    if lo is None and ranges is None:
+        result["error"] = "no messages"
+    result["range"] = [lo, hi] if lo is not None else None
+    result["dict"] = [w for w in words if DICTIONARY.in_default(w)]
+    return result
+
+
+# ----- Import ledger -----
+def ledger_key(cid: str, author: str | None = None) -> str:
+    """Where the ranges of an export are recorded: per channel, or per channel and author for a data package."""
+    return f"{cid}/{author}" if author else cid
+
+
+def ranges_overlap(key: str, span: list[int], added: dict[str, list[list[int]]]) -> bool:
+    """Whether `span` under `key` covers messages also in a span already in `added`."""
+    cid = key.split("/")[0]
+    for other, spans in added.items():
+        # Spans of one channel share messages unless both belong to different authors
+        if other.split("/")[0] == cid and (other == key or "/" not in other or "/" not in key):
+            if any(a <= span[1] and span[0] <= b for a, b in spans):
+                return True
+    return False
+
+
+class ImportLedger:
+    def __init__(self, path: str = LEDGER_FILE):
+        self.path = path
+        data = _read_json(path) or {}
+        self.channels: dict[str, list[list[int]]] = data.get("channels", {})
+        self.files: dict[str, dict] = data.get("files", {})
+
+    @staticmethod
+    def fingerprint(path: str) -> str:
+        st = os.stat(path)
+        return f"{st.st_size}:{int(st.st_mtime)}"
+
+    def seen(self, path: str) -> bool:
+        record = self.files.get(os.path.abspath(path))
+        return bool(record) and record.get("fingerprint") == self.fingerprint(path)
+
+    def record(self, result: dict):
+        if result["range"] is not None:
+            key = result["ledger_key"]
+            spans = sorted(self.channels.get(key, []) + [result["range"]])
+            merged = [spans[0]]
+            for a, b in spans[1:]:
+                if a <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], b)
+                else:
+                    merged.append([a, b])
+            self.channels[key] = merged
+        self.files[os.path.abspath(result["path"])] = {
+            "fingerprint": self.fingerprint(result["path"]),
+            "guild_id": result["guild_id"],
+            "channel_id": result["channel_id"],
+            "messages": result["messages"],
+            "imported_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"channels": self.channels, "files": self.files}, f)
+        os.replace(tmp, self.path)
+
+
+# ----- Merge into the bot's tables -----
+class Merger:
+    def __init__(self, migrate: bool = True):
+        self.stats: dict = {}
+        self.words_stats: dict = {}
+        self.channel_stats: dict = {}
+        self.vocab = Vocabulary(VOCAB_FILE)
+        self.vocab.load()
+        if migrate and not os.path.exists(MANIFEST_FILE):
+            migrate_csv(COUNTER_FILE, WORDS_FILE, ARCHIVE_DIR, GUILDS_DIR, self.vocab)
+        # Only the guilds being imported into are loaded. Their files are rewritten on save, which
+        # marks the bot's checkpointed totals stale so its next start rebuilds them.
+        self.residency = GuildResidency(self.stats, self.words_stats, self.channel_stats, GUILDS_DIR, MANIFEST_FILE, TOTALS_FILE)
+        self.residency.load()
+
+    def merge(self, result: dict):
+        gid = result["guild_id"]
+        self.residency.ensure(gid)
+        users = self.stats.setdefault(gid, {})
+        channels = self.channel_stats.setdefault(gid, GuildChannels())
+        for uid, (messages, words, characters, kinds) in result["users"].items():
+            rec = users.get(uid)
+            if rec is None:
+                rec = users[uid] = {
+                    'id': self.residency.next_id(), 'entry_id': generate_word_id(), 'user_id': uid, 'guild_id': gid,
+                    'messages': 0, 'words': 0, 'characters': 0,
+                }
+            rec['messages'] += messages
+            rec['words'] += words
+            rec['characters'] += characters
+            if any(kinds):
+                add_kinds(rec, kinds)
+            channels.record(result["stats_channel_id"], uid, messages, words, characters)
+        dict_words = set(result["dict"])
+        counts = self.words_stats.setdefault(gid, {})
+        self.residency.mark_dirty(gid)
+        for word, count in result["words"].items():
+            widx = self.vocab.add(word, word in dict_words)
+            counts[widx] = counts.get(widx, 0) + count
+
+    def save(self):
+        self.vocab.save()  # Before the guild files, so every index they refer to is on disk
+        self.residency.flush()
+
+
+def find_exports(paths: list[str]) -> list[str]:
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(path)
+            continue
+        for root, _, files in os.walk(path):
+            found.extend(os.path.join(root, name) for name in files
+                         if name.endswith(".json") and name not in SKIP_FILES)
+    # Largest first so one huge channel does not end up last on a single worker
+    return sorted(set(found), key=os.path.getsize, reverse=True)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Import Discord chat exports into the per-guild stats files")
+    parser.add_argument("paths", nargs="+", help="Export files or directories to scan for *.json")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parser processes")
+    parser.add_argument("--before", default=None,
+                        help="Only import messages before this message ID or ISO date (e.g. when the bot joined)")
+    parser.add_argument("--dry-run", action="store_true", help="Parse and report without writing anything")
+    args = parser.parse_args()
+
+    os.makedirs(DB_DIR, exist_ok=True)
+    ledger = ImportLedger()
+    files = [p for p in find_exports(args.paths) if not ledger.seen(p)]
+    before = snowflake_from(args.before) if args.before else None
+    print(f"[import] {len(files)} new file(s) to scan with {args.workers} worker(s)")
+
+    merger = Merger(migrate=not args.dry_run)
+    started = time.perf_counter()
+    imported = skipped = 0
+    pending = files
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(dictionary_sources(DICTIONARY_FILE, DICTIONARY_DIR),
+                                       DEFAULT_LOCALES, DICTIONARY_CACHE_DIR)) as pool:
+        while pending:
+            # Every file in a round sees the ledger as it was when the round started,
+            # so two exports of the same channel in one round are detected and retried
+            round_start = {cid: list(spans) for cid, spans in ledger.channels.items()}
+            tasks = [{"path": p, "ranges": round_start, "before": before,
+                      "shard_ids": SHARD_IDS, "shard_count": SHARD_COUNT} for p in pending]
+            pending = []
+            added: dict[str, list[list[int]]] = {}  # ledger key -> spans merged this round
+            for future in as_completed([pool.submit(import_file, task) for task in tasks]):
+                result = future.result()
+                if result["error"]:
+                    print(f"[import] skipped {result['path']}: {result['error']}")
+                    continue
+                span = result["range"]
+                if span and ranges_overlap(result["ledger_key"], span, added):
+                    pending.append(result["path"])
+                    continue
+                merger.merge(result)
+                ledger.record(result)
+                if span:
+                    added.setdefault(result["ledger_key"], []).append(span)
+                imported += result["messages"]
+                skipped += result["skipped"]
+            if pending:
+                print(f"[import] {len(pending)} file(s) overlap another export of the same channel; re-scanning")
+
+    elapsed = time.perf_counter() - started
+    print(f"[import] {imported} message(s) imported, {skipped} skipped as already counted or too new, "
+          f"in {elapsed:.1f}s ({imported / elapsed if elapsed else 0:.0f} msg/s)")
+    if args.dry_run:
+        print("[import] dry run: nothing written")
+        return
+    merger.save()
+    # The ledger goes last; a crash between the two writes would count this run's files again
+    # on the next run, so back up db/ before a large backfill
+    ledger.save()
+    word_rows = sum(len(counts) for counts in merger.words_stats.values())
+    stats_rows = sum(len(users) for users in merger.stats.values())
+    print(f"[import] {len(merger.stats)} guild file(s) updated: {stats_rows} stats rows, {word_rows} word rows; "
+          f"{len(merger.vocab)} distinct words in {DB_DIR}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -3,183 +3,305 @@ import csv
 import string
 import datetime
 import random
+import signal
+import sys
+import time
+import asyncio
+from array import array
 
+from core.startup import STARTUP
 import discord
+from discord import app_commands
 from discord.ext import commands
 
 from core.logger import setup_error_handling
-from config import DISCORD_TOKEN, LOG_GUILD_ID, DISCORD_CLIENT_ID
+from core.metrics import (
+    MESSAGES_INGESTED, ON_MESSAGE_SECONDS, FLUSH_SECONDS, FLUSH_BYTES, FLUSH_LAST_BYTES,
+    COMMAND_SECONDS, COMMAND_ERRORS, TABLE_ROWS, MESSAGES_RECONCILED, start_metrics_server,
+)
+from core.loopmon import LOOP_MONITOR, CURRENT_HANDLER
+from core.command_registry import COMMAND_REGISTRY
+from core.shutdown import shutdown
+from core.aggregator import AGGREGATOR
+from core.churn import GuildChurn
+from config import (
+    DISCORD_TOKEN, LOG_GUILD_ID, DISCORD_CLIENT_ID, METRICS_HOST, METRICS_PORT,
+    LOOP_LAG_THRESHOLD_MS, LOOP_DEBUG, DB_DIR, COUNTER_FILE, WORDS_FILE, ARCHIVE_DIR, GUILDS_DIR,
+    MANIFEST_FILE, CLUSTER_ID, SHARD_COUNT, SHARD_IDS, MEMBER_CACHE,
+    GUILD_CHURN_SECONDS, GUILD_CHURN_MAX_SECONDS, DEFAULT_LOCALES,
+)
+from core.storage import migrate_csv, generate_word_id
+from core.text import KINDS, scan, add_kinds
 from user_utils import update_known_users
-from shared import stats, max_id, words_stats, max_word_id
+from core.recent import RecentMessage
+from core.channels import GuildChannels, channel_of
+from shared import stats, words_stats, channel_stats, guild_ranks, VOCAB, LEXICON, RESIDENCY, TOTALS, NAMES, RECENT
+STARTUP.mark("imports")
 
 # ----- Directory setup -----
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_DIR = os.path.join(BASE_DIR, 'db')
 os.makedirs(DB_DIR, exist_ok=True)
 
-# ----- English words loader -----
-# Load the `american-english` word list from the db directory into a set for O(1) lookups
-AMERICAN_ENGLISH_FILE = os.path.join(DB_DIR, 'american-english')
-if os.path.exists(AMERICAN_ENGLISH_FILE):
-    with open(AMERICAN_ENGLISH_FILE, encoding='utf-8') as f:
-        ENGLISH_WORDS = set(line.strip().lower() for line in f if line.strip())
-    print(f"Loaded {len(ENGLISH_WORDS)} English words from '{AMERICAN_ENGLISH_FILE}'")
-else:
-    ENGLISH_WORDS = set()
-    print(f"Warning: English word list file '{AMERICAN_ENGLISH_FILE}' not found. ENGLISH_WORDS is empty.")
-
-# ----- Stats CSV setup -----
-COUNTER_FILE = os.path.join(DB_DIR, 'counter.csv')
-WORDS_FILE = os.path.join(DB_DIR, 'words.csv')
-
-# Initialize or load counter.csv
-if not os.path.exists(COUNTER_FILE):
-    with open(COUNTER_FILE, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(["id", "entry_id", "user_id", "guild_id", "messages", "words", "characters"])
-else:
-    with open(COUNTER_FILE, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                rid = int(row['id'])
-                uid = row["user_id"]
-                gid = row["guild_id"]
-                stats[(uid, gid)] = {
-                    "id": rid,
-                    "entry_id": row["entry_id"],
-                    "user_id": uid,
-                    "guild_id": gid,
-                    "messages": int(row["messages"]),
-                    "words": int(row["words"]),
-                    "characters": int(row["characters"]),
-                }
-                max_id = max(max_id, rid)
-            except (KeyError, ValueError):
-                continue
-
-# Initialize or load words.csv
-if not os.path.exists(WORDS_FILE):
-    with open(WORDS_FILE, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(['id', 'word_id', 'guild_id', 'word', 'count', 'is_dict'])
-else:
-    with open(WORDS_FILE, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                wid = int(row['id'])
-                gid = row['guild_id']
-                word = row['word']
-                count = int(row['count'])
-                is_dict = row['is_dict'] in ('True', 'true', '1')
-                word_id = row['word_id']
-                words_stats[(gid, word)] = {
-                    'id': wid,
-                    'word_id': word_id,
-                    'guild_id': gid,
-                    'word': word,
-                    'count': count,
-                    'is_dict': is_dict,
-                }
-                max_word_id = max(max_word_id, wid)
-            except (KeyError, ValueError):
-                continue
-
-# Persist stats to CSV
-def save_stats():
-    with open(COUNTER_FILE, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=['id','entry_id','user_id','guild_id','messages','words','characters'])
-        writer.writeheader()
-        for rec in stats.values():
-            writer.writerow(rec)
-
-# Persist word stats to CSV
-def save_words():
-    with open(WORDS_FILE, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=['id','word_id','guild_id','word','count','is_dict'])
-        writer.writeheader()
-        for rec in words_stats.values():
-            writer.writerow({
-                'id': rec['id'],
-                'word_id': rec['word_id'],
-                'guild_id': rec['guild_id'],
-                'word': rec['word'],
-                'count': rec['count'],
-                'is_dict': rec['is_dict'],
-            })
-
-# Generate a unique 8-char word_id
-def generate_word_id():
-    return ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
+# ----- Dictionaries -----
+# Map the word list of every locale (indexed on first use), and load each guild's choice of locales
+LEXICON.load()
+print("Loaded word lists: " + (", ".join(f"{locale} ({len(words)})" for locale, words in LEXICON.lists.items()) or "none"))
+if not LEXICON.default_mask:
+    print(f"Warning: none of the default locales {DEFAULT_LOCALES} has a word list. "
+          "Every word counts as non-dictionary.")
+STARTUP.mark("dictionary load")
+
+# ----- Stats storage setup -----
+# Stats are kept in per-guild files (core/residency.py); a guild is only read on first access
+
+# Load the word vocabulary; per-guild word counts are keyed by its indexes
+VOCAB.load()
+STARTUP.mark("vocab.tsv load")
+
+# Convert counter.csv / words.csv from before per-guild storage
+if not os.path.exists(MANIFEST_FILE):
+    migrate_csv(COUNTER_FILE, WORDS_FILE, ARCHIVE_DIR, GUILDS_DIR, VOCAB)
+
+# Read the manifest and the checkpointed global totals (rebuilt from every guild file after a crash)
+RESIDENCY.load(TOTALS, VOCAB)
+if not RESIDENCY.clean:
+    RESIDENCY.checkpoint_now(TOTALS)
+STARTUP.mark("manifest + global totals")
+
+# Names shown on leaderboards
+NAMES.load()
+STARTUP.mark("names.json load")
+
+TABLE_ROWS.set_function(lambda: sum(len(users) for users in stats.values()), table="stats")
+TABLE_ROWS.set_function(lambda: sum(len(counts) for counts in words_stats.values()), table="words_stats")
+TABLE_ROWS.set_function(lambda: len(VOCAB), table="vocab")
+
+# Record how long a flush took and how many bytes it wrote
+def _record_flush(table: str, started: float, written: int):
+    FLUSH_SECONDS.observe(time.perf_counter() - started, table=table)
+    FLUSH_BYTES.inc(written, table=table)
+    FLUSH_LAST_BYTES.set(written, table=table)
 
 # ----- Bot setup -----
+# Command tree that stamps each interaction so slash-command latency can be measured
+class MetricsCommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        interaction.extras["started_at"] = time.perf_counter()
+        if interaction.command is not None:
+            CURRENT_HANDLER.set(f"/{interaction.command.qualified_name}")
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        command = interaction.command
+        if command is not None:
+            COMMAND_ERRORS.inc(command=command.qualified_name)
+            _observe_command(interaction, command)
+        await super().on_error(interaction, error)
+
+def _observe_command(interaction: discord.Interaction, command):
+    started = interaction.extras.get("started_at")
+    if started is not None:
+        COMMAND_SECONDS.observe(time.perf_counter() - started, command=command.qualified_name)
+
 intents = discord.Intents.default()
 intents.message_content = True
 intents.guilds = True
 intents.members = True
-bot = commands.AutoShardedBot(
+
+# Bot that flushes every pending stat to disk when it closes (/dev restart, SIGTERM, Ctrl+C)
+class ChatCounterBot(commands.AutoShardedBot):
+    shutting_down = False      # Set once close() starts; events arriving after that are not counted
+    restart_requested = False  # Set by /dev restart; the process execs itself once run() returns
+
+    async def setup_hook(self):
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.ensure_future(self.close()))
+        except NotImplementedError:  # Windows
+            pass
+
+    async def close(self):
+        # Flush before closing the client: once the gateway closes, run() returns and asyncio
+        # cancels every task still running, which would cut the flush short
+        if not self.shutting_down:
+            self.shutting_down = True
+            try:
+                await shutdown()
+            finally:
+                await super().close()
+        else:
+            await super().close()
+
+bot = ChatCounterBot(
     command_prefix="!",
     intents=intents,
-    application_id=int(DISCORD_CLIENT_ID)
+    application_id=int(DISCORD_CLIENT_ID),
+    tree_cls=MetricsCommandTree,
+    shard_count=SHARD_COUNT,
+    shard_ids=SHARD_IDS,
+    # Without the member cache, leaderboard names come from the name cache (core/names.py)
+    member_cache_flags=discord.MemberCacheFlags.from_intents(intents) if MEMBER_CACHE else discord.MemberCacheFlags.none(),
+    chunk_guilds_at_startup=MEMBER_CACHE,
 )
 
-# Clean a token: strip leading punctuation/symbols and lower
-def clean_token(token: str) -> str:
-    # Remove leading and trailing punctuation/symbols and convert to lowercase
-    return token.strip(string.punctuation + '“”‘’').lower()
-
 # ----- Event: track every user message and words -----
 @bot.event
 async def on_message(message: discord.Message):
-    if message.author.bot or message.guild is None:
+    if message.author.bot or message.guild is None or bot.shutting_down:
         return
 
+    CURRENT_HANDLER.set("on_message")
+    started = time.perf_counter()
     uid = str(message.author.id)
     gid = str(message.guild.id)
-    key = (uid, gid)
+    cid = channel_of(message.channel)
+    RESIDENCY.ensure(gid)  # Loads the guild's file on first access
+    RESIDENCY.mark_dirty(gid)
+    users = stats.setdefault(gid, {})
+    NAMES.see(uid, message.author.name, gid)
 
-    global max_id, max_word_id
     # Update message stats
-    if key not in stats:
-        max_id += 1
+    if uid not in users:
         entry_id = generate_word_id()
-        stats[key] = {'id': max_id, 'entry_id': entry_id, 'user_id': uid, 'guild_id': gid, 'messages':0,'words':0,'characters':0}
+        users[uid] = {'id': RESIDENCY.next_id(), 'entry_id': entry_id, 'user_id': uid, 'guild_id': gid, 'messages':0,'words':0,'characters':0}
 
-    rec = stats[key]
+    rec = users[uid]
     rec["messages"] += 1
+    ranks = guild_ranks.get(gid)
+    if ranks is not None:
+        ranks.set(uid, rec["messages"])
     content = message.content or ""
-    tokens = content.split()
-    rec['words'] += len(tokens)
+    words, kinds = scan(content)
+    rec['words'] += len(words)
     rec["characters"] += len(content)
-
-    save_stats()
+    add_kinds(rec, kinds)
 
     # Track each word
-    for token in tokens:
-        w = clean_token(token)
-        if not w:
-            continue
-        wkey = (gid, w)
-        if wkey not in words_stats:
-            max_word_id += 1
-            wid = max_word_id
-            word_id = generate_word_id()
-            is_dict = w in ENGLISH_WORDS
-            words_stats[wkey] = {
-                'id': wid,
-                'word_id': word_id,
-                'guild_id': gid,
-                'word': w,
-                'count': 1,
-                'is_dict': is_dict,
-            }
-        else:
-            words_stats[wkey]['count'] += 1
-    save_words()
+    counts = words_stats.setdefault(gid, {})
+    counted = []
+    indexes = []
+    for w in words:
+        widx = VOCAB.get(w)
+        if widx is None:
+            widx = VOCAB.add(w, LEXICON.in_default(w))
+        counts[widx] = counts.get(widx, 0) + 1
+        counted.append((w, VOCAB.is_dict[widx]))
+        indexes.append(widx)
+
+    # The channel level under the guild's records above (core/channels.py)
+    channel_stats.setdefault(gid, GuildChannels()).record(cid, uid, 1, len(words), len(content))
+    RECENT.remember(message.id, gid, cid, uid, len(content), kinds, indexes)
+
+    # Fold the message into the global totals, and queue it for the cross-process aggregator
+    TOTALS.record(gid, uid, len(words), len(content), counted)
+    if AGGREGATOR.enabled:
+        AGGREGATOR.record(gid, uid, len(words), len(content), counted)
+
+    MESSAGES_INGESTED.inc(shard=message.guild.shard_id)
+    ON_MESSAGE_SECONDS.observe(time.perf_counter() - started)
 
     await bot.process_commands(message)
 
+# ----- Events: reconcile edited and deleted messages -----
+# Raw events, so messages that dropped out of discord.py's message cache are covered too.
+# What a message counted comes from RECENT; older messages stay counted as they were.
+ZERO_KINDS = (0,) * len(KINDS)
+
+def reconcile_message(entry: RecentMessage, content: str | None) -> str:
+    """Replace what `entry` counted with `content`, or take it out entirely if None (deleted).
+
+    Returns the result for MESSAGES_RECONCILED; the caller saves the stats afterwards.
+    """
+    gid, uid = entry.gid, entry.uid
+    RESIDENCY.ensure(gid)
+    rec = stats.get(gid, {}).get(uid)
+    if rec is None:
+        return "missed"
+
+    if content is None:
+        messages, characters, kinds, indexes = -1, 0, None, []
+    else:
+        words, kinds = scan(content)
+        messages, characters, indexes = 0, len(content), []
+        for w in words:
+            widx = VOCAB.get(w)
+            if widx is None:
+                widx = VOCAB.add(w, LEXICON.in_default(w))
+            indexes.append(widx)
+
+    deltas = {}
+    for widx in entry.words:
+        deltas[widx] = deltas.get(widx, 0) - 1
+    for widx in indexes:
+        deltas[widx] = deltas.get(widx, 0) + 1
+    deltas = {widx: delta for widx, delta in deltas.items() if delta}
+    kinds_delta = [new - old for new, old in zip(kinds or ZERO_KINDS, entry.kinds or ZERO_KINDS)]
+    words_delta = len(indexes) - len(entry.words)
+    characters_delta = characters - entry.characters
+    if not (messages or deltas or words_delta or characters_delta or any(kinds_delta)):
+        return "unchanged"
+
+    RESIDENCY.mark_dirty(gid)
+    rec["messages"] += messages
+    if messages and gid in guild_ranks:
+        guild_ranks[gid].set(uid, rec["messages"])
+    rec["words"] += words_delta
+    rec["characters"] += characters_delta
+    if any(kinds_delta):
+        add_kinds(rec, kinds_delta)
+    channel_stats.setdefault(gid, GuildChannels()).record(entry.cid, uid, messages, words_delta, characters_delta)
+    counts = words_stats.setdefault(gid, {})
+    changed, dict_words = {}, []
+    for widx, delta in deltas.items():
+        count = counts.get(widx, 0) + delta
+        if count > 0:
+            counts[widx] = count
+        else:
+            counts.pop(widx, None)
+        word = VOCAB.words[widx]
+        changed[word] = delta
+        if VOCAB.is_dict[widx]:
+            dict_words.append(word)
+
+    values = [messages, words_delta, characters_delta]
+    TOTALS.adjust(gid, uid, values, changed, dict_words)
+    if AGGREGATOR.enabled:
+        AGGREGATOR.adjust(gid, uid, values, changed, dict_words)
+    if content is not None:
+        entry.words, entry.characters = array("I", indexes), characters
+        entry.kinds = tuple(kinds) if kinds else None
+    return "applied"
+
+@bot.event
+async def on_raw_message_edit(payload: discord.RawMessageUpdateEvent):
+    if "content" not in payload.data or bot.shutting_down:
+        return  # Embeds resolved or pins changed; the text is the same
+    entry = RECENT.get(payload.message_id)
+    if entry is None:
+        MESSAGES_RECONCILED.inc(event="edit", result="missed")
+        return
+    CURRENT_HANDLER.set("on_raw_message_edit")
+    MESSAGES_RECONCILED.inc(event="edit", result=reconcile_message(entry, payload.data["content"] or ""))
+
+@bot.event
+async def on_raw_message_delete(payload: discord.RawMessageDeleteEvent):
+    if bot.shutting_down:
+        return
+    entry = RECENT.pop(payload.message_id)
+    if entry is None:
+        MESSAGES_RECONCILED.inc(event="delete", result="missed")
+        return
+    CURRENT_HANDLER.set("on_raw_message_delete")
+    MESSAGES_RECONCILED.inc(event="delete", result=reconcile_message(entry, None))
+
+@bot.event
+async def on_raw_bulk_message_delete(payload: discord.RawBulkMessageDeleteEvent):
+    if bot.shutting_down:
+        return
+    CURRENT_HANDLER.set("on_raw_bulk_message_delete")
+    for message_id in payload.message_ids:
+        entry = RECENT.pop(message_id)
+        result = "missed" if entry is None else reconcile_message(entry, None)
+        MESSAGES_RECONCILED.inc(event="bulk_delete", result=result)
+
 # ----- Session-ID generation & logging -----
 SESSION_FILE = "sessions.csv"
 
@@ -217,6 +339,7 @@ now_iso = datetime.datetime.now().isoformat()
 with open(SESSION_FILE, "a", newline="", encoding="utf-8") as f:
     writer = csv.writer(f)
     writer.writerow([new_id, session_id, now_iso])
+STARTUP.mark("sessions.csv scan")
 
 # ----- Activity updater -----
 async def update_activity():
@@ -225,6 +348,13 @@ async def update_activity():
         activity=discord.CustomActivity(name=f"Hello, chat! (Session ID: {session_id})", emoji=":wave:")
     )
 
+# Apply a window of guild joins/removals: known users (only the joined guilds unless one was removed), then presence
+async def apply_guild_churn(joined, removed):
+    await update_known_users(bot, None if removed else joined)
+    await update_activity()
+
+GUILD_CHURN = GuildChurn(apply_guild_churn, GUILD_CHURN_SECONDS, GUILD_CHURN_MAX_SECONDS)
+
 # ----- Load extensions, events, etc. -----
 async def load_cogs():
     extensions = [
@@ -236,49 +366,96 @@ async def load_cogs():
     for ext in extensions:
         if ext not in bot.extensions:
             try:
-                await bot.load_extension(ext)
+                with STARTUP.phase(f"load extension {ext}"):
+                    await bot.load_extension(ext)
                 print(f"Loaded extension: {ext}")
             except commands.ExtensionAlreadyLoaded:
                 print(f"Extension already loaded, skipping: {ext}")
 
-# Function to fetch and display command IDs
+# Function to display command IDs from the persisted command registry
 async def fetch_command_ids():
-    commands = await bot.tree.fetch_commands()
     print("\n=== Registered Slash Commands ===")
-    for cmd in commands:
-        print(f"/{cmd.name} - ID: {cmd.id}")
+    for name, cmd_id in COMMAND_REGISTRY.ids().items():
+        print(f"/{name} - ID: {cmd_id}")
     print("================================\n")
 
+# Sync the command tree only for scopes whose local definition changed
+async def sync_command_tree():
+    if CLUSTER_ID not in (None, 0):
+        # Secondary cluster workers reuse the IDs the primary cluster persisted
+        COMMAND_REGISTRY.load()
+        return
+    for label, guild in (("global", None), ("log guild", discord.Object(id=LOG_GUILD_ID))):
+        with STARTUP.phase(f"tree.sync ({label})"):
+            synced = await COMMAND_REGISTRY.sync(bot.tree, guild=guild)
+        print(f"Command tree ({label}): {'synced' if synced else 'unchanged, sync skipped'}")
+
+# Record slash-command latency once a command finishes successfully
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    _observe_command(interaction, command)
+
 # Event to update known users when the bot is ready
 @bot.event
 async def on_ready():
     global cogs_loaded
+    first_ready = STARTUP.booting
+    if first_ready:
+        STARTUP.mark("login + gateway ready")
+    else:
+        STARTUP.reconnected("ready")
     if not globals().get("cogs_loaded", False):
         await load_cogs()
         globals()["cogs_loaded"] = True
-    await bot.tree.sync()
-    await bot.tree.sync(guild=discord.Object(id=LOG_GUILD_ID))
-    await fetch_command_ids()  # Fetch and display command IDs
-    await update_known_users(bot)  # Update known users with all guild members
+    if METRICS_PORT and not globals().get("metrics_server"):
+        globals()["metrics_server"] = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+    if not LOOP_MONITOR.running:
+        LOOP_MONITOR.threshold = LOOP_LAG_THRESHOLD_MS / 1000
+        LOOP_MONITOR.start(debug=LOOP_DEBUG)
+    AGGREGATOR.start()
+    RESIDENCY.start(TOTALS, on_checkpoint=lambda started, written: _record_flush("totals", started, written),
+                    on_flush=lambda started, written: _record_flush("guilds", started, written))
+    NAMES.start(bot)
+    await sync_command_tree()
+    with STARTUP.phase("fetch_command_ids"):
+        await fetch_command_ids()  # Display command IDs
+    if first_ready:
+        STARTUP.serving()
+    with STARTUP.phase("update_known_users"):
+        await update_known_users(bot)  # Update known users with all guild members
     await update_activity()  # Update the status on startup
+    STARTUP.finished()
+    cluster = f" cluster {CLUSTER_ID} (shards {bot.shard_ids})" if CLUSTER_ID is not None else ""
     print(f"Logged in as {bot.user} (ID: {bot.user.id}) "
-          f"with {bot.shard_count} shard(s) [Session ID: {session_id}]")
+          f"with {bot.shard_count} shard(s){cluster} [Session ID: {session_id}]")
+
+# Track gateway disconnects so reconnect downtime shows up in /dev stats
+@bot.event
+async def on_disconnect():
+    STARTUP.disconnected()
+
+@bot.event
+async def on_resumed():
+    STARTUP.reconnected("resumed")
 
-# Update known users and activity when joining a new guild
+# Update known users and activity when joining a new guild (coalesced with other joins/removals)
 @bot.event
 async def on_guild_join(guild):
     print(f"Joined new guild: {guild.name} (ID: {guild.id})")
-    await update_known_users(bot)
-    await update_activity()
+    GUILD_CHURN.joined_guild(guild)
 
-# Update known users and activity when leaving a guild
+# Unload the guild's stats, then update known users and activity when leaving a guild (coalesced)
 @bot.event
 async def on_guild_remove(guild):
     print(f"Left guild: {guild.name} (ID: {guild.id})")
-    await update_known_users(bot)
-    await update_activity()
+    RESIDENCY.evict(str(guild.id), "departed")
+    RECENT.forget_guild(str(guild.id))
+    GUILD_CHURN.removed_guild(guild)
 
 # ----- Error handling & run bot -----
 if __name__ == "__main__":
     setup_error_handling(bot)
     bot.run(DISCORD_TOKEN)
+    if bot.restart_requested:
+        # Here rather than in /dev restart: its task is cancelled once run() returns
+        os.execv(sys.executable, [sys.executable, "-m", "main"])
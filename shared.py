@@ -1,8 +1,47 @@
-# In-memory user message stats
+from config import (
+    VOCAB_FILE, GUILDS_DIR, MANIFEST_FILE, TOTALS_FILE, RESIDENT_ROWS, GUILD_IDLE_MINUTES, CHECKPOINT_MINUTES,
+    GUILD_FLUSH_SECONDS, NAMES_FILE, NAME_CACHE_SIZE, NAME_TTL_HOURS, RECENT_MESSAGES, RECENT_MESSAGE_HOURS,
+    DICTIONARY_FILE, DICTIONARY_DIR, DICTIONARY_CACHE_DIR, DEFAULT_LOCALES, LOCALES_FILE,
+)
+from core.aggregator import Aggregator
+from core.lexicon import Lexicon, dictionary_sources
+from core.names import NameCache
+from core.recent import RecentMessages
+from core.residency import GuildResidency
+from core.vocab import Vocabulary
+
+# In-memory user message stats of loaded guilds: {guild_id: {user_id: record}}
 stats = {}
-max_id = 0
 
-# In-memory word usage stats: key=(guild_id, word)
-# value: { 'id', 'word_id', 'guild_id', 'word', 'count', 'is_dict' }
+# In-memory word usage counts of loaded guilds: {guild_id: {word index: count}}
 words_stats = {}
-max_word_id = 0
\ No newline at end of file
+
+# Per-channel message counts of loaded guilds, under the two tables above: {guild_id: GuildChannels}
+channel_stats = {}
+
+# Rank index over the message counts in `stats`, for loaded guilds that were asked for a rank: {guild_id: RankIndex}
+guild_ranks = {}
+
+# Every distinct word seen, with its is_dict flag; word indexes above point into it
+VOCAB = Vocabulary(VOCAB_FILE)
+
+# Word lists per locale (db/american-english and db/dictionaries/*) and each guild's choice of them
+LEXICON = Lexicon(
+    dictionary_sources(DICTIONARY_FILE, DICTIONARY_DIR), DEFAULT_LOCALES, DICTIONARY_CACHE_DIR, VOCAB, LOCALES_FILE,
+)
+
+# Per-guild stats files behind the three tables above, and which guilds are loaded
+RESIDENCY = GuildResidency(
+    stats, words_stats, channel_stats, GUILDS_DIR, MANIFEST_FILE, TOTALS_FILE,
+    RESIDENT_ROWS, GUILD_IDLE_MINUTES * 60, CHECKPOINT_MINUTES * 60, GUILD_FLUSH_SECONDS, caches=(guild_ranks,),
+    before_write=VOCAB.save,  # So every word index a guild file refers to is on disk
+)
+
+# Running totals over every guild of this process, loaded or not, for global commands
+TOTALS = Aggregator(track_sources=False)
+
+# Last seen name of each user, so leaderboards don't depend on discord.py's member cache
+NAMES = NameCache(NAMES_FILE, NAME_CACHE_SIZE, NAME_TTL_HOURS * 3600, CHECKPOINT_MINUTES * 60)
+
+# What each recent message counted, so edits and deletes can be taken back out of the tables above
+RECENT = RecentMessages(RECENT_MESSAGES, RECENT_MESSAGE_HOURS * 3600)
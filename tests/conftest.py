@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+
+# config.py reads these at import time; point the db directory somewhere disposable
+# so nothing under the repo's own db/ is touched
+os.environ.setdefault("DISCORD_TOKEN", "test-token")
+for name in ("DISCORD_CLIENT_ID", "LOG_GUILD_ID", "LOG_CHANNEL_ID", "BOT_OWNER_ID"):
+    os.environ.setdefault(name, "1")  # main.py needs these to import (tests/test_shutdown.py)
+os.environ.setdefault("CHATCOUNTER_DB_DIR", tempfile.mkdtemp(prefix="chatcounter-tests-"))
+for name in ("CLUSTER_ID", "SHARD_IDS", "SHARD_COUNT", "AGGREGATOR_SOCKET"):
+    os.environ.pop(name, None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,129 @@
+import random
+
+from core.aggregator import Aggregator
+from core.topk import TopK
+
+
+def _ranked(totals: dict, n: int) -> list:
+    """Brute-force top n; ties broken by key so results compare equal."""
+    return sorted(((key, value) for key, value in totals.items() if value > 0), key=lambda kv: (-kv[1], kv[0]))[:n]
+
+
+def test_topk_tracks_increments_and_decrements():
+    rng = random.Random(1)
+    table, truth = TopK(5), {}
+    for _ in range(5000):
+        key = rng.randrange(40)
+        delta = rng.choice([1, 1, 2, 5, -1, -3, -10])
+        table.add(key, delta)
+        truth[key] = max(0, truth.get(key, 0) + delta)
+        if rng.random() < 0.1:
+            # Keys tied at the cut may differ; the totals shown may not
+            assert [value for _, value in table.top()] == [value for _, value in _ranked(truth, 5)]
+    assert table.totals == {key: value for key, value in truth.items() if value > 0}
+
+
+def test_topk_drops_keys_that_reach_zero():
+    table = TopK(3)
+    table.add("a", 2)
+    table.add("b", 1)
+    table.add("a", -2)
+    assert "a" not in table.totals
+    assert table.top() == [("b", 1)]
+    assert table.top(10) == [("b", 1)]  # Beyond K: straight from the totals
+
+
+def test_topk_load_and_copy():
+    table = TopK(2)
+    table.load({"a": 3, "b": 0, "c": 5, "d": 1})
+    assert table.top() == [("c", 5), ("a", 3)]
+    copy = table.copy()
+    copy.add("d", 10)
+    assert copy.top(1) == [("d", 11)]
+    assert table.top(1) == [("c", 5)]
+
+
+def _delta(gid, users, words=None, dict_words=()):
+    return {"g": gid, "u": users, "w": words or {}, "d": list(dict_words)}
+
+
+def test_apply_and_top():
+    agg = Aggregator(k=10)
+    agg.apply("a", [_delta("g1", {"u1": [3, 10, 50], "u2": [1, 2, 9]}, {"hello": 4, "zzz": 1}, ["hello"])])
+    agg.apply("b", [_delta("g2", {"u1": [2, 4, 20]}, {"hello": 1, "qq": 7})])
+    assert agg.top("users", 10) == [["u1", 5, 14, 70], ["u2", 1, 2, 9]]
+    assert agg.top("guilds", 10) == [["g1", 4], ["g2", 2]]
+    assert agg.top("words", 10) == [["qq", 7], ["hello", 5], ["zzz", 1]]
+    assert agg.top("dict", 10) == [["hello", 5]]
+    assert agg.top("nondict", 10) == [["qq", 7], ["zzz", 1]]
+
+
+def test_reset_subtracts_only_that_source():
+    agg = Aggregator(k=10)
+    agg.apply("a", [_delta("g1", {"u1": [3, 10, 50]}, {"hello": 4}, ["hello"])])
+    agg.apply("b", [_delta("g2", {"u1": [2, 4, 20], "u3": [1, 1, 1]}, {"hello": 1, "qq": 7})])
+    agg.reset("b")
+    assert agg.top("users", 10) == [["u1", 3, 10, 50]]
+    assert agg.top("guilds", 10) == [["g1", 3]]
+    assert agg.top("words", 10) == [["hello", 4]]
+    assert "qq" not in agg.is_dict
+    assert agg.rank("u3") is None
+    agg.reset("b")  # Unknown source: nothing to do
+    agg.reset("a")
+    assert agg.info() == {"sources": [], "users": 0, "guilds": 0, "words": 0}
+
+
+def test_reset_after_reconnect_matches_a_fresh_aggregator():
+    rng = random.Random(7)
+    agg, fresh = Aggregator(k=5), Aggregator(k=5)
+    for source in ("s1", "s2"):
+        for _ in range(50):
+            batch = [_delta(f"g{rng.randrange(4)}", {f"u{rng.randrange(20)}": [1, 3, 12]},
+                            {f"w{rng.randrange(30)}": rng.randrange(1, 4)})]
+            agg.apply(source, batch)
+            if source == "s2":
+                fresh.apply(source, batch)
+    agg.reset("s1")
+    for table in ("users", "guilds", "words", "nondict"):
+        assert [row[1] for row in agg.top(table, 5)] == [row[1] for row in fresh.top(table, 5)]
+    assert agg.state() == fresh.state()
+
+
+def test_adjust_takes_back_an_edited_message():
+    totals = Aggregator(track_sources=False)
+    totals.record("g", "u", 2, 9, [("hello", True), ("there", True)])
+    totals.adjust("g", "u", [0, -1, -4], {"there": -1}, [])
+    assert totals.top("words", 10) == [["hello", 1]]
+    assert "there" not in totals.is_dict
+    assert totals.user_totals["u"] == [1, 1, 5]
+
+
+def test_reclassify_moves_totals_between_tables():
+    agg = Aggregator()
+    agg.apply("a", [_delta("g", {"u": [1, 2, 8]}, {"cat": 3, "xq": 1})])
+    agg.reclassify(["cat"], [])
+    assert agg.top("dict", 10) == [["cat", 3]]
+    assert agg.top("nondict", 10) == [["xq", 1]]
+    agg.reclassify([], ["cat"])
+    assert agg.top("dict", 10) == []
+
+
+def test_state_round_trip():
+    agg = Aggregator()
+    agg.apply("a", [_delta("g", {"u": [2, 5, 20], "v": [1, 1, 3]}, {"cat": 3, "xq": 1}, ["cat"])])
+    restored = Aggregator()
+    restored.load_state(agg.state())
+    for table in ("users", "guilds", "words", "dict", "nondict"):
+        assert restored.top(table, 10) == agg.top(table, 10)
+    assert restored.rank("v")["position"] == 2
+
+
+def test_words_leaving_both_tables_are_forgotten():
+    agg = Aggregator()
+    agg.apply("a", [_delta("g", {"u": [1, 2, 8]}, {"cat": 2, "xq": 1}, ["cat"])])
+    agg.apply("a", [_delta("g", {"u": [0, -1, -4]}, {"cat": -2})])  # An edit took "cat" back out
+    assert agg.is_dict == {"xq": False}
+    agg.apply("b", [_delta("g", {"v": [1, 1, 3]}, {"zz": 4})])
+    agg.reset("b")
+    assert agg.is_dict == {"xq": False}
+
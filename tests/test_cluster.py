@@ -0,0 +1,131 @@
+import json
+import os
+import sys
+import time
+
+import pytest
+
+from cluster import Supervisor, Worker, shard_ranges, split_root_data
+from core.storage import read_guild, write_guild
+
+
+@pytest.mark.parametrize("shards, clusters", [(1, 1), (4, 2), (10, 3), (16, 5), (3, 8)])
+def test_shard_ranges_cover_every_shard_once(shards, clusters):
+    ranges = shard_ranges(shards, clusters)
+    assert len(ranges) == min(shards, clusters)
+    assert [shard for r in ranges for shard in r] == list(range(shards))
+    sizes = [len(r) for r in ranges]
+    assert max(sizes) - min(sizes) <= 1
+    assert sizes == sorted(sizes, reverse=True)  # Extra shards go to the first clusters
+
+
+def _worker(code: int) -> Worker:
+    worker = Worker(cluster_id=code, shard_ids=[0], shard_count=1)
+    worker.command = [sys.executable, "-c", f"raise SystemExit({code})"]
+    return worker
+
+
+def _exit(supervisor: Supervisor, worker: Worker):
+    worker.process.wait(timeout=30)
+    supervisor.check(worker)
+
+
+def test_supervisor_restarts_crashed_worker_with_backoff():
+    worker = _worker(3)
+    supervisor = Supervisor([worker], command=[], min_backoff=1, max_backoff=4)
+    supervisor.start(worker)
+    backoffs = []
+    for _ in range(4):
+        _exit(supervisor, worker)
+        assert worker.process is None and not worker.finished
+        backoffs.append(worker.next_start - time.monotonic())
+        worker.next_start = 0  # Due now
+        supervisor.check(worker)
+        assert worker.process is not None  # Restarted
+    worker.process.wait(timeout=30)
+    assert worker.restarts == 4
+    assert backoffs == pytest.approx([1, 2, 4, 4], abs=0.5)
+
+
+def test_supervisor_leaves_cleanly_exited_worker_stopped():
+    worker = _worker(0)
+    supervisor = Supervisor([worker], command=[])
+    supervisor.start(worker)
+    _exit(supervisor, worker)
+    assert worker.finished and worker.restarts == 0
+    supervisor.check(worker)
+    assert worker.process is None
+
+
+def test_supervisor_run_returns_once_every_worker_finished():
+    workers = [_worker(0), _worker(0)]
+    Supervisor(workers, command=[]).run(poll_interval=0.05, run_for=30)
+    assert all(worker.finished for worker in workers)
+
+
+def test_supervisor_stops_services_once_shard_workers_finished():
+    service = Worker(cluster_id=-1, shard_ids=[], shard_count=0)
+    service.service = True
+    service.command = [sys.executable, "-c", "import time; time.sleep(60)"]  # Like the aggregator: never exits 0
+    workers = [_worker(0), service]
+    started = time.monotonic()
+    Supervisor(workers, command=[]).run(poll_interval=0.05, run_for=30)
+    assert time.monotonic() - started < 10
+    assert workers[0].finished
+    assert service.process.poll() is not None  # Terminated, not left running
+
+
+def _guild_on_shard(shard: int, shard_count: int, n: int = 1) -> str:
+    return str(((n * shard_count + shard) << 22) + 12345)
+
+
+def test_split_root_data_moves_each_guild_to_its_cluster(tmp_path):
+    root = tmp_path / "db"
+    (root / "guilds").mkdir(parents=True)
+    ranges = shard_ranges(4, 2)
+    gids = {shard: _guild_on_shard(shard, 4) for shard in range(4)}
+    for gid in gids.values():
+        write_guild(str(root / "guilds" / f"{gid}.json"), gid, {}, {0: 3})
+    (root / "vocab.tsv").write_text("hello\t1\n", encoding="utf-8")
+    (root / "locales.json").write_text(json.dumps({gids[3]: ["en"]}), encoding="utf-8")
+    (root / "manifest.json").write_text("{}", encoding="utf-8")
+
+    assert split_root_data(str(root), ranges, 4) == 4
+    for shard, gid in gids.items():
+        cluster = root / f"cluster-{shard // 2}"
+        assert read_guild(str(cluster / "guilds" / f"{gid}.json"), gid)[1] == {0: 3}
+    for cluster_id in range(2):
+        assert (root / f"cluster-{cluster_id}" / "vocab.tsv").read_text(encoding="utf-8") == "hello\t1\n"
+    assert json.loads((root / "cluster-1" / "locales.json").read_text()) == {gids[3]: ["en"]}
+    assert not (root / "cluster-0" / "locales.json").exists()
+    assert not (root / "guilds").exists() and not (root / "manifest.json").exists()
+    assert (root / "manifest.json.split").exists()
+
+    # Split once; starting again with the same layout leaves everything where it is
+    assert split_root_data(str(root), ranges, 4) == 0
+    with pytest.raises(SystemExit):
+        split_root_data(str(root), shard_ranges(4, 4), 4)
+
+
+def test_split_root_data_migrates_csvs_first(tmp_path):
+    root = tmp_path / "db"
+    root.mkdir()
+    gid = _guild_on_shard(1, 2)
+    (root / "counter.csv").write_text("id,entry_id,user_id,guild_id,messages,words,characters\n"
+                                      f"1,aaaa,10,{gid},5,12,60\n", encoding="utf-8")
+    assert split_root_data(str(root), shard_ranges(2, 2), 2) == 1
+    users, _, _ = read_guild(str(root / "cluster-1" / "guilds" / f"{gid}.json"), gid)
+    assert users["10"]["messages"] == 5
+    assert (root / "counter.csv.migrated").exists()
+
+
+def test_split_root_data_refuses_when_clusters_hold_stats_too(tmp_path):
+    root = tmp_path / "db"
+    gid = _guild_on_shard(0, 2)
+    for directory in (root / "guilds", root / "cluster-0" / "guilds"):
+        directory.mkdir(parents=True)
+        write_guild(str(directory / f"{gid}.json"), gid, {}, {})
+    with pytest.raises(SystemExit):
+        split_root_data(str(root), shard_ranges(2, 2), 2)
+    assert os.path.exists(root / "guilds" / f"{gid}.json")
+
@@ -0,0 +1,140 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import importer
+from config import BASE_DIR, DICTIONARY_FILE, DICTIONARY_DIR
+from core.lexicon import dictionary_sources
+from core.storage import read_guild
+
+GUILD = "4194304000"
+
+
+def _export(path, channel: dict, messages: list[tuple[int, str, str]]) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "guild": {"id": GUILD},
+            "channel": channel,
+            "messages": [{"id": str(mid), "type": "Default", "author": {"id": uid, "isBot": False}, "content": text}
+                         for mid, uid, text in messages],
+        }, f)
+    return str(path)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def dictionary(tmp_path_factory):
+    importer._init_worker(dictionary_sources(DICTIONARY_FILE, DICTIONARY_DIR), ["en"],
+                          str(tmp_path_factory.mktemp("dictionary-index")))
+
+
+def _task(path, ranges=None, before=None) -> dict:
+    return {"path": path, "ranges": ranges or {}, "before": before, "shard_ids": None, "shard_count": None}
+
+
+def test_import_file_counts_and_skips_known_ranges(tmp_path):
+    path = _export(tmp_path / "c.json", {"id": "444", "type": "GuildTextChat"},
+                   [(1000, "7", "hello world"), (1001, "8", "hello"), (1002, "7", "bye")])
+    result = importer.import_file(_task(path))
+    assert result["error"] is None
+    assert result["channel_id"] == result["stats_channel_id"] == "444"
+    assert result["range"] == [1000, 1002] and result["messages"] == 3
+    assert result["users"]["7"][:3] == [2, 3, 14]
+    assert result["words"] == {"hello": 2, "world": 1, "bye": 1}
+    assert "hello" in result["dict"]
+
+    again = importer.import_file(_task(path, ranges={"444": [[1000, 1001]]}, before=1003))
+    assert again["messages"] == 1 and again["skipped"] == 2
+    assert again["words"] == {"bye": 1}
+
+
+def test_thread_exports_count_towards_the_parent_channel(tmp_path):
+    path = _export(tmp_path / "t.json", {"id": "555", "type": "GuildPublicThread", "categoryId": "444"},
+                   [(1000, "7", "in a thread")])
+    result = importer.import_file(_task(path))
+    assert result["channel_id"] == "555"  # The ledger tracks the thread itself
+    assert result["stats_channel_id"] == "444"
+
+
+def test_ledger_merges_ranges_and_recognizes_files(tmp_path):
+    ledger = importer.ImportLedger(str(tmp_path / "imports.json"))
+    export = _export(tmp_path / "c.json", {"id": "1"}, [(5, "7", "x")])
+    for span in ([10, 20], [30, 40], [21, 29], [50, 60]):
+        ledger.record({"path": export, "guild_id": GUILD, "channel_id": "1", "ledger_key": "1", "messages": 1,
+                       "range": span})
+    assert ledger.channels["1"] == [[10, 40], [50, 60]]
+    assert ledger.seen(export)
+    ledger.save()
+
+    reloaded = importer.ImportLedger(ledger.path)
+    assert reloaded.channels == ledger.channels and reloaded.seen(export)
+    with open(export, "a", encoding="utf-8") as f:
+        f.write(" ")  # Changed since: imported again, minus the ranges already counted
+    assert not reloaded.seen(export)
+
+
+def _run_importer(db_dir, *paths):
+    env = dict(os.environ, CHATCOUNTER_DB_DIR=str(db_dir))
+    subprocess.run([sys.executable, os.path.join(BASE_DIR, "importer.py"), *map(str, paths), "--workers", "1"],
+                   check=True, env=env, cwd=db_dir, capture_output=True)
+    return read_guild(os.path.join(db_dir, "guilds", f"{GUILD}.json"), GUILD)
+
+
+def test_reimporting_is_idempotent(tmp_path):
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    _export(exports / "a.json", {"id": "444"}, [(1000, "7", "one two"), (1001, "8", "three")])
+    db_dir = tmp_path / "db"
+    db_dir.mkdir()
+
+    users, counts, channels = _run_importer(db_dir, exports)
+    first = ({uid: r["messages"] for uid, r in users.items()}, counts, channels.to_rows())
+    assert first[0] == {"7": 1, "8": 1}
+
+    # The same file again, then a newer export of the same channel overlapping the first
+    users, counts, channels = _run_importer(db_dir, exports)
+    assert ({uid: r["messages"] for uid, r in users.items()}, counts, channels.to_rows()) == first
+    _export(exports / "b.json", {"id": "444"}, [(1001, "8", "three"), (1002, "8", "four")])
+    users, _, channels = _run_importer(db_dir, exports)
+    assert {uid: r["messages"] for uid, r in users.items()} == {"7": 1, "8": 2}
+    assert channels.get("444").messages == 3
+
+
+def _package(root, owner: str, messages: list[tuple[int, str]]) -> str:
+    """A data package's messages.json for channel 444, authored by `owner`."""
+    channel_dir = root / "messages" / "c444"
+    channel_dir.mkdir(parents=True)
+    (root / "account").mkdir()
+    (root / "account" / "user.json").write_text(json.dumps({"id": owner}), encoding="utf-8")
+    (channel_dir / "channel.json").write_text(json.dumps({"id": "444", "type": 0, "guild": {"id": GUILD}}),
+                                              encoding="utf-8")
+    path = channel_dir / "messages.json"
+    path.write_text(json.dumps([{"ID": mid, "Contents": text} for mid, text in messages]), encoding="utf-8")
+    return str(path)
+
+
+def test_package_ranges_only_skip_their_owner(tmp_path):
+    package = _package(tmp_path / "pkg", "7", [(1000, "mine"), (1002, "mine again")])
+    result = importer.import_file(_task(package))
+    assert result["ledger_key"] == importer.ledger_key("444", "7") and result["range"] == [1000, 1002]
+    ledger = importer.ImportLedger(str(tmp_path / "imports.json"))
+    ledger.record(result)
+
+    # A full export of the channel afterwards: only the package owner's messages were counted already
+    export = _export(tmp_path / "c.json", {"id": "444"},
+                     [(1000, "7", "mine"), (1001, "8", "theirs"), (1002, "7", "mine again"), (1003, "7", "new")])
+    result = importer.import_file(_task(export, ranges=ledger.channels))
+    assert result["ledger_key"] == "444"
+    assert {uid: totals[0] for uid, totals in result["users"].items()} == {"8": 1, "7": 1}
+    assert result["skipped"] == 2
+
+
+def test_overlapping_exports_in_one_round():
+    added = {importer.ledger_key("444", "7"): [[10, 20]]}
+    assert not importer.ranges_overlap(importer.ledger_key("444", "8"), [10, 20], added)  # Other author
+    assert importer.ranges_overlap(importer.ledger_key("444", "7"), [15, 30], added)
+    assert importer.ranges_overlap("444", [15, 30], added)  # A full export holds the author's messages too
+    assert not importer.ranges_overlap("555", [15, 30], added)
+
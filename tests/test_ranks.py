@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from core.ranks import EXACT, RankIndex, bucket
+
+
+def _brute(counts: dict, uid: str) -> dict | None:
+    """Competition ranking by sorting every user."""
+    count = counts.get(uid, 0)
+    if count <= 0:
+        return None
+    others = [c for c in counts.values() if c > 0]
+    higher = [c for c in others if c > count]
+    lower = [c for c in others if c < count]
+    return {
+        "position": len(higher) + 1,
+        "total": len(others),
+        "count": count,
+        "percentile": 100 * len(lower) / len(others),
+        "above": min(higher) if higher else None,
+        "below": max(lower) if lower else None,
+    }
+
+
+def _check(index: RankIndex, counts: dict):
+    for uid in counts:
+        got, want = index.rank(uid), _brute(counts, uid)
+        if want is None:
+            assert got is None
+            continue
+        assert {key: got[key] for key in ("position", "total", "count", "percentile")} == \
+               {key: want[key] for key in ("position", "total", "count", "percentile")}
+        # The neighbours are some user with the nearest higher / lower count
+        assert (got["above"][1] if got["above"] else None) == want["above"]
+        assert (got["below"][1] if got["below"] else None) == want["below"]
+        for neighbour in (got["above"], got["below"]):
+            if neighbour:
+                assert counts[neighbour[0]] == neighbour[1]
+
+
+def test_buckets_are_monotonic():
+    previous = -1
+    for count in list(range(EXACT + 10)) + [2 ** e + d for e in range(11, 40) for d in (-1, 0, 1)]:
+        b = bucket(count)
+        assert b >= previous
+        previous = b
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rank_matches_brute_force(seed):
+    rng = random.Random(seed)
+    # Mostly small counts with ties, plus a long tail sharing the coarse buckets above EXACT
+    counts = {f"u{i}": rng.choice([rng.randrange(1, 50), rng.randrange(1, 5000), rng.randrange(1, 10 ** 7)])
+              for i in range(300)}
+    index = RankIndex.from_counts(counts.items())
+    _check(index, counts)
+
+
+def test_rank_follows_updates():
+    rng = random.Random(42)
+    counts: dict[str, int] = {}
+    index = RankIndex()
+    for step in range(3000):
+        uid = f"u{rng.randrange(80)}"
+        count = max(0, counts.get(uid, 0) + rng.choice([1, 1, 3, 50, 900, -2, -40, 10 ** 6]))
+        counts[uid] = count
+        index.set(uid, count)
+        if step % 300 == 0:
+            _check(index, counts)
+    _check(index, counts)
+    assert len(index) == sum(1 for count in counts.values() if count > 0)
+
+
+def test_unranked_user():
+    index = RankIndex.from_counts([("a", 3), ("b", 0)])
+    assert index.rank("b") is None
+    assert index.rank("nobody") is None
+    assert index.rank("a") == {"position": 1, "total": 1, "count": 3, "percentile": 0.0,
+                               "above": None, "below": None}
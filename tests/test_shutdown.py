@@ -0,0 +1,50 @@
+import asyncio
+import json
+import os
+import time
+
+from bench.harness import load_bot
+from bench.queries import fake_interaction
+from bench.workload import fake_message
+from core.recent import DISCORD_EPOCH_MS
+
+GUILD = 4194304000
+
+
+def test_restart_flushes_and_checkpoints_before_the_client_closes(tmp_path):
+    cwd = os.getcwd()
+    try:
+        main = load_bot(workdir=str(tmp_path))
+    finally:
+        os.chdir(cwd)
+    from bot.commands.admin import Admin
+
+    bot = main.bot
+    base = (int(time.time() * 1000) - DISCORD_EPOCH_MS) << 22
+    finished = []
+
+    async def login(token):
+        pass
+
+    async def connect(reconnect=True):
+        # Stands in for the gateway: one message, then /dev restart from its own task, as discord.py runs commands
+        await main.on_message(fake_message("hello there", 7, GUILD, message_id=base + 1))
+
+        async def restart():
+            await Admin.restart.callback(Admin(bot), fake_interaction(Admin.restart, GUILD, 7))
+            finished.append(True)
+
+        asyncio.ensure_future(restart())
+        while not bot.is_closed():
+            if bot.shutting_down:
+                await main.on_message(fake_message("too late", 8, GUILD, message_id=base + 2))
+            await asyncio.sleep(0)
+
+    bot.login, bot.connect = login, connect
+    bot.run("offline", log_handler=None)
+
+    assert bot.restart_requested and finished  # The command ran to the end; main.py execs after run()
+    with open(main.MANIFEST_FILE, encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest["clean"] and str(GUILD) in manifest["warm"]
+    assert set(main.stats[str(GUILD)]) == {"7"}  # Nothing counted once shutdown started
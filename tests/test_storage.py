@@ -0,0 +1,83 @@
+import os
+
+from core.storage import migrate_csv, read_guild, write_guild
+from core.channels import GuildChannels
+from core.vocab import Vocabulary
+
+COUNTER = """id,entry_id,user_id,guild_id,messages,words,characters
+1,aaaa,10,100,5,12,60
+2,bbbb,11,100,1,2,9
+3,cccc,10,200,2,3,15
+bad,row,,,,,
+"""
+
+LEGACY_WORDS = """id,word_id,guild_id,word,count,is_dict
+1,x1,100,hello,4,True
+2,x2,100,zzq,2,False
+3,x3,200,hello,1,True
+"""
+
+
+def _write(path: str, text: str):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+def _paths(tmp_path):
+    return (str(tmp_path / "counter.csv"), str(tmp_path / "words.csv"), str(tmp_path / "archive"),
+            str(tmp_path / "guilds"))
+
+
+def test_migrate_csv_splits_into_guild_files(tmp_path):
+    counter, words, archive, guilds = _paths(tmp_path)
+    _write(counter, COUNTER)
+    _write(words, LEGACY_WORDS)
+    vocab = Vocabulary(str(tmp_path / "vocab.tsv"))
+    assert migrate_csv(counter, words, archive, guilds, vocab) == 2
+
+    users, counts, _ = read_guild(os.path.join(guilds, "100.json"), "100")
+    assert {uid: (r["id"], r["messages"], r["words"], r["characters"]) for uid, r in users.items()} == \
+           {"10": (1, 5, 12, 60), "11": (2, 1, 2, 9)}
+    assert {vocab.words[widx]: count for widx, count in counts.items()} == {"hello": 4, "zzq": 2}
+    users, counts, _ = read_guild(os.path.join(guilds, "200.json"), "200")
+    assert users["10"]["messages"] == 2
+    assert {vocab.words[widx]: count for widx, count in counts.items()} == {"hello": 1}
+
+    # The CSVs are kept aside, and the vocabulary they were read with is on disk
+    assert os.path.exists(counter + ".migrated") and not os.path.exists(counter)
+    assert os.path.exists(words + ".migrated") and not os.path.exists(words)
+    reloaded = Vocabulary(vocab.path)
+    reloaded.load()
+    assert reloaded.words == vocab.words and list(reloaded.is_dict) == list(vocab.is_dict)
+    assert reloaded.is_dict[reloaded.get("hello")] == 1
+
+
+def test_migrate_csv_moves_archived_guilds_unless_in_the_csvs(tmp_path):
+    counter, words, archive, guilds = _paths(tmp_path)
+    _write(counter, COUNTER)
+    os.makedirs(archive)
+    write_guild(os.path.join(archive, "300.json"), "300", {}, {0: 7})
+    write_guild(os.path.join(archive, "100.json"), "100", {}, {0: 99})  # Stale: the CSV copy wins
+    vocab = Vocabulary(str(tmp_path / "vocab.tsv"))
+    assert migrate_csv(counter, words, archive, guilds, vocab) == 3
+    assert not os.path.exists(archive)
+    assert read_guild(os.path.join(guilds, "300.json"), "300")[1] == {0: 7}
+    assert read_guild(os.path.join(guilds, "100.json"), "100")[0]["10"]["messages"] == 5
+
+
+def test_migrate_csv_without_csvs_does_nothing(tmp_path):
+    counter, words, archive, guilds = _paths(tmp_path)
+    assert migrate_csv(counter, words, archive, guilds, Vocabulary(None)) is None
+    assert not os.path.exists(guilds)
+
+
+def test_guild_file_round_trip(tmp_path):
+    channels = GuildChannels()
+    channels.record("5", "10", 3, 7, 30)
+    users = {"10": {"id": 1, "entry_id": "e", "user_id": "10", "guild_id": "1", "messages": 3, "words": 7,
+                    "characters": 30, "kinds": [1, 0, 0, 0, 0, 0, 0]}}
+    path = str(tmp_path / "1.json")
+    write_guild(path, "1", users, {4: 2}, channels)
+    read_users, counts, read_channels = read_guild(path, "1")
+    assert read_users == users and counts == {4: 2}
+    assert read_channels.to_rows() == channels.to_rows()
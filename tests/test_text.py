@@ -0,0 +1,53 @@
+import pytest
+
+from core.text import KINDS, scan, add_kinds
+
+
+def kinds(**counts) -> list[int]:
+    return [counts.get(kind, 0) for kind in KINDS]
+
+
+@pytest.mark.parametrize("content, words", [
+    ("", []),
+    ("Hello, World!", ["hello", "world"]),
+    ("don't e-mail u.s.a snake_case ...end.", ["don't", "e-mail", "u.s.a", "snake_case", "end"]),
+    ("(quoted) 'single' \"double\"", ["quoted", "single", "double"]),
+    ("Привет мир", ["привет", "мир"]),
+    ("café naïve", ["café", "naïve"]),
+    ("नमस्ते दुनिया", ["नमस्ते", "दुनिया"]),  # Combining vowel signs stay in the word
+    ("—dash— «quote» ¿qué?", ["dash", "quote", "qué"]),
+])
+def test_plain_words(content, words):
+    assert scan(content) == (words, None)
+
+
+@pytest.mark.parametrize("content, words, expected", [
+    ("<@123> <@!4> <@&5> @everyone <#6> hi", ["hi"],
+     kinds(user_mentions=2, role_mentions=2, channel_mentions=1)),
+    ("look https://x.y/z?q=1 now", ["look", "now"], kinds(urls=1)),
+    ("`code` and ```\nblock words\n``` done", ["and", "done"], kinds(code=2)),
+    ("<:blob:123> <a:dance:456>", [], kinds(custom_emojis=2)),
+    ("<t:1700000000:R> </cmd:99> left", ["left"], None),  # Uncounted markup is only cut out
+    ("ok😂ok", ["ok", "ok"], kinds(emojis=1)),
+    ("😂 👍🏽 🇸🇬 1️⃣ 👨‍👩‍👧", [], kinds(emojis=5)),  # Skin tone, flag, keycap, ZWJ sequence: one each
+])
+def test_markup_is_counted_not_read_as_words(content, words, expected):
+    found, counted = scan(content)
+    assert sorted(found) == sorted(words)
+    assert counted == expected
+
+
+def test_ascii_and_unicode_paths_agree():
+    # A non-ASCII character anywhere sends the whole message down the Unicode path
+    ascii_words, _ = scan("it's a well-known fact, (mostly)!")
+    unicode_words, _ = scan("it's a well-known fact, (mostly)! é")
+    assert sorted(unicode_words) == sorted(ascii_words + ["é"])
+
+
+def test_add_kinds():
+    rec = {}
+    add_kinds(rec, None)
+    assert "kinds" not in rec
+    add_kinds(rec, kinds(urls=1))
+    add_kinds(rec, kinds(urls=2, code=1))
+    assert rec["kinds"] == kinds(urls=3, code=1)
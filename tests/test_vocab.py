@@ -0,0 +1,40 @@
+from core.vocab import Vocabulary
+
+
+def _write(path: str, text: str):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+def test_vocabulary_appends_and_keeps_indexes(tmp_path):
+    path = str(tmp_path / "vocab.tsv")
+    vocab = Vocabulary(path)
+    vocab.add("a", True)
+    vocab.add("b", False)
+    vocab.save()
+    vocab.add("c", False)
+    vocab.save()
+    reloaded = Vocabulary(path)
+    reloaded.load()
+    assert reloaded.words == ["a", "b", "c"] and reloaded.get("c") == 2
+
+
+def test_vocabulary_survives_a_torn_append(tmp_path):
+    path = str(tmp_path / "vocab.tsv")
+    _write(path, "a\t1\nb\t0\nhal")  # The last append was cut short
+    vocab = Vocabulary(path)
+    vocab.load()
+    assert vocab.words == ["a", "b"]
+    vocab.add("c", False)
+    vocab.save()
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "a\t1\nb\t0\nc\t0\n"
+
+
+def test_vocabulary_duplicate_lines_do_not_shift_indexes(tmp_path):
+    path = str(tmp_path / "vocab.tsv")
+    _write(path, "a\t1\nb\t0\na\t1\nc\t0\n")
+    vocab = Vocabulary(path)
+    vocab.load()
+    assert vocab.get("a") == 0 and vocab.get("c") == 3
+    assert vocab.words[2] == "a"
@@ -1,5 +1,7 @@
 import os
 
+from shared import NAMES
+
 USERS_FILE = "users.txt"
 
 # Ensure users.txt exists or create it
@@ -8,14 +10,16 @@ def ensure_users_file():
         with open(USERS_FILE, "w", encoding="utf-8") as f:
             pass
 
-# Update known users by fetching all members from all guilds, storing as "username (userID)"
-async def update_known_users(bot):
+# Update known users by fetching all members from all guilds, storing as "username (userID)".
+# With `guilds`, only their members are fetched and added to the users already known.
+async def update_known_users(bot, guilds=None):
     ensure_users_file()
-    known_users = set()
+    known_users = set() if guilds is None else set(get_known_users())
 
-    for guild in bot.guilds:
+    for guild in bot.guilds if guilds is None else guilds:
         async for member in guild.fetch_members(limit=None):
             known_users.add(f"{member.name} ({member.id})")
+            NAMES.see(str(member.id), member.name, str(guild.id))
 
     # Sort known users alphabetically
     sorted_users = sorted(known_users, key=lambda x: x.lower())